@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import argparse
+import random
+import string
+from typing import List
+
+# Generador de programas para la suite. Sólo usa lo que aceptan los tres
+# proyectos: declaraciones `int|float x = expr;`, `print(expr);` y
+# `print("...");`, con + - * / y paréntesis, una sentencia por línea (el
+# parser de parser/src analiza una sentencia por llamada). No hay '-'
+# unario ni comentarios, que parser/src no reconoce.
+#
+# Los programas también son válidos para compiler/src: cada nombre se
+# declara una sola vez, una variable int sólo recibe expresiones enteras
+# (sin '/'), sólo se divide entre literales distintos de cero y las
+# expresiones usan sólo las variables base, declaradas con literales, para
+# que los valores no crezcan sin límite.
+
+SHAPES = ("mixed", "deep", "vars", "print", "strings")
+
+# Variables base de cada tipo, declaradas al principio
+BASE = 8
+# Caracteres de los strings largos (sin comillas ni '\')
+STRING_CHARS = string.ascii_letters + string.digits + " .,:;!?()+-*=<>"
+
+
+class _Generator:
+    def __init__(self, rng: random.Random, depth: int, string_length: int) -> None:
+        self.rng = rng
+        self.depth = depth
+        self.string_length = string_length
+        self.ints = [f"i{k}" for k in range(BASE)]
+        self.floats = [f"f{k}" for k in range(BASE)]
+        self.declared = 0
+
+    def prelude(self) -> List[str]:
+        lines = [f"int {name} = {self.rng.randint(1, 99)};" for name in self.ints]
+        lines += [f"float {name} = {self.rng.randint(0, 99)}.{self.rng.randint(0, 99)};" for name in self.floats]
+        return lines
+
+    def fresh(self) -> str:
+        self.declared += 1
+        return f"v{self.declared}"
+
+    def operand(self, integer: bool) -> str:
+        r = self.rng.random()
+        if r < 0.3:
+            return str(self.rng.randint(0, 999))
+        if integer:
+            return self.rng.choice(self.ints)
+        if r < 0.45:
+            return f"{self.rng.randint(0, 99)}.{self.rng.randint(1, 99)}"
+        return self.rng.choice(self.ints if r < 0.7 else self.floats)
+
+    def binary(self, left: str, integer: bool) -> str:
+        if integer:
+            op = self.rng.choice("+-*")
+        else:
+            op = self.rng.choice("+-*/")
+        if op == "/":
+            return f"{left} / {self.rng.randint(1, 9)}"
+        return f"{left} {op} {self.operand(integer)}"
+
+    def expr(self, integer: bool, depth: int = 0) -> str:
+        # Árbol aleatorio de poca profundidad
+        r = self.rng.random()
+        if depth >= 3 or r < 0.3:
+            return self.operand(integer)
+        if r < 0.4:
+            return f"({self.expr(integer, depth + 1)})"
+        left = self.expr(integer, depth + 1)
+        return self.binary(left, integer)
+
+    def deep_expr(self, integer: bool) -> str:
+        # Cadena de `depth` operaciones, cada una entre paréntesis
+        text = self.operand(integer)
+        for _ in range(self.depth):
+            text = f"({self.binary(text, integer)})"
+        return text
+
+    def declaration(self, deep: bool = False) -> str:
+        integer = self.rng.random() < 0.5
+        expr = self.deep_expr(integer) if deep else self.expr(integer)
+        return f"{'int' if integer else 'float'} {self.fresh()} = {expr};"
+
+    def print_expr(self, deep: bool = False) -> str:
+        integer = self.rng.random() < 0.5
+        return f"print({self.deep_expr(integer) if deep else self.expr(integer)});"
+
+    def print_string(self, length: int = 12) -> str:
+        text = "".join(self.rng.choice(STRING_CHARS) for _ in range(length))
+        return f'print("{text}");'
+
+    def statement(self, shape: str) -> str:
+        r = self.rng.random()
+        if shape == "deep":
+            return self.declaration(deep=True) if r < 0.5 else self.print_expr(deep=True)
+        if shape == "vars":
+            return self.declaration() if r < 0.9 else self.print_expr()
+        if shape == "print":
+            return self.print_expr() if r < 0.8 else self.print_string()
+        if shape == "strings":
+            return self.print_string(self.string_length) if r < 0.8 else self.print_expr()
+        # mixed
+        if r < 0.4:
+            return self.declaration()
+        if r < 0.9:
+            return self.print_expr()
+        return self.print_string()
+
+
+def generate(statements: int, shape: str = "mixed", seed: int = 0,
+             depth: int = 24, string_length: int = 200) -> str:
+    # Mismos argumentos, mismo programa
+    if shape not in SHAPES:
+        raise ValueError(f"unknown shape {shape!r} (choose from {', '.join(SHAPES)})")
+    gen = _Generator(random.Random(f"{shape}:{seed}"), depth, string_length)
+    lines = gen.prelude()
+    while len(lines) < statements:
+        lines.append(gen.statement(shape))
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="genera un programa sintético para los benchmarks")
+    p.add_argument("-n", dest="n", type=int, default=10_000, help="número de sentencias")
+    p.add_argument("-k", dest="shape", choices=SHAPES, default="mixed", help="forma del programa")
+    p.add_argument("-s", dest="seed", type=int, default=0, help="semilla del generador")
+    p.add_argument("-d", dest="depth", type=int, default=24, help="profundidad de las expresiones (forma deep)")
+    p.add_argument("-l", dest="length", type=int, default=200, help="largo de los strings (forma strings)")
+    p.add_argument("-o", dest="out", help="archivo de salida (por defecto, stdout)")
+    args = p.parse_args()
+
+    text = generate(args.n, args.shape, args.seed, args.depth, args.length)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    else:
+        print(text, end="")
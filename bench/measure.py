@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+# Mide un proyecto sobre un programa e imprime el resultado como JSON. Los
+# tres proyectos tienen módulos con el mismo nombre (lexer, parser), así
+# que suite.py corre cada uno en su propio proceso.
+#
+# Cada etapa reporta segundos (la mejor de `repeat` corridas) y su
+# velocidad; las que construyen algo en memoria reportan también los bytes
+# que ocupa por token o por nodo.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECTS = {
+    "lexer": os.path.join(ROOT, "lexer"),
+    "parser": os.path.join(ROOT, "parser", "src"),
+    "compiler": os.path.join(ROOT, "compiler", "src"),
+}
+
+Stage = Dict[str, float]
+
+
+def best(fn: Callable[[], Any], repeat: int) -> float:
+    seconds = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def traced(build: Callable[[], Any]) -> int:
+    # Bytes que sigue ocupando lo que devuelve `build`
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def rate(seconds: float, items: int, unit: str, mb: float) -> Stage:
+    return {"seconds": seconds, f"{unit}_per_s": items / seconds, "mb_per_s": mb / seconds}
+
+
+def lexer_project(text: str, repeat: int) -> Dict[str, Stage]:
+    # lexer/: cada motor del lexer escrito a mano
+    from lexer import ENGINES
+
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    stages = {}
+    for engine in sorted(ENGINES):
+        make = ENGINES[engine]
+
+        def scan() -> int:
+            lex = make(text)
+            while lex.readTokens(4096):
+                pass
+            return lex.total
+
+        tokens = scan()
+        stage = rate(best(scan, repeat), tokens, "tokens", mb)
+        stage["tokens"] = tokens
+        stage["bytes_per_token"] = traced(lambda: list(make(text))) / tokens
+        stages[f"lex/{engine}"] = stage
+    return stages
+
+
+def parser_project(text: str, repeat: int) -> Dict[str, Stage]:
+    # parser/src: PLY con la evaluación (SDT) durante el análisis, una
+    # sentencia por llamada, como en su main.py; lo que imprime se descarta
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        from lexer import lexer
+        from parser import parser
+
+        mb = len(text.encode("utf-8")) / (1024 * 1024)
+        lines = [line for line in text.splitlines() if line.strip()]
+
+        def tokens() -> list:
+            lexer.input(text)
+            return list(iter(lexer.token, None))
+
+        def parse() -> None:
+            for line in lines:
+                parser.parse(line, lexer=lexer)
+
+        count = len(tokens())
+        lex = rate(best(tokens, repeat), count, "tokens", mb)
+        lex["tokens"] = count
+        lex["bytes_per_token"] = traced(tokens) / count
+        stages = {"lex": lex}
+        stages["parse"] = rate(best(parse, repeat), len(lines), "statements", mb)
+        stages["parse"]["statements"] = len(lines)
+    return stages
+
+
+def compiler_project(text: str, repeat: int) -> Dict[str, Stage]:
+    # compiler/src: lexer, los dos parsers (con el AST de objetos y con el
+    # arena) y cada forma de ejecución, sin los cachés de tablas ni de AST
+    import parser as ply_parser
+    import rdparser
+    from ast_nodes import ExecutionContext
+    from lexer import new_lexer
+    from output import DiscardSink
+
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    ply_parser.get_parser()
+
+    def tokens() -> list:
+        lexer = new_lexer()
+        lexer.input(text)
+        return list(iter(lexer.token, None))
+
+    count = len(tokens())
+    lex = rate(best(tokens, repeat), count, "tokens", mb)
+    lex["tokens"] = count
+    lex["bytes_per_token"] = traced(tokens) / count
+    stages = {"lex": lex}
+
+    nodes = len(ply_parser.parse_arena(text))
+    program = ply_parser.parse_source(text)
+    statements = len(program.statements)
+    for name, parse in (
+        ("parse/ply", ply_parser.parse_source),
+        ("parse/rd", rdparser.parse_source),
+        ("parse/rd-arena", rdparser.parse_arena),
+    ):
+        stage = rate(best(lambda: parse(text), repeat), statements, "statements", mb)
+        stage["nodes_per_s"] = nodes / stage["seconds"]
+        stage["bytes_per_node"] = traced(lambda: parse(text)) / nodes
+        stages[name] = stage
+    stages["parse/ply"]["statements"] = statements
+    stages["parse/ply"]["nodes"] = nodes
+
+    def runner(mode: str) -> Callable[[], None]:
+        # Traducir y ejecutar, como lo paga una corrida de compiler.py
+        def run() -> None:
+            ctx = ExecutionContext(out=DiscardSink())
+            if mode == "closure":
+                import closures
+                closures.compile_program(program)(ctx)
+            elif mode == "vm":
+                import bytecode
+                bytecode.run(bytecode.compile_program(program), ctx)
+            elif mode == "python":
+                import transpile
+                transpile.compile_program(program, "<bench>")(ctx)
+            else:
+                program.execute(ctx)
+        return run
+
+    for mode in ("tree", "closure", "vm", "python"):
+        stages[f"execute/{mode}"] = rate(best(runner(mode), repeat), statements, "statements", mb)
+    return stages
+
+
+MEASURE = {
+    "lexer": lexer_project,
+    "parser": parser_project,
+    "compiler": compiler_project,
+}
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="mide un proyecto sobre un programa (JSON en stdout)")
+    p.add_argument("project", choices=sorted(PROJECTS))
+    p.add_argument("file", help="programa a medir")
+    p.add_argument("-r", dest="repeat", type=int, default=3, help="repeticiones (se toma la mejor)")
+    args = p.parse_args()
+
+    sys.path.insert(0, PROJECTS[args.project])
+    with open(args.file, "r", encoding="utf-8") as fh:
+        source = fh.read()
+    json.dump(MEASURE[args.project](source, args.repeat), sys.stdout)
+    print()
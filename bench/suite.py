@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from generate import SHAPES, generate
+from measure import PROJECTS, ROOT
+
+# Suite de benchmarks de los tres proyectos: genera un programa por forma
+# (ver generate.py), mide cada proyecto sobre cada uno en un proceso aparte
+# (measure.py) y el tiempo de arranque de cada etapa, y guarda todo en un
+# JSON. Con --compare se compara contra otra corrida y se marcan las
+# regresiones.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Código que paga el arranque de cada etapa, corrido con `python -c` en la
+# carpeta del proyecto. La ejecución de compiler/src es una corrida
+# completa de compiler.py sobre un programa de una línea.
+STARTUP = {
+    "lexer": {
+        "lex": "import lexer; lexer.ENGINES['regex']('x')",
+    },
+    "parser": {
+        "lex": "import lexer",
+        "parse": "import parser",
+    },
+    "compiler": {
+        "lex": "import lexer; lexer.get_lexer()",
+        "parse": "import parser; parser.get_parser()",
+        "execute": None,
+    },
+}
+
+# Métricas que se comparan y si es mejor que suban o que bajen
+HIGHER = ("_per_s",)
+LOWER = ("bytes_per_token", "bytes_per_node", "_ms")
+
+
+def run_startup(command: List[str], cwd: str, repeat: int) -> float:
+    # Milisegundos del mejor arranque; la primera corrida (que compila .pyc
+    # y llena los cachés de tablas) no cuenta
+    best = float("inf")
+    for i in range(repeat + 1):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        if i:
+            best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def measure_startup(projects: List[str], repeat: int, tmp: str) -> Dict[str, Any]:
+    tiny = os.path.join(tmp, "tiny.src")
+    with open(tiny, "w", encoding="utf-8") as fh:
+        fh.write("int x = 1;\nprint(x);\n")
+    python = sys.executable
+    result: Dict[str, Any] = {"python": run_startup([python, "-c", "pass"], HERE, repeat)}
+    for project in projects:
+        stages = {}
+        for stage, code in STARTUP[project].items():
+            if code is None:
+                command = [python, "compiler.py", tiny, "--no-cache"]
+            else:
+                command = [python, "-c", code]
+            stages[stage] = run_startup(command, PROJECTS[project], repeat)
+        result[project] = stages
+    return result
+
+
+def measure_project(project: str, path: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    done = subprocess.run(
+        [sys.executable, os.path.join(HERE, "measure.py"), project, path, "-r", str(repeat)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    if done.returncode != 0:
+        raise RuntimeError(f"{project} failed on {path}:\n{done.stderr}")
+    return json.loads(done.stdout)
+
+
+def git_commit() -> str | None:
+    try:
+        done = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+    except OSError:
+        return None
+    return done.stdout.strip() or None
+
+
+def headline(stage: Dict[str, float]) -> str:
+    parts = [f"{stage[k]:>12,.0f} {k[:-6]}/s" for k in stage if k.endswith("_per_s") and k != "mb_per_s"]
+    parts += [f"{stage[k]:7.1f} {k.replace('_', ' ')}" for k in stage if k.startswith("bytes_per_")]
+    return "  ".join(parts)
+
+
+def flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + " "))
+        elif isinstance(value, (int, float)):
+            flat[path] = float(value)
+    return flat
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> Tuple[List[str], int]:
+    # Líneas del reporte y número de regresiones (cambios en la dirección
+    # mala de más de `threshold`)
+    now = flatten({"startup_ms": current["startup_ms"], **current["results"]})
+    before = flatten({"startup_ms": baseline["startup_ms"], **baseline["results"]})
+    lines = []
+    regressions = 0
+    for key in sorted(now.keys() & before.keys()):
+        if key.endswith(HIGHER) and not key.endswith("mb_per_s"):
+            better = now[key] >= before[key]
+        elif key.endswith(LOWER) or key.startswith("startup_ms"):
+            better = now[key] <= before[key]
+        else:
+            continue
+        if before[key] == 0:
+            continue
+        change = now[key] / before[key] - 1
+        if abs(change) < threshold:
+            continue
+        mark = "" if better else "  <-- regression"
+        regressions += not better
+        lines.append(f"  {key:<60} {before[key]:>14,.1f} -> {now[key]:>14,.1f} ({change:+.0%}){mark}")
+    for key in ("statements", "seed"):
+        if current["meta"].get(key) != baseline["meta"].get(key):
+            lines.append(f"  note: {key} differs ({baseline['meta'].get(key)} -> {current['meta'].get(key)})")
+    return lines, regressions
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="benchmarks de lexer/, parser/src y compiler/src")
+    p.add_argument("-n", dest="n", type=int, default=20_000, help="sentencias de cada programa generado")
+    p.add_argument("-s", dest="seed", type=int, default=0, help="semilla del generador")
+    p.add_argument("-k", dest="shapes", nargs="+", choices=SHAPES, default=list(SHAPES), help="formas de programa")
+    p.add_argument("-p", dest="projects", nargs="+", choices=sorted(PROJECTS), default=sorted(PROJECTS),
+                   help="proyectos a medir")
+    p.add_argument("-r", dest="repeat", type=int, default=3, help="repeticiones (se toma la mejor)")
+    p.add_argument("-o", dest="out", help="archivo JSON de resultados (por defecto, results/<fecha>.json)")
+    p.add_argument("-c", "--compare", dest="baseline", help="JSON de una corrida anterior para comparar")
+    p.add_argument("-t", dest="threshold", type=float, default=0.10,
+                   help="cambio relativo que se reporta al comparar (por defecto, 0.10)")
+    args = p.parse_args()
+
+    results: Dict[str, Dict[str, Any]] = {project: {} for project in args.projects}
+    with tempfile.TemporaryDirectory() as tmp:
+        print("startup:")
+        startup = measure_startup(args.projects, args.repeat, tmp)
+        print(f"  {'python':<22}{startup['python']:8.1f} ms")
+        for project in args.projects:
+            for stage, ms in startup[project].items():
+                print(f"  {project + ' ' + stage:<22}{ms:8.1f} ms")
+
+        for shape in args.shapes:
+            path = os.path.join(tmp, f"{shape}.src")
+            text = generate(args.n, shape, args.seed)
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write(text)
+            print(f"\n{shape}: {args.n} statements, {len(text) / 1024:.0f} KB")
+            for project in args.projects:
+                stages = results[project][shape] = measure_project(project, path, args.repeat)
+                for name, stage in stages.items():
+                    print(f"  {project + ' ' + name:<26}{headline(stage)}")
+
+    data = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "statements": args.n,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "startup_ms": startup,
+        "results": results,
+    }
+    out = args.out or os.path.join(HERE, "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2)
+        fh.write("\n")
+    print(f"\nresults: {out}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        lines, regressions = compare(data, baseline, args.threshold)
+        print(f"\ncompared with {args.baseline} (changes over {args.threshold:.0%}):")
+        print("\n".join(lines) if lines else "  no changes")
+        if regressions:
+            print(f"{regressions} regressions")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from array import array
+from typing import Any, Dict, Iterator, List, Tuple
+
+from ast_nodes import (
+    Assign,
+    BasicType,
+    BinOp,
+    Compare,
+    ExecutionContext,
+    If,
+    Literal,
+    Print,
+    Program,
+    Statement,
+    UnaryOp,
+    Var,
+    VarDecl,
+    While,
+)
+
+# Tipos de nodo en Arena.kinds
+VAR_DECL = 0
+ASSIGN = 1
+PRINT = 2
+LITERAL = 3
+VAR = 4
+BINOP = 5
+UNARY = 6
+COMPARE = 7
+IF = 8
+WHILE = 9
+
+OPS = ('+', '-', '*', '/', '==', '!=', '<', '<=', '>', '>=')
+_OP_CODES = {op: i for i, op in enumerate(OPS)}
+TYPES = tuple(BasicType)
+_TYPE_CODES = {t: i for i, t in enumerate(TYPES)}
+
+
+class Arena:
+    # AST guardado como columnas (struct of arrays): el nodo i es
+    # (kinds[i], positions[i], args[i], lefts[i], rights[i]). Según el tipo:
+    #
+    #   VAR_DECL  arg = nombre   left = expr      right = tipo
+    #   ASSIGN    arg = nombre   left = expr
+    #   PRINT                    left = expr
+    #   LITERAL   arg = const                     right = tipo
+    #   VAR       arg = nombre
+    #   BINOP     arg = op       left = izq       right = der
+    #   UNARY     arg = op       left = operando
+    #   COMPARE   arg = op       left = izq       right = der
+    #   IF        arg = bloque   left = cond      right = bloque del else
+    #   WHILE     arg = bloque   left = cond
+    #
+    # Los nombres y las constantes se guardan una sola vez en `names` y
+    # `consts`, y las sentencias de cada bloque en `blocks`. Un nodo ocupa
+    # 17 bytes en lugar de un objeto por nodo.
+    #
+    # Tiene los mismos métodos de construcción que parser.TreeBuilder, así
+    # que las acciones del parser escriben aquí directamente (parse_arena).
+
+    def __init__(self) -> None:
+        self.kinds = array("B")
+        self.positions = array("i")
+        self.args = array("i")
+        self.lefts = array("i")
+        self.rights = array("i")
+        self.statements = array("i")
+        self.blocks: List[array] = []
+        self.pos = 0
+        self.names: List[str] = []
+        self.consts: List[Any] = []
+        self._name_index: Dict[str, int] = {}
+        self._const_index: Dict[Tuple[type, Any], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def _add(self, kind: int, pos: int, arg: int = 0, left: int = -1, right: int = -1) -> int:
+        self.kinds.append(kind)
+        self.positions.append(pos)
+        self.args.append(arg)
+        self.lefts.append(left)
+        self.rights.append(right)
+        return len(self.kinds) - 1
+
+    def _name(self, name: str) -> int:
+        index = self._name_index.get(name)
+        if index is None:
+            index = self._name_index[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def _const(self, value: Any) -> int:
+        # 1 y 1.0 (o 0.0 y -0.0) son iguales como llaves de dict
+        key = (float, value.hex()) if isinstance(value, float) else (type(value), value)
+        index = self._const_index.get(key)
+        if index is None:
+            index = self._const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return index
+
+    # Construcción, con los mismos argumentos que los nodos
+
+    def var_decl(self, pos: int, name: str, var_type: BasicType, expr: int) -> int:
+        return self._add(VAR_DECL, pos, self._name(name), expr, _TYPE_CODES[var_type])
+
+    def assign(self, pos: int, name: str, expr: int) -> int:
+        return self._add(ASSIGN, pos, self._name(name), expr)
+
+    def print_(self, pos: int, expr: int) -> int:
+        return self._add(PRINT, pos, 0, expr)
+
+    def literal(self, pos: int, value: Any, lit_type: BasicType) -> int:
+        return self._add(LITERAL, pos, self._const(value), -1, _TYPE_CODES[lit_type])
+
+    def var(self, pos: int, name: str) -> int:
+        return self._add(VAR, pos, self._name(name))
+
+    def binop(self, pos: int, op: str, left: int, right: int) -> int:
+        return self._add(BINOP, pos, _OP_CODES[op], left, right)
+
+    def unary(self, pos: int, op: str, operand: int) -> int:
+        return self._add(UNARY, pos, _OP_CODES[op], operand)
+
+    def compare(self, pos: int, op: str, left: int, right: int) -> int:
+        return self._add(COMPARE, pos, _OP_CODES[op], left, right)
+
+    def _block(self, items: array) -> int:
+        self.blocks.append(items)
+        return len(self.blocks) - 1
+
+    def if_(self, pos: int, cond: int, then_body: array, else_body: array) -> int:
+        return self._add(IF, pos, self._block(then_body), cond, self._block(else_body))
+
+    def while_(self, pos: int, cond: int, body: array) -> int:
+        return self._add(WHILE, pos, self._block(body), cond)
+
+    def stmt_list(self) -> array:
+        return self.statements
+
+    def block(self) -> array:
+        return array("i")
+
+    def program(self, statements: array) -> Arena:
+        self.pos = self.positions[statements[0]] if statements else 0
+        return self
+
+    # Vistas: los nodos de siempre, creados sólo cuando se piden
+
+    def node(self, i: int) -> Any:
+        kind = self.kinds[i]
+        pos = self.positions[i]
+        arg = self.args[i]
+        if kind == LITERAL:
+            return Literal(pos, self.consts[arg], TYPES[self.rights[i]])
+        if kind == VAR:
+            return Var(pos, self.names[arg])
+        if kind == BINOP:
+            return BinOp(pos, OPS[arg], self.node(self.lefts[i]), self.node(self.rights[i]))
+        if kind == UNARY:
+            return UnaryOp(pos, OPS[arg], self.node(self.lefts[i]))
+        if kind == VAR_DECL:
+            return VarDecl(pos, self.names[arg], TYPES[self.rights[i]], self.node(self.lefts[i]))
+        if kind == ASSIGN:
+            return Assign(pos, self.names[arg], self.node(self.lefts[i]))
+        if kind == PRINT:
+            return Print(pos, self.node(self.lefts[i]))
+        if kind == COMPARE:
+            return Compare(pos, OPS[arg], self.node(self.lefts[i]), self.node(self.rights[i]))
+        if kind == IF:
+            return If(pos, self.node(self.lefts[i]), self._nodes(arg), self._nodes(self.rights[i]))
+        if kind == WHILE:
+            return While(pos, self.node(self.lefts[i]), self._nodes(arg))
+        raise ValueError(f"unknown node kind {kind}")
+
+    def _nodes(self, block: int) -> List[Statement]:
+        return [self.node(j) for j in self.blocks[block]]
+
+    def iter_statements(self) -> Iterator[Statement]:
+        # Una sentencia a la vez: sólo los nodos de la sentencia actual
+        # existen como objetos
+        for i in self.statements:
+            yield self.node(i)
+
+    def to_program(self) -> Program:
+        return Program(self.pos, list(self.iter_statements()))
+
+    def execute(self, ctx: ExecutionContext) -> None:
+        for stmt in self.iter_statements():
+            stmt.execute(ctx)
+
+    def nbytes(self) -> int:
+        # Memoria de las columnas (sin contar nombres y constantes)
+        columns = (self.kinds, self.positions, self.args, self.lefts, self.rights, self.statements, *self.blocks)
+        return sum(len(c) * c.itemsize for c in columns)
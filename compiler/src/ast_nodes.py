@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import operator
+import re
+from array import array
+from bisect import bisect_right
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from output import OutputSink, StdoutSink
 
 
 class BasicType(Enum):
@@ -11,14 +17,87 @@ class BasicType(Enum):
     STRING = "string"
 
 
+class LineIndex:
+    # Desplazamiento en el código fuente -> línea y columna (desde 1). La
+    # tabla con el inicio de cada línea se arma la primera vez que se
+    # consulta y cada consulta es una búsqueda binaria: mientras no haya un
+    # error que reportar no cuesta nada.
+    #
+    # Con --stream el texto no se guarda: ChunkLexer agrega los inicios de
+    # línea de cada trozo con feed().
+    __slots__ = ("text", "starts", "end")
+
+    def __init__(self, text: str = "") -> None:
+        self.text = text
+        self.starts: Optional[array] = None
+        self.end = 0
+
+    def table(self) -> array:
+        if self.starts is None:
+            self.starts = array("q", [0])
+            self.starts.extend(m.end() for m in _NEWLINE.finditer(self.text))
+            self.end = len(self.text)
+        return self.starts
+
+    def feed(self, chunk: str) -> None:
+        starts = self.table()
+        end = self.end
+        starts.extend(end + m.end() for m in _NEWLINE.finditer(chunk))
+        self.end = end + len(chunk)
+
+    def locate(self, pos: int) -> Tuple[int, int]:
+        starts = self.table()
+        line = bisect_right(starts, pos)
+        return line, pos - starts[line - 1] + 1
+
+    def line(self, pos: int) -> int:
+        return bisect_right(self.table(), pos)
+
+
+_NEWLINE = re.compile("\n")
+
+
 @dataclass
 class CompileError(Exception):
-    line: int
+    # Desplazamiento del error en el código fuente. La línea y la columna
+    # se calculan al formatearlo, con el índice que le pone (located) quien
+    # tiene el texto.
+    pos: int
     message: str
+    source: Optional[LineIndex] = field(default=None, repr=False, compare=False)
+
+    def located(self, source: LineIndex) -> CompileError:
+        if self.source is None:
+            self.source = source
+        return self
+
+    @property
+    def line(self) -> int:
+        return self.source.line(self.pos) if self.source is not None else 0
 
     def __str__(self) -> str:
         # Estilo requerido: "error in line n ..."
-        return f"error in line {self.line}: {self.message}"
+        if self.source is None:
+            return f"error at offset {self.pos}: {self.message}"
+        line, column = self.source.locate(self.pos)
+        return f"error in line {line}, column {column}: {self.message}"
+
+
+NUMERIC_TYPES = (BasicType.INT, BasicType.FLOAT)
+
+
+def assignment_error(var_type: BasicType, value_type: BasicType, name: str) -> Optional[str]:
+    # Mismas reglas que VarDecl.execute y ExecutionContext.assign, para los
+    # modos que resuelven los tipos antes de ejecutar
+    if var_type == BasicType.INT:
+        if value_type == BasicType.FLOAT:
+            return f"cannot assign float to int variable '{name}'"
+        if value_type != BasicType.INT:
+            return f"cannot assign non-numeric value to int variable '{name}'"
+    elif var_type == BasicType.FLOAT:
+        if value_type not in NUMERIC_TYPES:
+            return f"cannot assign non-numeric value to float variable '{name}'"
+    return None
 
 
 @dataclass
@@ -31,123 +110,195 @@ class VarInfo:
 @dataclass
 class ExecutionContext:
     symbols: Dict[str, VarInfo] = field(default_factory=dict)
+    # Valores por slot para los programas resueltos por semantic.analyze
+    # (execute_checked), en lugar de un VarInfo por variable en symbols
+    slots: List[Any] = field(default_factory=list)
+    # A dónde van los print (ver output.py); por defecto, print a stdout
+    out: OutputSink = field(default_factory=StdoutSink)
 
-    def declare(self, name: str, var_type: BasicType, value: Any, line: int) -> None:
+    def declare(self, name: str, var_type: BasicType, value: Any, pos: int) -> None:
         if name in self.symbols:
-            raise CompileError(line, f"variable '{name}' already declared")
+            raise CompileError(pos, f"variable '{name}' already declared")
         self.symbols[name] = VarInfo(name, var_type, value)
 
-    def assign(self, name: str, value: Any, value_type: BasicType, line: int) -> None:
+    def assign(self, name: str, value: Any, value_type: BasicType, pos: int) -> None:
         if name not in self.symbols:
-            raise CompileError(line, f"variable '{name}' not declared")
+            raise CompileError(pos, f"variable '{name}' not declared")
         var = self.symbols[name]
 
         if var.type == BasicType.INT:
             if value_type == BasicType.FLOAT:
-                raise CompileError(line, f"cannot assign float to int variable '{name}'")
+                raise CompileError(pos, f"cannot assign float to int variable '{name}'")
             if value_type != BasicType.INT:
-                raise CompileError(line, f"cannot assign non-numeric value to int variable '{name}'")
+                raise CompileError(pos, f"cannot assign non-numeric value to int variable '{name}'")
             var.value = int(value)
         elif var.type == BasicType.FLOAT:
             if value_type not in (BasicType.INT, BasicType.FLOAT):
-                raise CompileError(line, f"cannot assign non-numeric value to float variable '{name}'")
+                raise CompileError(pos, f"cannot assign non-numeric value to float variable '{name}'")
             var.value = float(value)
         else:
             var.value = value
 
-    def lookup(self, name: str, line: int) -> VarInfo:
+    def lookup(self, name: str, pos: int) -> VarInfo:
         if name not in self.symbols:
-            raise CompileError(line, f"variable '{name}' not declared")
+            raise CompileError(pos, f"variable '{name}' not declared")
         return self.symbols[name]
 
-@dataclass
+# Los nodos usan __slots__: sin un __dict__ por objeto, un programa grande
+# ocupa bastante menos memoria (ver también arena.py)
+@dataclass(slots=True)
 class Node:
-    line: int
+    # Desplazamiento del token del nodo en el código fuente (ver LineIndex)
+    pos: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Statement(Node):
     def execute(self, ctx: ExecutionContext) -> None:
         raise NotImplementedError
 
+    # Las variantes *_checked sólo sirven sobre un programa que ya pasó por
+    # semantic.analyze: los tipos ya están revisados y no se vuelven a
+    # calcular, sólo queda revisar la división entre cero. Las variables se
+    # leen y escriben por slot en ctx.slots.
+    def execute_checked(self, ctx: ExecutionContext) -> None:
+        raise NotImplementedError
 
-@dataclass
+
+@dataclass(slots=True)
 class Expr(Node):
+    # Tipo inferido por semantic.analyze (None si no se ha analizado)
+    static_type: Optional[BasicType] = field(default=None, init=False, repr=False, compare=False)
+
     def eval(self, ctx: ExecutionContext) -> Tuple[BasicType, Any]:
         raise NotImplementedError
 
-@dataclass
+    def eval_checked(self, ctx: ExecutionContext) -> Any:
+        raise NotImplementedError
+
+@dataclass(slots=True)
 class Program(Node):
     statements: List[Statement] = field(default_factory=list)
+    # (nombre, tipo) de cada slot, lo llena semantic.analyze
+    variables: List[Tuple[str, BasicType]] = field(default_factory=list, repr=False, compare=False)
+    # Las sentencias con los if/while convertidos en saltos (ver lower); se
+    # calcula al ejecutar por primera vez
+    code: Optional[List[Statement]] = field(default=None, init=False, repr=False, compare=False)
+
+    def lowered(self) -> List[Statement]:
+        if self.code is None:
+            self.code = lower(self.statements)
+        return self.code
 
     def execute(self, ctx: ExecutionContext) -> None:
-        for stmt in self.statements:
-            stmt.execute(ctx)
+        code = self.lowered()
+        if code is self.statements:
+            # Sin if ni while: código lineal
+            for stmt in code:
+                stmt.execute(ctx)
+        else:
+            run_code(code, ctx)
+
+    def execute_checked(self, ctx: ExecutionContext) -> None:
+        ctx.slots = [None] * len(self.variables)
+        code = self.lowered()
+        if code is self.statements:
+            for stmt in code:
+                stmt.execute_checked(ctx)
+        else:
+            run_code_checked(code, ctx)
 
 
-@dataclass
+@dataclass(slots=True)
 class VarDecl(Statement):
     name: str
     var_type: BasicType
     expr: Expr
+    slot: int = field(default=-1, init=False, repr=False, compare=False)
 
     def execute(self, ctx: ExecutionContext) -> None:
         expr_type, expr_val = self.expr.eval(ctx)
 
         if self.var_type == BasicType.INT:
             if expr_type == BasicType.FLOAT:
-                raise CompileError(self.line, f"cannot assign float to int variable '{self.name}'")
+                raise CompileError(self.pos, f"cannot assign float to int variable '{self.name}'")
             if expr_type != BasicType.INT:
-                raise CompileError(self.line, f"cannot assign non-numeric value to int variable '{self.name}'")
+                raise CompileError(self.pos, f"cannot assign non-numeric value to int variable '{self.name}'")
             value = int(expr_val)
         elif self.var_type == BasicType.FLOAT:
             if expr_type not in (BasicType.INT, BasicType.FLOAT):
-                raise CompileError(self.line, f"cannot assign non-numeric value to float variable '{self.name}'")
+                raise CompileError(self.pos, f"cannot assign non-numeric value to float variable '{self.name}'")
             value = float(expr_val)
         else:
             value = expr_val
 
-        ctx.declare(self.name, self.var_type, value, self.line)
+        ctx.declare(self.name, self.var_type, value, self.pos)
 
+    def execute_checked(self, ctx: ExecutionContext) -> None:
+        value = self.expr.eval_checked(ctx)
+        if self.var_type == BasicType.FLOAT:
+            value = float(value)
+        ctx.slots[self.slot] = value
 
-@dataclass
+
+@dataclass(slots=True)
 class Assign(Statement):
     name: str
     expr: Expr
+    slot: int = field(default=-1, init=False, repr=False, compare=False)
+    var_type: Optional[BasicType] = field(default=None, init=False, repr=False, compare=False)
 
     def execute(self, ctx: ExecutionContext) -> None:
         expr_type, expr_val = self.expr.eval(ctx)
-        ctx.assign(self.name, expr_val, expr_type, self.line)
+        ctx.assign(self.name, expr_val, expr_type, self.pos)
 
+    def execute_checked(self, ctx: ExecutionContext) -> None:
+        value = self.expr.eval_checked(ctx)
+        if self.var_type == BasicType.FLOAT:
+            value = float(value)
+        ctx.slots[self.slot] = value
 
-@dataclass
+
+@dataclass(slots=True)
 class Print(Statement):
     expr: Expr
 
     def execute(self, ctx: ExecutionContext) -> None:
         expr_type, expr_val = self.expr.eval(ctx)
         # Para el proyecto basta con imprimir el valor crudo
-        print(expr_val)
+        ctx.out.write(expr_val)
 
-@dataclass
+    def execute_checked(self, ctx: ExecutionContext) -> None:
+        ctx.out.write(self.expr.eval_checked(ctx))
+
+@dataclass(slots=True)
 class Literal(Expr):
+    # Objeto del pool de constantes del lexer: literales iguales de un
+    # mismo programa comparten el mismo valor
     value: Any
     lit_type: BasicType
 
     def eval(self, ctx: ExecutionContext) -> Tuple[BasicType, Any]:
         return self.lit_type, self.value
 
+    def eval_checked(self, ctx: ExecutionContext) -> Any:
+        return self.value
 
-@dataclass
+
+@dataclass(slots=True)
 class Var(Expr):
     name: str
+    slot: int = field(default=-1, init=False, repr=False, compare=False)
 
     def eval(self, ctx: ExecutionContext) -> Tuple[BasicType, Any]:
-        var = ctx.lookup(self.name, self.line)
+        var = ctx.lookup(self.name, self.pos)
         return var.type, var.value
 
+    def eval_checked(self, ctx: ExecutionContext) -> Any:
+        return ctx.slots[self.slot]
 
-@dataclass
+
+@dataclass(slots=True)
 class BinOp(Expr):
     op: str
     left: Expr
@@ -158,11 +309,11 @@ class BinOp(Expr):
         rt, rv = self.right.eval(ctx)
 
         if lt not in (BasicType.INT, BasicType.FLOAT) or rt not in (BasicType.INT, BasicType.FLOAT):
-            raise CompileError(self.line, f"binary operator '{self.op}' not supported for non-numeric types")
+            raise CompileError(self.pos, f"binary operator '{self.op}' not supported for non-numeric types")
 
         if self.op == '/':
             if rv == 0:
-                raise CompileError(self.line, "division by zero")
+                raise CompileError(self.pos, "division by zero")
             result_type = BasicType.FLOAT
             result_val = float(lv) / float(rv)
         else:
@@ -174,7 +325,7 @@ class BinOp(Expr):
             elif self.op == '*':
                 result_val = lv * rv
             else:
-                raise CompileError(self.line, f"unknown binary operator '{self.op}'")
+                raise CompileError(self.pos, f"unknown binary operator '{self.op}'")
 
             if result_type == BasicType.INT:
                 result_val = int(result_val)
@@ -183,8 +334,24 @@ class BinOp(Expr):
 
         return result_type, result_val
 
-
-@dataclass
+    def eval_checked(self, ctx: ExecutionContext) -> Any:
+        # int op int ya es int y cualquier operación con un float ya es
+        # float, así que no hacen falta las conversiones de eval
+        lv = self.left.eval_checked(ctx)
+        rv = self.right.eval_checked(ctx)
+        op = self.op
+        if op == '+':
+            return lv + rv
+        if op == '-':
+            return lv - rv
+        if op == '*':
+            return lv * rv
+        if rv == 0:
+            raise CompileError(self.pos, "division by zero")
+        return float(lv) / float(rv)
+
+
+@dataclass(slots=True)
 class UnaryOp(Expr):
     op: str
     operand: Expr
@@ -192,9 +359,148 @@ class UnaryOp(Expr):
     def eval(self, ctx: ExecutionContext) -> Tuple[BasicType, Any]:
         t, v = self.operand.eval(ctx)
         if t not in (BasicType.INT, BasicType.FLOAT):
-            raise CompileError(self.line, f"unary operator '{self.op}' not supported for non-numeric type")
+            raise CompileError(self.pos, f"unary operator '{self.op}' not supported for non-numeric type")
         if self.op == '-':
             v = -v
         else:
-            raise CompileError(self.line, f"unknown unary operator '{self.op}'")
+            raise CompileError(self.pos, f"unknown unary operator '{self.op}'")
         return t, v
+
+    def eval_checked(self, ctx: ExecutionContext) -> Any:
+        return -self.operand.eval_checked(ctx)
+
+
+# Operadores de comparación; el resultado es el int 1 o 0
+COMPARISONS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+@dataclass(slots=True)
+class Compare(Expr):
+    op: str
+    left: Expr
+    right: Expr
+
+    def eval(self, ctx: ExecutionContext) -> Tuple[BasicType, Any]:
+        lt, lv = self.left.eval(ctx)
+        rt, rv = self.right.eval(ctx)
+        if lt not in NUMERIC_TYPES or rt not in NUMERIC_TYPES:
+            raise CompileError(self.pos, f"comparison operator '{self.op}' not supported for non-numeric types")
+        compare = COMPARISONS.get(self.op)
+        if compare is None:
+            raise CompileError(self.pos, f"unknown comparison operator '{self.op}'")
+        return BasicType.INT, 1 if compare(lv, rv) else 0
+
+    def eval_checked(self, ctx: ExecutionContext) -> Any:
+        lv = self.left.eval_checked(ctx)
+        rv = self.right.eval_checked(ctx)
+        return 1 if COMPARISONS[self.op](lv, rv) else 0
+
+
+# if y while. Las declaraciones sólo van fuera de los bloques (el parser lo
+# revisa), así que las variables que existen en cada sentencia siguen
+# siendo las declaradas antes en el texto, como en el código lineal.
+#
+# Program.execute no los recorre: lower() los convierte en saltos sobre una
+# lista plana de sentencias y cada vuelta de un ciclo sólo avanza un índice.
+# Su propio execute (una sentencia suelta, como en --stream) hace lo mismo
+# con la sentencia sola.
+
+@dataclass(slots=True)
+class If(Statement):
+    cond: Expr
+    then_body: List[Statement]
+    else_body: List[Statement] = field(default_factory=list)
+
+    def execute(self, ctx: ExecutionContext) -> None:
+        run_code(lower([self]), ctx)
+
+    def execute_checked(self, ctx: ExecutionContext) -> None:
+        run_code_checked(lower([self]), ctx)
+
+
+@dataclass(slots=True)
+class While(Statement):
+    cond: Expr
+    body: List[Statement]
+
+    def execute(self, ctx: ExecutionContext) -> None:
+        run_code(lower([self]), ctx)
+
+    def execute_checked(self, ctx: ExecutionContext) -> None:
+        run_code_checked(lower([self]), ctx)
+
+
+# Saltos del código que genera lower(). execute devuelve cuántas sentencias
+# avanzar (None es 1, la siguiente).
+
+@dataclass(slots=True)
+class JumpUnless(Statement):
+    cond: Expr
+    offset: int
+
+    def execute(self, ctx: ExecutionContext) -> Optional[int]:
+        _, value = self.cond.eval(ctx)
+        return None if value else self.offset
+
+    def execute_checked(self, ctx: ExecutionContext) -> Optional[int]:
+        return None if self.cond.eval_checked(ctx) else self.offset
+
+
+@dataclass(slots=True)
+class Jump(Statement):
+    offset: int
+
+    def execute(self, ctx: ExecutionContext) -> int:
+        return self.offset
+
+    def execute_checked(self, ctx: ExecutionContext) -> int:
+        return self.offset
+
+
+def lower(statements: List[Statement]) -> List[Statement]:
+    # Código plano equivalente a `statements`; la misma lista si no tiene
+    # ningún if ni while
+    if not any(isinstance(stmt, (If, While)) for stmt in statements):
+        return statements
+    code: List[Statement] = []
+    for stmt in statements:
+        if isinstance(stmt, If):
+            then_code = lower(stmt.then_body)
+            else_code = lower(stmt.else_body)
+            if else_code:
+                code.append(JumpUnless(stmt.pos, stmt.cond, len(then_code) + 2))
+                code.extend(then_code)
+                code.append(Jump(stmt.pos, len(else_code) + 1))
+                code.extend(else_code)
+            else:
+                code.append(JumpUnless(stmt.pos, stmt.cond, len(then_code) + 1))
+                code.extend(then_code)
+        elif isinstance(stmt, While):
+            body = lower(stmt.body)
+            code.append(JumpUnless(stmt.pos, stmt.cond, len(body) + 2))
+            code.extend(body)
+            code.append(Jump(stmt.pos, -len(body) - 1))
+        else:
+            code.append(stmt)
+    return code
+
+
+def run_code(code: List[Statement], ctx: ExecutionContext) -> None:
+    pc = 0
+    end = len(code)
+    while pc < end:
+        pc += code[pc].execute(ctx) or 1
+
+
+def run_code_checked(code: List[Statement], ctx: ExecutionContext) -> None:
+    pc = 0
+    end = len(code)
+    while pc < end:
+        pc += code[pc].execute_checked(ctx) or 1
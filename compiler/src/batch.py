@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import contextlib
+import glob
+import io
+import os
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from output import DEFAULT_BUFFER, make_sink
+
+# Caracteres que hacen que un argumento se trate como patrón de glob
+GLOB_CHARS = "*?["
+
+
+@dataclass
+class FileResult:
+    path: str
+    output: str
+    error: Optional[str]     # texto del CompileError (u otro error), None si terminó bien
+    seconds: float
+
+
+@dataclass
+class BatchOptions:
+    # Los mismos parámetros de compile_and_run, iguales para todo el lote
+    mode: str = "tree"
+    emit: Optional[str] = None
+    optimize: bool = False
+    cache: bool = True
+    output: str = "buffer"
+    buffer_size: int = DEFAULT_BUFFER
+    parser: str = "ply"
+
+
+# Opciones del lote, fijadas una vez por proceso en _init_worker
+_options = BatchOptions()
+
+
+def expand_inputs(args: Iterable[str]) -> List[str]:
+    # Cada argumento puede ser un archivo, un patrón de glob o @lista (un
+    # archivo con una entrada por línea, que a su vez puede ser un patrón).
+    # Se respeta el orden de los argumentos; un glob se expande ordenado.
+    paths: List[str] = []
+    for arg in args:
+        if arg.startswith("@"):
+            try:
+                listing = _read_list(arg)
+            except (OSError, UnicodeDecodeError):
+                # Una lista que no se puede leer queda como entrada: run_file
+                # la reporta como fallo sin detener el resto del lote
+                paths.append(arg)
+                continue
+            entries = [line.strip() for line in listing.splitlines()]
+            paths.extend(expand_inputs(e for e in entries if e and not e.startswith("#")))
+        elif any(c in arg for c in GLOB_CHARS):
+            paths.extend(sorted(glob.glob(arg, recursive=True)))
+        else:
+            # Un archivo que no existe se reporta como fallo de ese archivo
+            paths.append(arg)
+    return paths
+
+
+def _read_list(arg: str) -> str:
+    return Path(arg[1:]).read_text(encoding="utf-8")
+
+
+def is_batch(args: List[str]) -> bool:
+    return len(args) != 1 or args[0].startswith("@") or any(c in args[0] for c in GLOB_CHARS)
+
+
+def _init_worker(options: BatchOptions) -> None:
+    # Se ejecuta una vez por proceso: importa el parser y carga las tablas
+    # de PLY para que ningún archivo del lote pague ese costo
+    global _options
+    # La salida de cada archivo se captura redirigiendo sys.stdout, así que
+    # no se puede escribir directo en el descriptor
+    if options.output == "fd":
+        options = replace(options, output="buffer")
+    _options = options
+    warm_up(options.parser)
+
+
+def warm_up(parser: str = "ply") -> None:
+    # Importa el parser y carga sus tablas antes del primer programa
+    from lexer import get_lexer
+    get_lexer()
+    if parser == "ply":
+        from parser import get_parser
+        get_parser()
+    else:
+        import rdparser
+
+
+def run_file(path: str) -> FileResult:
+    from compiler import compile_and_run
+
+    options = _options
+    out = io.StringIO()
+    start = time.perf_counter()
+    error: Optional[str] = None
+    try:
+        if path.startswith("@"):
+            # Sólo queda un @lista entre las entradas si no se pudo leer
+            _read_list(path)
+        with contextlib.redirect_stdout(out):
+            failure = compile_and_run(
+                Path(path), options.mode, options.emit, options.optimize,
+                cache=options.cache, out=make_sink(options.output, options.buffer_size),
+                parser=options.parser,
+            )
+        if failure is not None:
+            error = str(failure)
+    except (OSError, UnicodeDecodeError) as e:
+        name = path[1:] if path.startswith("@") else path
+        error = f"cannot read {name}: {e.strerror if isinstance(e, OSError) else e}"
+    except RecursionError:
+        error = "program too deeply nested"
+    return FileResult(path, out.getvalue(), error, time.perf_counter() - start)
+
+
+def run_batch(
+    paths: List[str],
+    options: Optional[BatchOptions] = None,
+    jobs: Optional[int] = None,
+) -> Iterable[FileResult]:
+    # Devuelve los resultados en el orden de `paths` conforme van estando
+    # listos. Con jobs=1 (o un solo archivo) todo corre en este proceso.
+    if options is None:
+        options = BatchOptions()
+    jobs = jobs or os.cpu_count() or 1
+    jobs = min(jobs, len(paths))
+    if jobs <= 1:
+        _init_worker(options)
+        for path in paths:
+            yield run_file(path)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Los programas suelen ser pequeños: se mandan en grupos para no pagar
+    # un viaje entre procesos por archivo, pero con varios grupos por
+    # proceso para que la carga quede repartida
+    chunksize = max(1, min(64, len(paths) // (jobs * 8)))
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(options,),
+    ) as pool:
+        yield from pool.map(run_file, paths, chunksize=chunksize)
+
+
+def summary(results: List[FileResult], wall: float, jobs: int, slowest: int = 5) -> str:
+    failed = [r for r in results if r.error is not None]
+    busy = sum(r.seconds for r in results)
+    rate = len(results) / wall if wall > 0 else 0.0
+    out = [
+        "batch summary:",
+        f"  files        {len(results):>8}",
+        f"  ok           {len(results) - len(failed):>8}",
+        f"  failed       {len(failed):>8}",
+        f"  workers      {jobs:>8}",
+        f"  wall         {wall * 1000:>8.1f} ms  ({rate:.1f} files/s)",
+        f"  per file     {busy / len(results) * 1000 if results else 0.0:>8.2f} ms avg",
+    ]
+    if results:
+        out.append("  slowest:")
+        for r in sorted(results, key=lambda r: r.seconds, reverse=True)[:slowest]:
+            out.append(f"    {r.seconds * 1000:8.2f} ms  {r.path}")
+    if failed:
+        out.append("  failures:")
+        for r in failed:
+            out.append(f"    {r.path}: {r.error}")
+    return "\n".join(out)
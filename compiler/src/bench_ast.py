@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+from parser import get_parser, parse_arena, parse_source
+
+
+def generate(statements: int, seed: int) -> str:
+    # Programa válido con declaraciones, asignaciones y prints
+    rng = random.Random(seed)
+    names = [f"v{i}" for i in range(16)]
+    lines = [f"int {name} = {i};" for i, name in enumerate(names)]
+
+    def expr(depth: int = 0) -> str:
+        r = rng.random()
+        if depth > 2 or r < 0.35:
+            k = rng.random()
+            if k < 0.3:
+                return str(rng.randint(0, 999))
+            if k < 0.45:
+                return f"{rng.randint(0, 99)}.{rng.randint(0, 99)}"
+            return rng.choice(names)
+        if r < 0.45:
+            return f"-{expr(depth + 1)}"
+        if r < 0.55:
+            return f"({expr(depth + 1)})"
+        return f"{expr(depth + 1)} {rng.choice('+-*')} {expr(depth + 1)}"
+
+    while len(lines) < statements:
+        k = rng.random()
+        if k < 0.6:
+            lines.append(f"{rng.choice(names)} = {expr()};")
+        elif k < 0.95:
+            lines.append(f"print({expr()});")
+        else:
+            lines.append(f'print("s{rng.randint(0, 9)}");')
+    # Las asignaciones a int pueden recibir un float; no importa, el
+    # benchmark sólo analiza el programa
+    return "\n".join(lines) + "\n"
+
+
+def measure(parse: Callable[[str], object], text: str) -> Tuple[float, int]:
+    # Segundos del análisis y bytes que sigue ocupando el AST al terminar
+    gc.collect()
+    start = time.perf_counter()
+    ast = parse(text)
+    elapsed = time.perf_counter() - start
+    del ast
+
+    gc.collect()
+    tracemalloc.start()
+    ast = parse(text)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del ast
+    return elapsed, size
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="memoria del AST (objetos contra arena) por byte de código fuente")
+    p.add_argument("-f", dest="f", help="archivo a analizar (por defecto se genera uno)")
+    p.add_argument("-n", dest="n", type=int, default=200_000, help="sentencias del programa generado")
+    p.add_argument("-s", dest="seed", type=int, default=0, help="semilla del generador")
+    args = p.parse_args()
+
+    if args.f:
+        with open(args.f, "r", encoding="utf-8") as fh:
+            text = fh.read()
+        print(f"Input: {args.f} ({len(text) / 1024:.1f} KB)")
+    else:
+        text = generate(args.n, args.seed)
+        print(f"Input: {args.n} generated statements, seed {args.seed} ({len(text) / 1024:.1f} KB)")
+
+    # Las tablas se cargan antes para no contarlas
+    get_parser()
+    source_bytes = len(text.encode("utf-8"))
+    for name, parse in (("objects", parse_source), ("arena", parse_arena)):
+        elapsed, size = measure(parse, text)
+        print(f"\t{name:>8}: parse {elapsed:.2f}s, AST {size / (1024 * 1024):.1f} MB"
+              f" -> {size / source_bytes:.1f} AST bytes per source byte")
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+import parser as ply_parser
+import rdparser
+from bench_ast import generate
+from lexer import new_lexer
+
+
+def lex_only(text: str) -> None:
+    # Cota inferior: sólo el lexer de PLY, que usan los dos parsers
+    lexer = new_lexer()
+    lexer.input(text)
+    token = lexer.token
+    while token() is not None:
+        pass
+
+
+def measure(parse: Callable[[str], object], text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="velocidad del parser LALR de PLY contra el descendente")
+    p.add_argument("-f", dest="f", help="archivo a analizar (por defecto se genera uno)")
+    p.add_argument("-n", dest="n", type=int, default=50_000, help="sentencias del programa generado")
+    p.add_argument("-s", dest="seed", type=int, default=0, help="semilla del generador")
+    p.add_argument("-r", dest="repeat", type=int, default=3, help="repeticiones (se toma la mejor)")
+    args = p.parse_args()
+
+    if args.f:
+        with open(args.f, "r", encoding="utf-8") as fh:
+            text = fh.read()
+        print(f"Input: {args.f} ({len(text) / 1024:.1f} KB)")
+    else:
+        text = generate(args.n, args.seed)
+        print(f"Input: {args.n} generated statements, seed {args.seed} ({len(text) / 1024:.1f} KB)")
+
+    # Las tablas se cargan antes para no contarlas
+    ply_parser.get_parser()
+    statements = len(rdparser.parse_source(text).statements)
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+
+    results = {}
+    for name, parse in (("lex only", lex_only), ("ply", ply_parser.parse_source), ("rd", rdparser.parse_source)):
+        elapsed = results[name] = measure(parse, text, args.repeat)
+        print(f"\t{name:>8}: {elapsed:.2f}s -> {statements / elapsed:,.0f} statements/s, {mb / elapsed:.2f} MB/s")
+    print(f"\nrd is {results['ply'] / results['rd']:.1f}x faster than ply")
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ast_nodes import (
+    Assign,
+    BasicType,
+    BinOp,
+    COMPARISONS,
+    Compare,
+    CompileError,
+    ExecutionContext,
+    Expr,
+    If,
+    LineIndex,
+    Literal,
+    NUMERIC_TYPES,
+    Print,
+    Program,
+    Statement,
+    UnaryOp,
+    Var,
+    VarDecl,
+    VarInfo,
+    While,
+    assignment_error,
+)
+
+# Cada instrucción ocupa dos enteros en `code`: opcode y argumento
+LOAD_CONST = 0    # push consts[arg]
+LOAD_VAR = 1      # push valor de names[arg]
+STORE_VAR = 2     # pop -> names[arg]
+DECLARE = 3       # pop -> nueva variable names[arg]
+ADD_INT = 4
+ADD_FLOAT = 5
+SUB_INT = 6
+SUB_FLOAT = 7
+MUL_INT = 8
+MUL_FLOAT = 9
+DIV_FLOAT = 10    # '/' siempre da float; error si el divisor es 0
+NEG_INT = 11
+NEG_FLOAT = 12
+TO_FLOAT = 13     # convierte el tope de la pila a float
+PRINT = 14
+FAIL = 15         # CompileError con el mensaje consts[arg]
+COMPARE_EQ = 16   # comparaciones: el resultado es el int 1 o 0
+COMPARE_NE = 17
+COMPARE_LT = 18
+COMPARE_LE = 19
+COMPARE_GT = 20
+COMPARE_GE = 21
+JUMP_IF_FALSE = 22  # pop; si es 0, salta a code[arg]
+JUMP = 23         # salta a code[arg]
+
+OPNAMES = {
+    LOAD_CONST: "LOAD_CONST",
+    LOAD_VAR: "LOAD_VAR",
+    STORE_VAR: "STORE_VAR",
+    DECLARE: "DECLARE",
+    ADD_INT: "ADD_INT",
+    ADD_FLOAT: "ADD_FLOAT",
+    SUB_INT: "SUB_INT",
+    SUB_FLOAT: "SUB_FLOAT",
+    MUL_INT: "MUL_INT",
+    MUL_FLOAT: "MUL_FLOAT",
+    DIV_FLOAT: "DIV_FLOAT",
+    NEG_INT: "NEG_INT",
+    NEG_FLOAT: "NEG_FLOAT",
+    TO_FLOAT: "TO_FLOAT",
+    PRINT: "PRINT",
+    FAIL: "FAIL",
+    COMPARE_EQ: "COMPARE_EQ",
+    COMPARE_NE: "COMPARE_NE",
+    COMPARE_LT: "COMPARE_LT",
+    COMPARE_LE: "COMPARE_LE",
+    COMPARE_GT: "COMPARE_GT",
+    COMPARE_GE: "COMPARE_GE",
+    JUMP_IF_FALSE: "JUMP_IF_FALSE",
+    JUMP: "JUMP",
+}
+
+# (op, tipo del resultado) -> opcode
+BINARY_OPCODES = {
+    ('+', BasicType.INT): ADD_INT,
+    ('+', BasicType.FLOAT): ADD_FLOAT,
+    ('-', BasicType.INT): SUB_INT,
+    ('-', BasicType.FLOAT): SUB_FLOAT,
+    ('*', BasicType.INT): MUL_INT,
+    ('*', BasicType.FLOAT): MUL_FLOAT,
+    ('/', BasicType.FLOAT): DIV_FLOAT,
+}
+
+COMPARE_OPCODES = {
+    '==': COMPARE_EQ,
+    '!=': COMPARE_NE,
+    '<': COMPARE_LT,
+    '<=': COMPARE_LE,
+    '>': COMPARE_GT,
+    '>=': COMPARE_GE,
+}
+# Función de cada opcode de comparación, por opcode - COMPARE_EQ
+_COMPARE_FUNCTIONS = tuple(COMPARISONS[op] for op in COMPARE_OPCODES)
+
+
+@dataclass
+class Bytecode:
+    code: array = field(default_factory=lambda: array("i"))
+    positions: array = field(default_factory=lambda: array("i"))    # posición en el texto de cada instrucción
+    consts: List[Any] = field(default_factory=list)
+    names: List[Tuple[str, BasicType]] = field(default_factory=list)
+
+    def disassemble(self, source: Optional[LineIndex] = None) -> str:
+        # Con el índice del texto la primera columna es la línea; sin él,
+        # la posición
+        out = ["constants:"]
+        for i, value in enumerate(self.consts):
+            out.append(f"    {i:>4}  {value!r}")
+        out.append("names:")
+        for i, (name, var_type) in enumerate(self.names):
+            out.append(f"    {i:>4}  {name} ({var_type.value})")
+        out.append("code:")
+        # Las instrucciones a las que llega un salto se marcan con >>
+        targets = {self.code[pc + 1] for pc in range(0, len(self.code), 2) if self.code[pc] in (JUMP, JUMP_IF_FALSE)}
+        last_line = None
+        for pc in range(0, len(self.code), 2):
+            op, arg = self.code[pc], self.code[pc + 1]
+            pos = self.positions[pc // 2]
+            line = source.line(pos) if source is not None else pos
+            prefix = f"{line:>4}" if line != last_line else "    "
+            last_line = line
+            mark = ">>" if pc in targets else "  "
+            text = f"{prefix} {mark}{pc:>6}  {OPNAMES[op]:<13}"
+            if op in (LOAD_CONST, FAIL):
+                text += f" {arg} ({self.consts[arg]!r})"
+            elif op in (LOAD_VAR, STORE_VAR, DECLARE):
+                text += f" {arg} ({self.names[arg][0]})"
+            elif op in (JUMP, JUMP_IF_FALSE):
+                text += f" {arg}"
+            out.append(text.rstrip())
+        return "\n".join(out)
+
+
+class _Compiler:
+    def __init__(self) -> None:
+        self.bc = Bytecode()
+        self.const_index: Dict[Tuple[type, Any], int] = {}
+        self.name_index: Dict[str, int] = {}
+        # Variables declaradas hasta la sentencia actual (sólo se declaran
+        # fuera de los if/while, así que es el orden del texto)
+        self.scope: Dict[str, BasicType] = {}
+
+    def emit(self, op: int, arg: int, pos: int) -> None:
+        self.bc.code.append(op)
+        self.bc.code.append(arg)
+        self.bc.positions.append(pos)
+
+    def const(self, value: Any) -> int:
+        # 1 y 1.0 (o 0.0 y -0.0) son iguales como llaves de dict y un NaN
+        # no es igual a sí mismo: los floats van por su representación
+        key = (float, value.hex()) if isinstance(value, float) else (type(value), value)
+        if key not in self.const_index:
+            self.const_index[key] = len(self.bc.consts)
+            self.bc.consts.append(value)
+        return self.const_index[key]
+
+    def name(self, name: str, var_type: BasicType) -> int:
+        if name not in self.name_index:
+            self.name_index[name] = len(self.bc.names)
+            self.bc.names.append((name, var_type))
+        return self.name_index[name]
+
+    def fail(self, pos: int, message: str) -> None:
+        self.emit(FAIL, self.const(message), pos)
+
+    def jump(self, op: int, pos: int) -> int:
+        # Salto hacia adelante; su destino se fija después con land()
+        self.emit(op, 0, pos)
+        return len(self.bc.code) - 2
+
+    def land(self, at: int) -> None:
+        # El salto de code[at] llega a la siguiente instrucción que se emita
+        self.bc.code[at + 1] = len(self.bc.code)
+
+    def statement(self, stmt: Statement) -> None:
+        if isinstance(stmt, VarDecl):
+            expr_type = self.expr(stmt.expr)
+            error = assignment_error(stmt.var_type, expr_type, stmt.name)
+            if error is None and stmt.name in self.scope:
+                error = f"variable '{stmt.name}' already declared"
+            if error is not None:
+                self.fail(stmt.pos, error)
+                return
+            self.scope[stmt.name] = stmt.var_type
+            if stmt.var_type == BasicType.FLOAT and expr_type == BasicType.INT:
+                self.emit(TO_FLOAT, 0, stmt.pos)
+            self.emit(DECLARE, self.name(stmt.name, stmt.var_type), stmt.pos)
+        elif isinstance(stmt, Assign):
+            expr_type = self.expr(stmt.expr)
+            if stmt.name not in self.scope:
+                self.fail(stmt.pos, f"variable '{stmt.name}' not declared")
+                return
+            var_type = self.scope[stmt.name]
+            error = assignment_error(var_type, expr_type, stmt.name)
+            if error is not None:
+                self.fail(stmt.pos, error)
+                return
+            if var_type == BasicType.FLOAT and expr_type == BasicType.INT:
+                self.emit(TO_FLOAT, 0, stmt.pos)
+            self.emit(STORE_VAR, self.name_index[stmt.name], stmt.pos)
+        elif isinstance(stmt, Print):
+            self.expr(stmt.expr)
+            self.emit(PRINT, 0, stmt.pos)
+        elif isinstance(stmt, If):
+            self.expr(stmt.cond)
+            skip_then = self.jump(JUMP_IF_FALSE, stmt.pos)
+            for inner in stmt.then_body:
+                self.statement(inner)
+            if stmt.else_body:
+                skip_else = self.jump(JUMP, stmt.pos)
+                self.land(skip_then)
+                for inner in stmt.else_body:
+                    self.statement(inner)
+                self.land(skip_else)
+            else:
+                self.land(skip_then)
+        elif isinstance(stmt, While):
+            start = len(self.bc.code)
+            self.expr(stmt.cond)
+            exit_ = self.jump(JUMP_IF_FALSE, stmt.pos)
+            for inner in stmt.body:
+                self.statement(inner)
+            self.emit(JUMP, start, stmt.pos)
+            self.land(exit_)
+        else:
+            raise TypeError(f"cannot compile statement {type(stmt).__name__}")
+
+    def expr(self, expr: Expr) -> BasicType:
+        # Emite el código de la expresión y devuelve su tipo. Si la expresión
+        # siempre falla se emite FAIL y el tipo devuelto ya no importa.
+        if isinstance(expr, Literal):
+            self.emit(LOAD_CONST, self.const(expr.value), expr.pos)
+            return expr.lit_type
+
+        if isinstance(expr, Var):
+            if expr.name not in self.scope:
+                self.fail(expr.pos, f"variable '{expr.name}' not declared")
+                return BasicType.INT
+            self.emit(LOAD_VAR, self.name_index[expr.name], expr.pos)
+            return self.scope[expr.name]
+
+        if isinstance(expr, UnaryOp):
+            t = self.expr(expr.operand)
+            if t not in NUMERIC_TYPES:
+                self.fail(expr.pos, f"unary operator '{expr.op}' not supported for non-numeric type")
+            elif expr.op != '-':
+                self.fail(expr.pos, f"unknown unary operator '{expr.op}'")
+            else:
+                self.emit(NEG_INT if t == BasicType.INT else NEG_FLOAT, 0, expr.pos)
+            return t
+
+        if isinstance(expr, BinOp):
+            lt = self.expr(expr.left)
+            rt = self.expr(expr.right)
+            if lt not in NUMERIC_TYPES or rt not in NUMERIC_TYPES:
+                self.fail(expr.pos, f"binary operator '{expr.op}' not supported for non-numeric types")
+                return BasicType.FLOAT
+            if expr.op == '/' or BasicType.FLOAT in (lt, rt):
+                result_type = BasicType.FLOAT
+            else:
+                result_type = BasicType.INT
+            if (expr.op, result_type) not in BINARY_OPCODES:
+                self.fail(expr.pos, f"unknown binary operator '{expr.op}'")
+            else:
+                self.emit(BINARY_OPCODES[expr.op, result_type], 0, expr.pos)
+            return result_type
+
+        if isinstance(expr, Compare):
+            lt = self.expr(expr.left)
+            rt = self.expr(expr.right)
+            if lt not in NUMERIC_TYPES or rt not in NUMERIC_TYPES:
+                self.fail(expr.pos, f"comparison operator '{expr.op}' not supported for non-numeric types")
+            elif expr.op not in COMPARE_OPCODES:
+                self.fail(expr.pos, f"unknown comparison operator '{expr.op}'")
+            else:
+                self.emit(COMPARE_OPCODES[expr.op], 0, expr.pos)
+            return BasicType.INT
+
+        raise TypeError(f"cannot compile expression {type(expr).__name__}")
+
+
+def compile_program(program: Program) -> Bytecode:
+    compiler = _Compiler()
+    for stmt in program.statements:
+        compiler.statement(stmt)
+    return compiler.bc
+
+
+def run(bc: Bytecode, ctx: ExecutionContext) -> None:
+    code = bc.code.tolist()
+    consts = bc.consts
+    names = [name for name, _ in bc.names]
+    types = [var_type for _, var_type in bc.names]
+    symbols = ctx.symbols
+    write = ctx.out.write
+    compare = _COMPARE_FUNCTIONS
+    stack: List[Any] = []
+    push = stack.append
+    pop = stack.pop
+
+    pc = 0
+    end = len(code)
+    while pc < end:
+        op = code[pc]
+        arg = code[pc + 1]
+        pc += 2
+        if op == LOAD_VAR:
+            push(symbols[names[arg]].value)
+        elif op == LOAD_CONST:
+            push(consts[arg])
+        elif op <= MUL_FLOAT:
+            if op >= ADD_INT:
+                # Mismo código para int y float: int op int ya es int y
+                # cualquier operación con un float ya es float
+                b = pop()
+                if op <= ADD_FLOAT:
+                    stack[-1] = stack[-1] + b
+                elif op <= SUB_FLOAT:
+                    stack[-1] = stack[-1] - b
+                else:
+                    stack[-1] = stack[-1] * b
+            elif op == STORE_VAR:
+                symbols[names[arg]].value = pop()
+            else:
+                symbols[names[arg]] = VarInfo(names[arg], types[arg], pop())
+        elif op > FAIL:
+            if op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            else:
+                b = pop()
+                stack[-1] = 1 if compare[op - COMPARE_EQ](stack[-1], b) else 0
+        elif op == DIV_FLOAT:
+            b = pop()
+            if b == 0:
+                raise CompileError(bc.positions[pc // 2 - 1], "division by zero")
+            stack[-1] = float(stack[-1]) / float(b)
+        elif op <= NEG_FLOAT:
+            stack[-1] = -stack[-1]
+        elif op == TO_FLOAT:
+            stack[-1] = float(stack[-1])
+        elif op == PRINT:
+            write(pop())
+        else:
+            raise CompileError(bc.positions[pc // 2 - 1], consts[arg])
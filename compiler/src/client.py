@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import List, Tuple
+
+import protocol
+
+# Cliente de daemon.py con los mismos argumentos que compiler.py para un
+# archivo: manda el código fuente, escribe la salida y termina. Sólo
+# importa el protocolo, no el compilador, así que arranca en lo que tarda
+# Python. Si no hay daemon, corre compiler.py en este mismo proceso.
+
+
+def client_options(argv: List[str]) -> Tuple[argparse.Namespace, List[str]]:
+    # Las opciones propias del cliente; el resto son las de compiler.py
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--socket", metavar="PATH")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--no-fallback", dest="fallback", action="store_false")
+    return parser.parse_known_args(argv)
+
+
+def compiler_options(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="client.py",
+        description="Run a program on daemon.py. Takes the same options as compiler.py for a "
+                    "single file; without a daemon it runs compiler.py in-process.",
+        epilog="client options: --socket PATH, --port N and --host ADDR choose the daemon "
+               "(default: the daemon's default socket); --no-fallback exits with status 2 "
+               "instead of running locally when no daemon answers",
+    )
+    parser.add_argument("file", help="source code file to compile and execute")
+    parser.add_argument("--exec", dest="mode", default="tree", help="execution strategy, as in compiler.py")
+    parser.add_argument("--parser", default="ply", help="parser backend, as in compiler.py")
+    parser.add_argument("--emit", help="print the compiled program instead of running it")
+    parser.add_argument("-O", "--optimize", action="store_true", help="type-check and fold constants first")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="do not reuse the cached AST")
+    # Opciones de compiler.py que no cambian la salida remota
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    parser.add_argument("--output-buffer", help=argparse.SUPPRESS)
+    parser.add_argument("--startup-report", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def run_local(argv: List[str]) -> None:
+    import compiler
+    sys.argv = ["compiler.py", *argv]
+    compiler.main()
+
+
+def main() -> None:
+    client, rest = client_options(sys.argv[1:])
+    args = compiler_options(rest)
+    try:
+        with open(args.file, "r", encoding="utf-8") as fh:
+            text = fh.read()
+    except OSError as e:
+        print(f"cannot read {args.file}: {e.strerror}", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        sock = protocol.connect(client.socket, client.port, client.host)
+    except OSError as e:
+        if not client.fallback:
+            print(f"cannot reach the daemon: {e.strerror or e}", file=sys.stderr)
+            sys.exit(2)
+        run_local(rest)
+        return
+
+    with sock:
+        try:
+            response = protocol.request(sock, {
+                "op": "run",
+                "source": text,
+                "filename": args.file,
+                "mode": args.mode,
+                "emit": args.emit,
+                "optimize": args.optimize,
+                "parser": args.parser,
+                "cache": args.cache,
+            })
+        except (OSError, protocol.ProtocolError) as e:
+            print(f"daemon error: {e}", file=sys.stderr)
+            sys.exit(2)
+    if not response.get("ok"):
+        # Con un timeout llega lo que el programa imprimió antes
+        sys.stdout.write(response.get("output", ""))
+        print(f"daemon error: {response.get('error')}", file=sys.stderr)
+        sys.exit(2)
+    # Igual que compiler.py, un CompileError ya viene en la salida y el
+    # estado de salida es 0
+    sys.stdout.write(response["output"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import gc
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ast_nodes import (
+    Assign,
+    BasicType,
+    BinOp,
+    COMPARISONS,
+    Compare,
+    CompileError,
+    ExecutionContext,
+    Expr,
+    If,
+    Literal,
+    NUMERIC_TYPES,
+    Print,
+    Program,
+    Statement,
+    UnaryOp,
+    Var,
+    VarDecl,
+    VarInfo,
+    While,
+    assignment_error,
+)
+
+StmtFn = Callable[[ExecutionContext], None]
+ExprFn = Callable[[ExecutionContext], Any]
+
+def compile_program(program: Program) -> StmtFn:
+    # Las variables sólo se declaran fuera de los if/while: al recorrer el
+    # programa en orden sabemos qué variables existen (y de qué tipo) en
+    # cada sentencia, igual que lo sabría ExecutionContext al ejecutarlo
+    # sobre un contexto vacío.
+    scope: Dict[str, BasicType] = {}
+
+    # Se crean muchísimas closures de golpe y ninguna forma ciclos: con el
+    # GC activo cada colección recorre todo el AST y el tiempo se dispara
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        stmts = [_compile_stmt(stmt, scope) for stmt in program.statements]
+    except RecursionError:
+        # Traducir una expresión usa dos marcos de Python por nivel y
+        # recorrer el árbol uno: una cadena larga (500 sumas) que el
+        # recorrido del árbol sí ejecuta corre con él
+        return program.execute
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    def run(ctx: ExecutionContext) -> None:
+        for stmt in stmts:
+            stmt(ctx)
+
+    return run
+
+
+def _fail(pos: int, message: str) -> Callable[..., Any]:
+    # Los errores se siguen lanzando al ejecutar la sentencia, para que la
+    # salida previa al error sea la misma que con el recorrido del árbol
+    def fail(ctx: ExecutionContext) -> Any:
+        raise CompileError(pos, message)
+
+    return fail
+
+
+def _then_fail(first: Callable[..., Any], pos: int, message: str) -> StmtFn:
+    def fail(ctx: ExecutionContext) -> None:
+        first(ctx)
+        raise CompileError(pos, message)
+
+    return fail
+
+
+def _compile_stmt(stmt: Statement, scope: Dict[str, BasicType]) -> StmtFn:
+    if isinstance(stmt, VarDecl):
+        return _compile_var_decl(stmt, scope)
+    if isinstance(stmt, Assign):
+        return _compile_assign(stmt, scope)
+    if isinstance(stmt, Print):
+        expr_type, expr = _compile_expr(stmt.expr, scope)
+
+        def print_(ctx: ExecutionContext) -> None:
+            ctx.out.write(expr(ctx))
+
+        return print_
+    if isinstance(stmt, If):
+        return _compile_if(stmt, scope)
+    if isinstance(stmt, While):
+        return _compile_while(stmt, scope)
+    raise TypeError(f"cannot compile statement {type(stmt).__name__}")
+
+
+def _compile_if(stmt: If, scope: Dict[str, BasicType]) -> StmtFn:
+    # Los bloques son listas de closures que se recorren con el for de
+    # Python, sin saltos
+    _, cond = _compile_expr(stmt.cond, scope)
+    then_body = [_compile_stmt(inner, scope) for inner in stmt.then_body]
+    else_body = [_compile_stmt(inner, scope) for inner in stmt.else_body]
+
+    def if_(ctx: ExecutionContext) -> None:
+        for inner in then_body if cond(ctx) else else_body:
+            inner(ctx)
+
+    return if_
+
+
+def _compile_while(stmt: While, scope: Dict[str, BasicType]) -> StmtFn:
+    _, cond = _compile_expr(stmt.cond, scope)
+    body = [_compile_stmt(inner, scope) for inner in stmt.body]
+
+    def while_(ctx: ExecutionContext) -> None:
+        while cond(ctx):
+            for inner in body:
+                inner(ctx)
+
+    return while_
+
+
+def _convert(var_type: BasicType, expr_type: BasicType) -> Optional[Callable[[Any], Any]]:
+    # int() sobre un int o float() sobre un float no cambian el valor
+    if var_type == BasicType.FLOAT and expr_type == BasicType.INT:
+        return float
+    return None
+
+
+def _compile_var_decl(stmt: VarDecl, scope: Dict[str, BasicType]) -> StmtFn:
+    expr_type, expr = _compile_expr(stmt.expr, scope)
+    error = assignment_error(stmt.var_type, expr_type, stmt.name)
+    if error is not None:
+        return _then_fail(expr, stmt.pos, error)
+    if stmt.name in scope:
+        return _then_fail(expr, stmt.pos, f"variable '{stmt.name}' already declared")
+    scope[stmt.name] = stmt.var_type
+
+    name, var_type = stmt.name, stmt.var_type
+    convert = _convert(var_type, expr_type)
+    if convert is None:
+        def declare(ctx: ExecutionContext) -> None:
+            ctx.symbols[name] = VarInfo(name, var_type, expr(ctx))
+    else:
+        def declare(ctx: ExecutionContext) -> None:
+            ctx.symbols[name] = VarInfo(name, var_type, convert(expr(ctx)))
+
+    return declare
+
+
+def _compile_assign(stmt: Assign, scope: Dict[str, BasicType]) -> StmtFn:
+    expr_type, expr = _compile_expr(stmt.expr, scope)
+    if stmt.name not in scope:
+        return _then_fail(expr, stmt.pos, f"variable '{stmt.name}' not declared")
+    error = assignment_error(scope[stmt.name], expr_type, stmt.name)
+    if error is not None:
+        return _then_fail(expr, stmt.pos, error)
+
+    name = stmt.name
+    convert = _convert(scope[name], expr_type)
+    if convert is None:
+        def assign(ctx: ExecutionContext) -> None:
+            ctx.symbols[name].value = expr(ctx)
+    else:
+        def assign(ctx: ExecutionContext) -> None:
+            ctx.symbols[name].value = convert(expr(ctx))
+
+    return assign
+
+
+def _compile_expr(expr: Expr, scope: Dict[str, BasicType]) -> Tuple[BasicType, ExprFn]:
+    if isinstance(expr, Literal):
+        value = expr.value
+        return expr.lit_type, lambda ctx: value
+
+    if isinstance(expr, Var):
+        name = expr.name
+        if name not in scope:
+            # El tipo da igual: la expresión nunca llega a producir un valor
+            return BasicType.INT, _fail(expr.pos, f"variable '{name}' not declared")
+        return scope[name], lambda ctx: ctx.symbols[name].value
+
+    if isinstance(expr, UnaryOp):
+        t, operand = _compile_expr(expr.operand, scope)
+        if t not in NUMERIC_TYPES:
+            return t, _then_fail(operand, expr.pos, f"unary operator '{expr.op}' not supported for non-numeric type")
+        if expr.op != '-':
+            return t, _then_fail(operand, expr.pos, f"unknown unary operator '{expr.op}'")
+        return t, lambda ctx: -operand(ctx)
+
+    if isinstance(expr, BinOp):
+        return _compile_binop(expr, scope)
+
+    if isinstance(expr, Compare):
+        return _compile_compare(expr, scope)
+
+    raise TypeError(f"cannot compile expression {type(expr).__name__}")
+
+
+def _compile_binop(expr: BinOp, scope: Dict[str, BasicType]) -> Tuple[BasicType, ExprFn]:
+    lt, left = _compile_expr(expr.left, scope)
+    rt, right = _compile_expr(expr.right, scope)
+
+    def both(ctx: ExecutionContext) -> None:
+        left(ctx)
+        right(ctx)
+
+    if lt not in NUMERIC_TYPES or rt not in NUMERIC_TYPES:
+        return BasicType.FLOAT, _then_fail(
+            both, expr.pos, f"binary operator '{expr.op}' not supported for non-numeric types")
+
+    pos = expr.pos
+    if expr.op == '/':
+        def divide(ctx: ExecutionContext) -> float:
+            lv = left(ctx)
+            rv = right(ctx)
+            if rv == 0:
+                raise CompileError(pos, "division by zero")
+            return float(lv) / float(rv)
+
+        return BasicType.FLOAT, divide
+
+    # int op int da int y cualquier operación con un float da float, así
+    # que las conversiones de BinOp.eval nunca cambian el valor
+    result_type = BasicType.FLOAT if BasicType.FLOAT in (lt, rt) else BasicType.INT
+    if expr.op == '+':
+        return result_type, lambda ctx: left(ctx) + right(ctx)
+    if expr.op == '-':
+        return result_type, lambda ctx: left(ctx) - right(ctx)
+    if expr.op == '*':
+        return result_type, lambda ctx: left(ctx) * right(ctx)
+    return result_type, _then_fail(both, pos, f"unknown binary operator '{expr.op}'")
+
+
+def _compile_compare(expr: Compare, scope: Dict[str, BasicType]) -> Tuple[BasicType, ExprFn]:
+    lt, left = _compile_expr(expr.left, scope)
+    rt, right = _compile_expr(expr.right, scope)
+
+    def both(ctx: ExecutionContext) -> None:
+        left(ctx)
+        right(ctx)
+
+    if lt not in NUMERIC_TYPES or rt not in NUMERIC_TYPES:
+        return BasicType.INT, _then_fail(
+            both, expr.pos, f"comparison operator '{expr.op}' not supported for non-numeric types")
+    compare = COMPARISONS.get(expr.op)
+    if compare is None:
+        return BasicType.INT, _then_fail(both, expr.pos, f"unknown comparison operator '{expr.op}'")
+    return BasicType.INT, lambda ctx: 1 if compare(left(ctx), right(ctx)) else 0
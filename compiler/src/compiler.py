@@ -1,21 +1,199 @@
 from __future__ import annotations
 
+import time
+
+_START = time.perf_counter()
+
 import argparse
+import os
+import sys
 from pathlib import Path
+from typing import Callable, Dict
+
+from ast_nodes import ExecutionContext, CompileError, LineIndex, Program
+from output import DEFAULT_BUFFER, SINKS, OutputSink, StdoutSink, make_sink
+
+# El parser (y con él PLY) y los backends (bytecode, closures, semantic,
+# transpile) se importan sólo cuando se usan, para no pagar su importación
+# en cada arranque
+
+_IMPORTS = time.perf_counter() - _START
 
-from ast_nodes import ExecutionContext, CompileError
-from parser import parse_source
+EXEC_MODES = ("tree", "closure", "vm", "python")
+PARSERS = ("ply", "rd")
 
 
-def compile_and_run(source_path: Path) -> None:
+def load_program(text: str, cache: bool = False, parser: str = "ply") -> Program:
+    # Con cache=True un archivo ya visto no se vuelve a analizar: el AST se
+    # lee del caché de programas (ver progcache). Los dos parsers dan el
+    # mismo AST, así que comparten el caché.
+    if cache:
+        import progcache
+        program = progcache.load(text)
+        if program is not None:
+            return program
+    if parser == "rd":
+        from rdparser import Session
+    else:
+        from parser import Session
+    session = Session()
+    program = session.parse(text)
+    # Los avisos de caracteres ilegales no se guardan con el AST: un
+    # programa que los tiene se analiza cada vez, para que se impriman
+    if cache and not session.lexer.warnings:
+        progcache.store(text, program)
+    return program
+
+
+def compile_and_run(
+    source_path: Path,
+    mode: str = "tree",
+    emit: str | None = None,
+    optimize: bool = False,
+    phases: Dict[str, float] | None = None,
+    cache: bool = False,
+    out: OutputSink | None = None,
+    parser: str = "ply",
+) -> CompileError | None:
     text = source_path.read_text(encoding="utf-8")
+    return run_source(text, str(source_path), mode, emit, optimize, phases, cache, out, parser)
+
+
+def compile_runner(
+    program: Program,
+    mode: str = "tree",
+    optimize: bool = False,
+    filename: str = "<program>",
+) -> Callable[[ExecutionContext], None]:
+    # Traduce el programa según `mode` y devuelve la función que lo ejecuta
+    # sobre un ExecutionContext. Con -O el programa ya pasó por
+    # semantic.analyze.
+    if mode == "closure":
+        import closures
+        return closures.compile_program(program)
+    if mode == "vm":
+        import bytecode
+        code = bytecode.compile_program(program)
+        return lambda ctx: bytecode.run(code, ctx)
+    if mode == "python":
+        import transpile
+        return transpile.compile_program(program, filename)
+    if optimize:
+        return program.execute_checked
+    return program.execute
+
+
+def run_source(
+    text: str,
+    filename: str = "<program>",
+    mode: str = "tree",
+    emit: str | None = None,
+    optimize: bool = False,
+    phases: Dict[str, float] | None = None,
+    cache: bool = False,
+    out: OutputSink | None = None,
+    parser: str = "ply",
+) -> CompileError | None:
+    # Si se pasa `phases` se llena con los segundos de "parse" (incluye
+    # cargar las tablas) y "execute" (incluye análisis y traducción; no
+    # aparece si el análisis falló). El error, si lo hubo, se imprime como
+    # siempre y además se devuelve. Los print del programa van a `out`
+    # (por defecto, print a stdout).
+    if phases is None:
+        phases = {}
+    if out is None:
+        out = StdoutSink()
+    start = time.perf_counter()
+    try:
+        program = load_program(text, cache, parser)
+        phases["parse"] = time.perf_counter() - start
+        start = time.perf_counter()
+        if optimize:
+            import semantic
+            program = semantic.analyze(program)
+        if emit == "bytecode":
+            import bytecode
+            print(bytecode.compile_program(program).disassemble(LineIndex(text)))
+            return
+        if emit == "python":
+            import transpile
+            print(transpile.to_python(program)[0], end="")
+            return
+        compile_runner(program, mode, optimize, filename)(ExecutionContext(out=out))
+        return None
+    except CompileError as e:
+        # La salida del programa anterior al error va antes del mensaje. Los
+        # errores de ejecución sólo traen la posición: la línea y la columna
+        # se calculan ahora.
+        e.located(LineIndex(text))
+        out.flush()
+        print(str(e))
+        return e
+    finally:
+        out.flush()
+        # Si el análisis falló no hubo ejecución: "execute" no se agrega
+        if "parse" in phases:
+            phases.setdefault("execute", time.perf_counter() - start)
+        else:
+            phases["parse"] = time.perf_counter() - start
+
+
+def stream_file(
+    source_path: Path,
+    parser: str = "ply",
+    out: OutputSink | None = None,
+) -> CompileError | None:
+    # Analiza y ejecuta una sentencia a la vez mientras lee el archivo: la
+    # memoria no crece con el tamaño del programa y la salida empieza de
+    # inmediato. Los errores se reportan con el mismo mensaje y la misma
+    # línea, pero lo anterior a un error de sintaxis ya se ejecutó.
+    from lexer import read_chunks
+    from parser import StreamBuilder
+    if parser == "rd":
+        from rdparser import Session
+    else:
+        from parser import Session
+    if out is None:
+        out = StdoutSink()
+
+    def chunks(fh):
+        for chunk in read_chunks(fh):
+            yield chunk
+            # Lo que imprimió el trozo anterior sale antes de leer el siguiente
+            out.flush()
 
     try:
-        program = parse_source(text)
-        ctx = ExecutionContext()
-        program.execute(ctx)
+        with source_path.open("r", encoding="utf-8") as fh:
+            Session().parse_stream(chunks(fh), StreamBuilder(ExecutionContext(out=out)))
+        return None
     except CompileError as e:
+        out.flush()
         print(str(e))
+        return e
+    finally:
+        out.flush()
+
+
+def startup_report(phases: Dict[str, float]) -> str:
+    import tables
+    tables_time = sum(tables.timings.values())
+    rows = [("imports", _IMPORTS, "")]
+    # Las tablas no aparecen si el AST salió del caché de programas
+    for name in ("lexer", "parser"):
+        if name in tables.timings:
+            note = "  (cache hit)" if tables.cache_hits[name] else "  (built)"
+            rows.append((f"{name} tables", tables.timings[name], note))
+    rows += [
+        ("parse", phases.get("parse", 0.0) - tables_time, "" if tables.timings else "  (cached AST)"),
+    ]
+    if "execute" in phases:
+        rows.append(("execute", phases["execute"], ""))
+    rows.append(("total", time.perf_counter() - _START, ""))
+    out = ["startup report:"]
+    for name, seconds, note in rows:
+        out.append(f"  {name:<14}{seconds * 1000:8.2f} ms{note}")
+    out.append(f"  table cache: {tables.cache_dir()}")
+    return "\n".join(out)
 
 
 def main() -> None:
@@ -24,12 +202,220 @@ def main() -> None:
         description="Mini compiler/interpreter for a simple typed language (int/float/print).",
     )
     parser.add_argument(
-        "file",
-        type=Path,
-        help="source code file to compile and execute",
+        "files",
+        nargs="+",
+        metavar="file",
+        help="source code file to compile and execute; several files, glob patterns "
+             "or @list (a file with one path per line) run them all as a batch",
+    )
+    parser.add_argument(
+        "--exec",
+        dest="mode",
+        choices=EXEC_MODES,
+        default="tree",
+        help="execution strategy: walk the AST (tree), run it compiled to closures (closure), "
+             "to bytecode for the stack VM (vm) or to a Python code object (python)",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=PARSERS,
+        default="ply",
+        help="parser backend: PLY's LALR tables (ply) or the hand-written recursive-descent "
+             "parser (rd); both build the same AST and report the same errors",
+    )
+    parser.add_argument(
+        "--emit",
+        choices=("bytecode", "python"),
+        help="print the compiled program instead of running it",
+    )
+    parser.add_argument(
+        "-O",
+        "--optimize",
+        action="store_true",
+        help="type-check the whole program and fold constants before running it; "
+             "type errors are reported before any output",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="read, parse and run the file one statement at a time in constant memory "
+             "(tree execution only); statements before a syntax error have already run",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="report wall/CPU time and allocations per phase and, with --exec tree, evaluation counts "
+             "per node type, time per source line and the hottest BinOp sites. Always parses the file, "
+             "ignoring the AST cache",
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=("table", "trace"),
+        default="table",
+        help="--profile report as a table (default) or as Chrome trace-event JSON (trace)",
+    )
+    parser.add_argument(
+        "--profile-out",
+        metavar="FILE",
+        help="write the --profile report to FILE instead of stderr",
+    )
+    parser.add_argument(
+        "--startup-report",
+        action="store_true",
+        help="print the time spent in imports, table loading, parsing and execution to stderr",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="always lex and parse the file instead of reusing its cached AST",
+    )
+    parser.add_argument(
+        "--output",
+        choices=SINKS,
+        default="buffer",
+        help="how print writes: one print() per statement (print), a buffer written in bulk to "
+             "stdout (buffer), a buffer written straight to the stdout file descriptor (fd) "
+             "or nowhere, for benchmarks (discard)",
+    )
+    parser.add_argument(
+        "--output-buffer",
+        type=int,
+        default=DEFAULT_BUFFER,
+        metavar="CHARS",
+        help=f"flush the buffer once it holds this many characters; 0 flushes after every print "
+             f"(default: {DEFAULT_BUFFER})",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="worker processes for a batch run (default: number of CPUs; 1 runs in-process)",
+    )
+    parser.add_argument(
+        "--sweep",
+        action="append",
+        metavar="NAME=VALUES",
+        help="run the program once per value of the declared variable NAME, vectorized with NumPy, "
+             "and print one CSV row per run; VALUES is start:stop[:step], a comma list or a file "
+             "(.npy or one value per line); repeat it to bind several variables row by row",
+    )
+    parser.add_argument(
+        "--grid",
+        action="store_true",
+        help="with several --sweep options, run every combination of their values",
     )
     args = parser.parse_args()
-    compile_and_run(args.file)
+
+    import batch
+    if batch.is_batch(args.files):
+        if args.sweep or args.stream or args.profile:
+            parser.error("--sweep, --stream and --profile take a single file")
+        sys.exit(run_batch(args))
+    if args.sweep:
+        sys.exit(run_sweep(args))
+    if args.profile:
+        if args.sweep or args.stream or args.emit:
+            parser.error("--profile runs the program; it does not combine with --sweep, --stream or --emit")
+        sys.exit(run_profile(args))
+    if args.stream:
+        if args.sweep or args.mode != "tree" or args.emit or args.optimize:
+            parser.error("--stream runs the tree interpreter only (no --exec, --emit, -O or --sweep)")
+        stream_file(Path(args.files[0]), args.parser, make_sink(args.output, args.output_buffer))
+        return
+
+    phases: Dict[str, float] = {}
+    out = make_sink(args.output, args.output_buffer)
+    compile_and_run(
+        Path(args.files[0]), args.mode, args.emit, args.optimize, phases, args.cache, out, args.parser,
+    )
+    if args.startup_report:
+        print(startup_report(phases), file=sys.stderr)
+
+
+def run_profile(args: argparse.Namespace) -> int:
+    import profiling
+    text = Path(args.files[0]).read_text(encoding="utf-8")
+    profile = profiling.profile_source(
+        text, args.files[0], args.mode, args.optimize, args.parser, make_sink(args.output, args.output_buffer),
+    )
+    if args.profile_format == "trace":
+        import json
+        report = json.dumps(profiling.to_trace(profile), indent=1)
+    else:
+        report = profiling.format_table(profile)
+    if args.profile_out:
+        Path(args.profile_out).write_text(report + "\n", encoding="utf-8")
+    else:
+        print(report, file=sys.stderr)
+    return 0
+
+
+def run_sweep(args: argparse.Namespace) -> int:
+    # Ejecuta el programa sobre todas las filas de --sweep de una vez (ver
+    # vectorize.py) y escribe el resultado como CSV
+    try:
+        import vectorize
+    except ImportError:
+        print("--sweep requires NumPy (pip install numpy)", file=sys.stderr)
+        return 2
+    try:
+        bindings = dict(vectorize.parse_binding(spec) for spec in args.sweep)
+        if args.grid:
+            bindings = vectorize.grid(bindings)
+    except (OSError, ValueError) as e:
+        print(f"invalid --sweep: {e}", file=sys.stderr)
+        return 2
+
+    text = Path(args.files[0]).read_text(encoding="utf-8")
+    try:
+        program = load_program(text, args.cache, args.parser)
+        if args.optimize:
+            import semantic
+            program = semantic.analyze(program)
+    except CompileError as e:
+        print(str(e.located(LineIndex(text))))
+        return 1
+    start = time.perf_counter()
+    try:
+        result = vectorize.run_sweep(program, bindings, LineIndex(text))
+    except ValueError as e:
+        print(f"invalid --sweep: {e}", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - start
+    vectorize.write_csv(result, bindings, sys.stdout)
+    print(
+        f"sweep: {result.rows} rows, {int(result.failed.sum())} failed, {elapsed * 1000:.1f} ms",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    # Imprime la salida de cada archivo en el orden de entrada, precedida
+    # por su nombre, y al final un resumen en stderr
+    import batch
+    paths = batch.expand_inputs(args.files)
+    if not paths:
+        print("no input files", file=sys.stderr)
+        return 2
+    jobs = min(args.jobs or os.cpu_count() or 1, len(paths))
+    start = time.perf_counter()
+    results = []
+    options = batch.BatchOptions(
+        args.mode, args.emit, args.optimize, args.cache, args.output, args.output_buffer, args.parser,
+    )
+    for result in batch.run_batch(paths, options, jobs):
+        print(f"==> {result.path} <==")
+        sys.stdout.write(result.output)
+        if result.error is not None and not result.output.endswith(result.error + "\n"):
+            # Errores que no son del programa (archivo ilegible, etc.)
+            print(result.error)
+        results.append(result)
+    sys.stdout.flush()
+    print(batch.summary(results, time.perf_counter() - start, jobs), file=sys.stderr)
+    return 1 if any(r.error is not None for r in results) else 0
 
 
 if __name__ == "__main__":
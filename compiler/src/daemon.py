@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+import protocol
+from batch import warm_up
+from compiler import EXEC_MODES, PARSERS
+
+# Servidor que mantiene el lexer y el parser cargados: client.py le manda
+# el código fuente y recibe la salida, sin pagar el arranque de Python, la
+# importación de PLY ni la carga de las tablas en cada ejecución.
+#
+# El bucle de asyncio sólo atiende conexiones; cada programa corre en un
+# proceso de un pool (son CPU-bound y no deben bloquear a los demás
+# clientes). `--workers` limita cuántos corren a la vez y `--max-pending`
+# cuántos pueden esperar turno; pasado ese límite se responde "server busy".
+#
+# Cada programa tiene `--timeout` segundos: el mismo proceso lo interrumpe
+# con SIGALRM. Si aun así no responde (una operación de C que no se deja
+# interrumpir), el daemon mata los procesos del pool y arma otro; lo mismo
+# cuando un proceso muere y el pool queda roto.
+
+EMITS = (None, "bytecode", "python")
+
+# Segundos de más que el daemon espera a un proceso antes de matarlo
+GRACE = 5.0
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _alarm(signum: int, frame: Any) -> None:
+    raise _Timeout
+
+
+def _init_worker() -> None:
+    # Cada proceso del pool carga los dos parsers una sola vez
+    warm_up("ply")
+    warm_up("rd")
+
+
+def execute(request: Dict[str, Any], timeout: float = 0.0) -> Dict[str, Any]:
+    # Corre en un proceso del pool. La salida se captura igual que en
+    # batch.run_file, así que es idéntica a la de compiler.py.
+    from compiler import run_source
+    from output import make_sink
+
+    out = io.StringIO()
+    start = time.perf_counter()
+    error: Optional[str] = None
+    alarm = timeout > 0 and hasattr(signal, "setitimer")
+    if alarm:
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with contextlib.redirect_stdout(out):
+            failure = run_source(
+                request["source"], request.get("filename", "<program>"),
+                request.get("mode", "tree"), request.get("emit"), bool(request.get("optimize")),
+                cache=bool(request.get("cache", True)), out=make_sink("buffer"),
+                parser=request.get("parser", "ply"),
+            )
+        if failure is not None:
+            error = str(failure)
+    except RecursionError:
+        error = "program too deeply nested"
+    except _Timeout:
+        # Lo que imprimió hasta ese momento se devuelve con el error
+        return {"ok": False, "output": out.getvalue(), "error": _timed_out(timeout),
+                "seconds": time.perf_counter() - start}
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return {"ok": True, "output": out.getvalue(), "error": error, "seconds": time.perf_counter() - start}
+
+
+def _timed_out(timeout: float) -> str:
+    return f"timed out after {timeout:g} s"
+
+
+def validate(request: Dict[str, Any]) -> Optional[str]:
+    if not isinstance(request.get("source"), str):
+        return "missing source"
+    if request.get("mode", "tree") not in EXEC_MODES:
+        return f"invalid mode {request['mode']!r} (choose from {', '.join(EXEC_MODES)})"
+    if request.get("parser", "ply") not in PARSERS:
+        return f"invalid parser {request['parser']!r} (choose from {', '.join(PARSERS)})"
+    if request.get("emit") not in EMITS:
+        return f"invalid emit {request['emit']!r} (choose from bytecode, python)"
+    return None
+
+
+class Daemon:
+    def __init__(self, workers: int, max_pending: int, timeout: float = 0.0) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pool = self._new_pool()
+        self.running = asyncio.Semaphore(workers)
+        self.pending = 0
+        self.stats = {"connections": 0, "requests": 0, "errors": 0, "busy": 0,
+                      "timeouts": 0, "restarts": 0}
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+    def restart(self, pool: ProcessPoolExecutor, kill: bool = False) -> None:
+        # Reemplaza `pool` (si nadie lo reemplazó ya). Con kill=True termina
+        # sus procesos, que pueden estar atorados en un programa: el pool
+        # queda roto y sus peticiones terminan con BrokenProcessPool.
+        if pool is self.pool:
+            self.pool = self._new_pool()
+            self.stats["restarts"] += 1
+        if kill:
+            for process in list((getattr(pool, "_processes", None) or {}).values()):
+                process.kill()
+        else:
+            pool.shutdown(wait=False)
+
+    async def run(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        retried = False
+        while True:
+            pool = self.pool
+            try:
+                future = loop.run_in_executor(pool, execute, request, self.timeout)
+                if self.timeout > 0:
+                    return await asyncio.wait_for(future, self.timeout + GRACE)
+                return await future
+            except asyncio.TimeoutError:
+                self.restart(pool, kill=True)
+                return {"ok": False, "output": "", "error": _timed_out(self.timeout)}
+            except BrokenProcessPool:
+                # Un proceso murió (o lo mató el timeout de otra petición):
+                # se reintenta una vez en un pool nuevo
+                self.restart(pool)
+                if retried:
+                    raise
+                retried = True
+
+    def warm(self) -> None:
+        # Arranca todos los procesos del pool antes de aceptar conexiones
+        futures = [self.pool.submit(os.getpid) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Una conexión puede mandar varias peticiones, una tras otra
+        self.stats["connections"] += 1
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(protocol.HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    data = await reader.readexactly(protocol.frame_size(header))
+                    response = await self.dispatch(protocol.decode(data))
+                except protocol.ProtocolError as e:
+                    # El cliente no habla el protocolo: se responde y se cierra
+                    writer.write(protocol.encode({"ok": False, "error": str(e)}))
+                    await writer.drain()
+                    break
+                writer.write(protocol.encode(response))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op", "run")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "workers": self.workers}
+        if op == "stats":
+            return {"ok": True, "pending": self.pending, **self.stats}
+        if op != "run":
+            return {"ok": False, "error": f"unknown op {op!r}"}
+
+        problem = validate(request)
+        if problem is not None:
+            return {"ok": False, "error": f"invalid request: {problem}"}
+        if self.pending >= self.max_pending + self.workers:
+            self.stats["busy"] += 1
+            return {"ok": False, "error": "server busy"}
+
+        self.stats["requests"] += 1
+        self.pending += 1
+        try:
+            async with self.running:
+                response = await self.run(request)
+        except Exception as e:
+            # Un error del proceso (p. ej. murió), no del programa
+            self.stats["errors"] += 1
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.pending -= 1
+        # Sólo un programa que se pasó del tiempo responde ok=False
+        if not response["ok"]:
+            self.stats["timeouts"] += 1
+        if response["error"] is not None:
+            self.stats["errors"] += 1
+        return response
+
+    def close(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+
+
+def _socket_in_use(path: str) -> bool:
+    try:
+        protocol.connect(path, timeout=1.0).close()
+    except OSError:
+        return False
+    return True
+
+
+async def serve(args: argparse.Namespace) -> int:
+    daemon = Daemon(args.workers, args.max_pending, args.timeout)
+    daemon.warm()
+    path = None
+    if args.port is not None:
+        server = await asyncio.start_server(daemon.handle, args.host, args.port)
+        where = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+    else:
+        path = args.socket or protocol.default_socket()
+        if os.path.exists(path):
+            if _socket_in_use(path):
+                print(f"a daemon is already listening on {path}", file=sys.stderr)
+                daemon.close()
+                return 1
+            # Quedó de un daemon que no terminó bien
+            os.unlink(path)
+        # Sólo el usuario que lo arrancó puede conectarse
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(daemon.handle, path)
+        finally:
+            os.umask(umask)
+        where = path
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    print(f"daemon: listening on {where} with {args.workers} workers (pid {os.getpid()})", file=sys.stderr)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        daemon.close()
+        if path is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+    print(
+        f"daemon: stopped after {daemon.stats['requests']} requests "
+        f"({daemon.stats['connections']} connections, {daemon.stats['busy']} rejected as busy)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Keep the compiler loaded and run programs sent by client.py.",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help=f"Unix socket to listen on (default: $UNAM_COMPILER_SOCKET or {protocol.default_socket()})",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="listen on this TCP port instead of a Unix socket",
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="address for --port (default: 127.0.0.1; programs are run for anyone who can connect)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="worker processes, i.e. programs running at the same time (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=64,
+        help="requests that may wait for a free worker; beyond that the daemon answers "
+             "'server busy' (default: 64)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30.0,
+        help="seconds a program may run before it is stopped and answered with "
+             "'timed out' (default: 30; 0 disables it)",
+    )
+    args = parser.parse_args()
+    if args.timeout < 0:
+        parser.error("--timeout must not be negative")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.port is None and not hasattr(socket, "AF_UNIX"):
+        parser.error("Unix sockets are not available here; use --port")
+    sys.exit(asyncio.run(serve(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
-import ply.lex as lex
+import re
+import sys
+import threading
+from typing import IO, Any, Iterable, Iterator, List, Optional
+
+import tables
+from ast_nodes import CompileError, LineIndex
 
 # Palabras reservadas
 reserved = {
     "int": "INT",
     "float": "FLOAT",
     "print": "PRINT",
+    "if": "IF",
+    "else": "ELSE",
+    "while": "WHILE",
 }
 
 tokens = [
@@ -15,44 +24,104 @@ tokens = [
     "DECIMAL",
     "STRING",
     "ASSIGN",
+    "PLUS_ASSIGN",
+    "MINUS_ASSIGN",
+    "EQ",
+    "NE",
+    "LT",
+    "LE",
+    "GT",
+    "GE",
     "PLUS",
     "MINUS",
     "TIMES",
     "DIVIDE",
     "LPAREN",
     "RPAREN",
+    "LBRACE",
+    "RBRACE",
     "SEMICOLON",
 ] + list(reserved.values())
 
-# Tokens simples
+# Tokens simples (PLY prueba primero las expresiones más largas, así que
+# '==' gana sobre '=' y '+=' sobre '+')
 t_ASSIGN   = r'='
+t_PLUS_ASSIGN  = r'\+='
+t_MINUS_ASSIGN = r'-='
+t_EQ       = r'=='
+t_NE       = r'!='
+t_LT       = r'<'
+t_LE       = r'<='
+t_GT       = r'>'
+t_GE       = r'>='
 t_PLUS     = r'\+'
 t_MINUS    = r'-'
 t_TIMES    = r'\*'
 t_DIVIDE   = r'/'
 t_LPAREN   = r'\('
 t_RPAREN   = r'\)'
+t_LBRACE   = r'\{'
+t_RBRACE   = r'\}'
 t_SEMICOLON = r';'
 
-t_ignore = ' \t'
+# Los saltos de línea también se ignoran: los tokens guardan su posición
+# en el texto (lexpos) y la línea se calcula sólo para reportar un error
+# (ver ast_nodes.LineIndex), así que no hace falta contarlas
+t_ignore = ' \t\n'
+
+
+# Las constantes de cada compilación se guardan en lexer.pool, un dict de
+# lexema -> valor: un número o string que se repite se convierte (o se
+# decodifica) una sola vez, y todos sus Literal comparten el mismo objeto.
+# Cada Session empieza con un pool vacío; si crece demasiado (programas
+# por flujo con muchas constantes distintas) se vacía y vuelve a empezar.
+POOL_LIMIT = 1 << 16
+
+
+def _store(pool, lexeme, value):
+    if len(pool) >= POOL_LIMIT:
+        pool.clear()
+    pool[lexeme] = value
+    return value
+
+
+def decode_string(lexeme: str, pos: int) -> str:
+    # Quita las comillas y traduce las secuencias de escape. Los caracteres
+    # fuera de latin-1 se pasan como escapes para que lleguen intactos.
+    raw = lexeme[1:-1]
+    try:
+        return raw.encode("latin-1", "backslashreplace").decode("unicode_escape")
+    except UnicodeDecodeError as e:
+        raise CompileError(pos, f"invalid string literal ({e.reason})")
 
 
 def t_DECIMAL(t):
     r'\d+\.\d+'
-    t.value = float(t.value)
+    pool = t.lexer.pool
+    value = pool.get(t.value)
+    if value is None:
+        value = _store(pool, t.value, float(t.value))
+    t.value = value
     return t
 
 
 def t_NUMBER(t):
     r'\d+'
-    t.value = int(t.value)
+    pool = t.lexer.pool
+    value = pool.get(t.value)
+    if value is None:
+        value = _store(pool, t.value, int(t.value))
+    t.value = value
     return t
 
 
 def t_STRING(t):
     r'"([^\\\n]|(\\.))*?"'
-    raw = t.value[1:-1]
-    t.value = bytes(raw, "utf-8").decode("unicode_escape")
+    pool = t.lexer.pool
+    value = pool.get(t.value)
+    if value is None:
+        value = _store(pool, t.value, decode_string(t.value, t.lexer.offset + t.lexpos))
+    t.value = value
     return t
 
 
@@ -68,14 +137,131 @@ def t_comment(t):
     pass
 
 
-def t_newline(t):
-    r'\n+'
-    t.lexer.lineno += len(t.value)
-
-
 def t_error(t):
-    print(f"Illegal character {t.value[0]!r} at line {t.lineno}")
+    line, column = t.lexer.source.locate(t.lexer.offset + t.lexpos)
+    print(f"Illegal character {t.value[0]!r} at line {line}, column {column}")
+    t.lexer.warnings += 1
     t.lexer.skip(1)
 
 
-lexer = lex.lex()
+_lexer = None
+_lexer_lock = threading.Lock()
+
+
+def get_lexer():
+    # Se construye (o se carga del caché de tablas) la primera vez que se
+    # usa. Con el lock, si varios hilos llegan a la vez lo construye uno.
+    global _lexer
+    if _lexer is None:
+        with _lexer_lock:
+            if _lexer is None:
+                _lexer = reset_lexer(tables.build_lexer(sys.modules[__name__]))
+    return _lexer
+
+
+def new_lexer():
+    # Un lexer independiente, con su propio estado, que comparte las
+    # expresiones regulares ya compiladas
+    return reset_lexer(get_lexer().clone())
+
+
+def reset_lexer(lexer, source: Optional[LineIndex] = None):
+    # Estado de una compilación nueva: pool de constantes vacío y el índice
+    # de líneas del texto que se va a analizar. `offset` es la posición en
+    # el texto completo del principio de lexer.lexdata y `tail`, el final
+    # del último token de los trozos anteriores (los dos cambian sólo con
+    # ChunkLexer). `warnings` cuenta los caracteres ilegales reportados.
+    lexer.pool = {}
+    lexer.warnings = 0
+    lexer.source = source if source is not None else LineIndex()
+    lexer.offset = 0
+    lexer.tail = 0
+    return lexer
+
+
+# Lo que hay antes de un comentario // en una línea (sin confundirlo con
+# un // dentro de un string)
+_CODE = re.compile(r'(?:"(?:[^"\\\n]|\\.)*"|[^"/\n]|/(?!/))*')
+
+
+def token_end(lexer, pos: Optional[int]) -> int:
+    # Posición del final del último token antes de `pos` (None: el final
+    # de la entrada), donde falta un ';'. Ningún token ni comentario ocupa
+    # más de una línea, así que se buscan línea por línea hacia atrás.
+    data = lexer.lexdata
+    end = len(data) if pos is None else pos - lexer.offset
+    while end > 0:
+        start = data.rfind("\n", 0, end) + 1
+        code = _CODE.match(data, start, end).group().rstrip(" \t")
+        if code:
+            return lexer.offset + start + len(code)
+        end = start - 1
+    return lexer.tail
+
+
+# Tamaño de cada lectura del archivo en read_chunks
+CHUNK = 64 * 1024
+
+
+def read_chunks(fh: IO[str], size: int = CHUNK) -> Iterator[str]:
+    # El archivo en trozos que terminan en un salto de línea. Ningún token
+    # ocupa más de una línea, así que ninguno queda partido entre trozos.
+    pending: List[str] = []
+    while True:
+        data = fh.read(size)
+        if not data:
+            if pending:
+                yield "".join(pending)
+            return
+        cut = data.rfind("\n") + 1
+        if cut == 0:
+            # Una línea más larga que `size`: se sigue leyendo
+            pending.append(data)
+            continue
+        pending.append(data[:cut])
+        yield "".join(pending)
+        pending = [data[cut:]]
+
+
+class ChunkLexer:
+    # Lexer para los parsers que lee la entrada por trozos: cuando `lexer`
+    # termina uno, le da el siguiente. La posición de cada token se cuenta
+    # desde el principio del archivo y el índice de líneas recibe cada
+    # trozo, así que los errores llevan la misma línea y columna que si se
+    # hubiera leído todo el texto. Del índice (8 bytes por línea) y un
+    # trozo no se guarda nada más.
+    def __init__(self, lexer, chunks: Iterable[str]) -> None:
+        self.lexer = lexer
+        self.chunks = iter(chunks)
+        self.next = lexer.token
+        self.base = 0
+        lexer.input("")
+
+    def input(self, text: str) -> None:
+        self.lexer.input(text)
+
+    def token(self):
+        while True:
+            tok = self.next()
+            if tok is not None:
+                tok.lexpos += self.base
+                return tok
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return None
+            lexer = self.lexer
+            lexer.tail = token_end(lexer, None)
+            lexer.offset = self.base = lexer.offset + len(lexer.lexdata)
+            lexer.source.feed(chunk)
+            lexer.input(chunk)
+
+    def __getattr__(self, name: str) -> Any:
+        # lexdata, offset, source... son los del lexer
+        return getattr(self.lexer, name)
+
+
+def __getattr__(name):
+    # `lexer.lexer` sigue disponible, pero ya no se construye al importar
+    if name == "lexer":
+        return get_lexer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import os
+import sys
+from typing import Any, List, Optional, TextIO
+
+# Tamaño por defecto del búfer antes de escribirlo en bloque
+DEFAULT_BUFFER = 64 * 1024
+
+
+class OutputSink:
+    # Destino de las sentencias print. write recibe el valor ya evaluado y
+    # debe producir exactamente lo mismo que print(value): str(value) y un
+    # salto de línea.
+
+    def write(self, value: Any) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+
+class StdoutSink(OutputSink):
+    # Igual que antes: un print por sentencia sobre el sys.stdout actual
+    def write(self, value: Any) -> None:
+        print(value)
+
+
+class BufferedSink(OutputSink):
+    # Junta las líneas en memoria y las escribe en un solo write cuando
+    # pasan de `limit` caracteres (0: después de cada print) y al final
+    def __init__(self, stream: Optional[TextIO] = None, limit: int = DEFAULT_BUFFER) -> None:
+        self.stream = stream
+        self.limit = limit
+        self.parts: List[str] = []
+        self.size = 0
+
+    def write(self, value: Any) -> None:
+        text = f"{value}\n"
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.limit:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.parts:
+            return
+        # Se busca sys.stdout al escribir, como print, por si se redirigió
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write("".join(self.parts))
+        stream.flush()
+        self.parts.clear()
+        self.size = 0
+
+
+class FdSink(BufferedSink):
+    # Como BufferedSink pero codifica el texto y lo escribe directo en el
+    # descriptor, sin pasar por la capa de texto de sys.stdout. Usa la
+    # misma codificación que sys.stdout para que los bytes no cambien.
+    def __init__(self, fd: int = 1, limit: int = DEFAULT_BUFFER,
+                 encoding: Optional[str] = None, errors: Optional[str] = None) -> None:
+        super().__init__(None, limit)
+        self.fd = fd
+        self.encoding = encoding or getattr(sys.stdout, "encoding", None) or "utf-8"
+        self.errors = errors or getattr(sys.stdout, "errors", None) or "strict"
+        self.started = False
+
+    def flush(self) -> None:
+        if not self.parts:
+            return
+        if not self.started:
+            # Lo que ya estaba en el búfer de sys.stdout va primero
+            sys.stdout.flush()
+            self.started = True
+        data = memoryview("".join(self.parts).encode(self.encoding, self.errors))
+        self.parts.clear()
+        self.size = 0
+        while data:
+            data = data[os.write(self.fd, data):]
+
+
+class ListSink(OutputSink):
+    # Guarda cada línea impresa (sin el salto de línea), para usar el
+    # intérprete desde otro programa o comparar salidas
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def write(self, value: Any) -> None:
+        self.lines.append(str(value))
+
+    def getvalue(self) -> str:
+        return "".join(line + "\n" for line in self.lines)
+
+
+class DiscardSink(OutputSink):
+    # No imprime nada; para medir la ejecución sin el costo de la salida
+    def write(self, value: Any) -> None:
+        pass
+
+
+SINKS = ("print", "buffer", "fd", "discard")
+
+
+def make_sink(kind: str = "print", buffer_size: int = DEFAULT_BUFFER) -> OutputSink:
+    if kind == "print":
+        return StdoutSink()
+    if kind == "buffer":
+        return BufferedSink(limit=buffer_size)
+    if kind == "fd":
+        return FdSink(sys.stdout.fileno(), limit=buffer_size)
+    if kind == "discard":
+        return DiscardSink()
+    raise ValueError(f"unknown output sink {kind!r}")
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-from typing import List
-
-import ply.yacc as yacc
+import copy
+import functools
+import sys
+import threading
+from typing import TYPE_CHECKING, Any, Iterable, List
 
+import tables
 from ast_nodes import (
     BasicType,
     CompileError,
@@ -15,8 +18,17 @@ from ast_nodes import (
     Var,
     BinOp,
     UnaryOp,
+    Compare,
+    If,
+    While,
+    Statement,
+    ExecutionContext,
+    LineIndex,
 )
-from lexer import tokens, lexer
+from lexer import ChunkLexer, reset_lexer, token_end, tokens, get_lexer, new_lexer
+
+if TYPE_CHECKING:
+    from arena import Arena
 
 # Precedencia de operadores
 precedence = (
@@ -34,18 +46,90 @@ def _token_value_to_basic_type(token_value: str) -> BasicType:
     raise ValueError(f"Unknown type keyword {token_value!r}")
 
 
+class TreeBuilder:
+    # Lo que las acciones del parser usan para crear cada nodo. Con este se
+    # obtiene el árbol de objetos de ast_nodes; arena.Arena tiene los mismos
+    # métodos y guarda el AST en columnas (ver parse_arena). Las acciones lo
+    # toman de p.parser.builder, que fija cada Session.
+    var_decl = VarDecl
+    assign = Assign
+    print_ = Print
+    literal = Literal
+    var = Var
+    binop = BinOp
+    unary = UnaryOp
+    compare = Compare
+    if_ = If
+    while_ = While
+
+    def stmt_list(self) -> List[Statement]:
+        return []
+
+    def block(self) -> List[Statement]:
+        # Las sentencias de un bloque { ... }; también en StreamBuilder son
+        # una lista, porque se ejecutan con el if o while que las contiene
+        return []
+
+    def program(self, statements: List[Statement]) -> Program:
+        pos = statements[0].pos if statements else 0
+        return Program(pos, statements)
+
+
+# TreeBuilder no guarda estado, así que todas las sesiones lo comparten
+TREE = TreeBuilder()
+
+
+class _Runner:
+    # Hace las veces de la lista de sentencias: cada sentencia que agrega
+    # el parser se ejecuta en ese momento y no se guarda.
+    #
+    # Después de un error de ejecución ya no se ejecuta nada, pero se sigue
+    # analizando: si más adelante hay un error de sintaxis, ése es el que
+    # se reporta, como cuando se analiza todo el programa antes de correrlo.
+    __slots__ = ("ctx", "count", "error")
+
+    def __init__(self, ctx: ExecutionContext) -> None:
+        self.ctx = ctx
+        self.count = 0
+        self.error: CompileError | None = None
+
+    def append(self, stmt: Statement) -> None:
+        if self.error is not None:
+            return
+        try:
+            stmt.execute(self.ctx)
+        except CompileError as e:
+            self.error = e
+        else:
+            self.count += 1
+
+
+class StreamBuilder(TreeBuilder):
+    # Builder para ejecutar mientras se analiza (Session.parse_stream): en
+    # memoria sólo queda la sentencia actual. program() devuelve cuántas
+    # sentencias se ejecutaron.
+    def __init__(self, ctx: ExecutionContext) -> None:
+        self.ctx = ctx
+
+    def stmt_list(self) -> _Runner:
+        return _Runner(self.ctx)
+
+    def program(self, statements: _Runner) -> int:
+        if statements.error is not None:
+            raise statements.error
+        return statements.count
+
+
 def p_program(p):
     "program : stmt_list"
-    line = p[1][0].line if p[1] else 1
-    p[0] = Program(line=line, statements=p[1])
+    p[0] = p.parser.builder.program(p[1])
 
 
 def p_stmt_list_single(p):
     "stmt_list : statement"
-    if p[1] is None:
-        p[0] = []
-    else:
-        p[0] = [p[1]]
+    p[0] = p.parser.builder.stmt_list()
+    if p[1] is not None:
+        p[0].append(p[1])
 
 
 def p_stmt_list_multi(p):
@@ -59,36 +143,102 @@ def p_statement_var_decl(p):
     "statement : type ID ASSIGN expr SEMICOLON"
     var_type = _token_value_to_basic_type(p[1])
     name = p[2]
-    line = p.lineno(2)
-    p[0] = VarDecl(line=line, name=name, var_type=var_type, expr=p[4])
+    pos = p.lexpos(2)
+    p[0] = p.parser.builder.var_decl(pos, name, var_type, p[4])
+
+
+def p_statement_instruction(p):
+    "statement : instruction"
+    p[0] = p[1]
+
+
+def p_instruction_assignment(p):
+    "instruction : ID ASSIGN expr SEMICOLON"
+    name = p[1]
+    pos = p.lexpos(1)
+    p[0] = p.parser.builder.assign(pos, name, p[3])
 
 
-def p_statement_assignment(p):
-    "statement : ID ASSIGN expr SEMICOLON"
+def p_instruction_compound_assignment(p):
+    """instruction : ID PLUS_ASSIGN expr SEMICOLON
+                   | ID MINUS_ASSIGN expr SEMICOLON"""
+    # x += e es x = x + e
+    b = p.parser.builder
     name = p[1]
-    line = p.lineno(1)
-    p[0] = Assign(line=line, name=name, expr=p[3])
+    pos = p.lexpos(1)
+    p[0] = b.assign(pos, name, b.binop(pos, p[2][0], b.var(pos, name), p[3]))
 
 
-def p_statement_print_expr(p):
-    "statement : PRINT LPAREN expr RPAREN SEMICOLON"
-    line = p.lineno(1)
-    p[0] = Print(line=line, expr=p[3])
+def p_instruction_print_expr(p):
+    "instruction : PRINT LPAREN expr RPAREN SEMICOLON"
+    pos = p.lexpos(1)
+    p[0] = p.parser.builder.print_(pos, p[3])
 
 
-def p_statement_print_string(p):
-    "statement : PRINT LPAREN STRING RPAREN SEMICOLON"
-    line = p.lineno(1)
+def p_instruction_print_string(p):
+    "instruction : PRINT LPAREN STRING RPAREN SEMICOLON"
+    pos = p.lexpos(1)
     string_value = p[3]
-    lit = Literal(line=line, value=string_value, lit_type=BasicType.STRING)
-    p[0] = Print(line=line, expr=lit)
+    lit = p.parser.builder.literal(pos, string_value, BasicType.STRING)
+    p[0] = p.parser.builder.print_(pos, lit)
 
 
-def p_statement_empty(p):
-    "statement : SEMICOLON"
+def p_instruction_empty(p):
+    "instruction : SEMICOLON"
     p[0] = None
 
 
+def p_instruction_if(p):
+    "instruction : if_statement"
+    p[0] = p[1]
+
+
+def p_if_statement(p):
+    "if_statement : IF expr block"
+    p[0] = p.parser.builder.if_(p.lexpos(1), p[2], p[3], p.parser.builder.block())
+
+
+def p_if_statement_else(p):
+    "if_statement : IF expr block ELSE block"
+    p[0] = p.parser.builder.if_(p.lexpos(1), p[2], p[3], p[5])
+
+
+def p_if_statement_else_if(p):
+    "if_statement : IF expr block ELSE if_statement"
+    else_body = p.parser.builder.block()
+    else_body.append(p[5])
+    p[0] = p.parser.builder.if_(p.lexpos(1), p[2], p[3], else_body)
+
+
+def p_instruction_while(p):
+    "instruction : WHILE expr block"
+    p[0] = p.parser.builder.while_(p.lexpos(1), p[2], p[3])
+
+
+def p_block(p):
+    "block : LBRACE block_items RBRACE"
+    p[0] = p[2]
+
+
+def p_block_items_empty(p):
+    "block_items :"
+    p[0] = p.parser.builder.block()
+
+
+def p_block_items_multi(p):
+    "block_items : block_items instruction"
+    if p[2] is not None:
+        p[1].append(p[2])
+    p[0] = p[1]
+
+
+def p_block_items_var_decl(p):
+    "block_items : block_items type ID ASSIGN expr SEMICOLON"
+    # Las variables se declaran sólo fuera de los bloques: así cada una
+    # existe desde su declaración hasta el final del programa
+    raise CompileError(p.lexpos(3), f"variable '{p[3]}' must be declared outside if/while blocks")
+
+
 def p_type_int(p):
     "type : INT"
     p[0] = p[1]
@@ -99,16 +249,34 @@ def p_type_float(p):
     p[0] = p[1]
 
 
-def p_expr_binop(p):
-    """expr : expr PLUS term
-            | expr MINUS term"""
+def p_expr_compare(p):
+    """expr : arith EQ arith
+            | arith NE arith
+            | arith LT arith
+            | arith LE arith
+            | arith GT arith
+            | arith GE arith"""
+    # Las comparaciones no se encadenan: a < b < c es un error de sintaxis
     op = p[2]
-    line = p.lineno(2)
-    p[0] = BinOp(line=line, op=op, left=p[1], right=p[3])
+    pos = p.lexpos(2)
+    p[0] = p.parser.builder.compare(pos, op, p[1], p[3])
 
 
-def p_expr_term(p):
-    "expr : term"
+def p_expr_arith(p):
+    "expr : arith"
+    p[0] = p[1]
+
+
+def p_arith_binop(p):
+    """arith : arith PLUS term
+             | arith MINUS term"""
+    op = p[2]
+    pos = p.lexpos(2)
+    p[0] = p.parser.builder.binop(pos, op, p[1], p[3])
+
+
+def p_arith_term(p):
+    "arith : term"
     p[0] = p[1]
 
 
@@ -116,8 +284,8 @@ def p_term_binop(p):
     """term : term TIMES factor
             | term DIVIDE factor"""
     op = p[2]
-    line = p.lineno(2)
-    p[0] = BinOp(line=line, op=op, left=p[1], right=p[3])
+    pos = p.lexpos(2)
+    p[0] = p.parser.builder.binop(pos, op, p[1], p[3])
 
 
 def p_term_factor(p):
@@ -129,19 +297,19 @@ def p_factor_number(p):
     """factor : NUMBER
               | DECIMAL"""
     token_type = p.slice[1].type
-    line = p.lineno(1)
+    pos = p.lexpos(1)
     if token_type == "NUMBER":
         lit_type = BasicType.INT
     else:
         lit_type = BasicType.FLOAT
-    p[0] = Literal(line=line, value=p[1], lit_type=lit_type)
+    p[0] = p.parser.builder.literal(pos, p[1], lit_type)
 
 
 def p_factor_id(p):
     "factor : ID"
     name = p[1]
-    line = p.lineno(1)
-    p[0] = Var(line=line, name=name)
+    pos = p.lexpos(1)
+    p[0] = p.parser.builder.var(pos, name)
 
 
 def p_factor_group(p):
@@ -151,27 +319,99 @@ def p_factor_group(p):
 
 def p_factor_uminus(p):
     "factor : MINUS factor %prec UMINUS"
-    line = p.lineno(1)
-    p[0] = UnaryOp(line=line, op='-', operand=p[2])
+    pos = p.lexpos(1)
+    p[0] = p.parser.builder.unary(pos, '-', p[2])
 
 
-def p_error(p):
+def syntax_error(lexer, p) -> None:
+    # Lanza el CompileError de un error de sintaxis en el token p (None al
+    # final de la entrada). `lexer` es el de la sesión que estaba analizando.
+    # Cuando falta un ';' el error se marca justo después del último token
+    # que sí está, que puede estar varias líneas antes del siguiente
     if p is None:
-        line = lexer.lineno or 1
-        raise CompileError(line=line-1, message="syntax error (missing ';')")
+        raise CompileError(pos=token_end(lexer, None), message="syntax error (missing ';')")
     else:
         # Si aparece un token que puede iniciar una nueva sentencia donde
         # el parser esperaba un ';'
-        if p.type in ("INT", "FLOAT", "PRINT", "ID"):
-            raise CompileError(line=p.lineno-1, message="syntax error (missing ';')")
+        if p.type in ("INT", "FLOAT", "PRINT", "ID", "IF", "WHILE"):
+            raise CompileError(pos=token_end(lexer, p.lexpos), message="syntax error (missing ';')")
         raise CompileError(
-            line=p.lineno,
+            pos=p.lexpos,
             message=f"syntax error at token {p.type!r} with value {p.value!r}",
         )
 
 
-parser = yacc.yacc(start="program")
+def p_error(p):
+    # PLY busca p_error en el módulo; cada sesión lo reemplaza por
+    # syntax_error con su propio lexer
+    syntax_error(p.lexer if p is not None else get_lexer(), p)
+
+
+_parser = None
+_parser_lock = threading.Lock()
+
+
+def get_parser():
+    # Igual que get_lexer: las tablas LALR se cargan del caché la primera
+    # vez. Este parser sólo sirve de plantilla para las sesiones.
+    global _parser
+    if _parser is None:
+        with _parser_lock:
+            if _parser is None:
+                template = tables.build_parser(sys.modules[__name__], "program")
+                template.builder = TREE
+                _parser = template
+    return _parser
+
+
+class Session:
+    # Todo el estado de un análisis: un lexer propio (con el índice de
+    # líneas del texto) y una copia del parser LALR (su pila, su estado de
+    # error y el builder), que comparte con las demás sólo las tablas, que
+    # nunca se modifican. Cada hilo o tarea usa su propia sesión, sin locks;
+    # una sesión se puede reutilizar para varios análisis seguidos.
+    def __init__(self) -> None:
+        self.lexer = new_lexer()
+        self.parser = copy.copy(get_parser())
+        self.parser.errorfunc = functools.partial(syntax_error, self.lexer)
+
+    def parse(self, text: str, builder: Any = TREE) -> Any:
+        # Sin tracking=True: los nodos guardan la posición (lexpos) de un
+        # token y la línea se calcula sólo si hay un error
+        reset_lexer(self.lexer, LineIndex(text))
+        self.parser.builder = builder
+        try:
+            return self.parser.parse(text, lexer=self.lexer)
+        except CompileError as e:
+            raise e.located(self.lexer.source)
+
+    def parse_stream(self, chunks: Iterable[str], builder: Any) -> Any:
+        # Como parse, pero el texto llega por trozos (ver lexer.read_chunks).
+        # Con StreamBuilder cada sentencia se ejecuta cuando se agrega a
+        # stmt_list, que PLY reduce después de leer el token siguiente: si
+        # ése es un error de sintaxis, la sentencia no llega a ejecutarse.
+        reset_lexer(self.lexer)
+        self.parser.builder = builder
+        try:
+            return self.parser.parse(None, lexer=ChunkLexer(self.lexer, chunks))
+        except CompileError as e:
+            raise e.located(self.lexer.source)
+
+
+def __getattr__(name):
+    if name == "parser":
+        return get_parser()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def parse_source(text: str) -> Program:
-    return parser.parse(text, lexer=lexer, tracking=True)
+    # Cada llamada usa una sesión nueva, así que se puede llamar desde
+    # varios hilos a la vez
+    return Session().parse(text)
+
+
+def parse_arena(text: str) -> "Arena":
+    # Como parse_source, pero las acciones del parser escriben el AST en un
+    # arena.Arena en lugar de crear un objeto por nodo
+    from arena import Arena
+    return Session().parse(text, Arena())
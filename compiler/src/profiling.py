@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from ast_nodes import (
+    Assign,
+    BinOp,
+    Compare,
+    CompileError,
+    ExecutionContext,
+    Expr,
+    Jump,
+    JumpUnless,
+    LineIndex,
+    Literal,
+    Print,
+    UnaryOp,
+    Var,
+    VarDecl,
+)
+from output import OutputSink
+
+# Perfil de una corrida de compiler.py (--profile): tiempo de reloj, tiempo
+# de CPU y memoria reservada en cada fase y, con --exec tree, cuántas veces
+# se evalúa cada tipo de nodo, el tiempo de cada línea y los BinOp más
+# costosos.
+#
+# Los contadores de nodos se obtienen reemplazando execute/eval de las
+# clases de ast_nodes por versiones que miden, sólo mientras corre el
+# perfil. Sin --profile no se toca nada: el intérprete es el mismo.
+
+# Filas que se muestran de las líneas y de los BinOp
+TOP = 10
+
+# Con --exec tree los if/while se ejecutan como saltos (ver ast_nodes.lower)
+_STATEMENTS = (VarDecl, Assign, Print, JumpUnless, Jump)
+_EXPRS = (Literal, Var, BinOp, UnaryOp, Compare)
+
+
+@dataclass
+class Phase:
+    name: str
+    start: float             # segundos desde el inicio del perfil
+    wall: float
+    cpu: float
+    allocated: int           # bytes que siguen reservados al terminar la fase
+    peak: int                # máximo de bytes reservados durante la fase
+    note: str = ""
+
+
+@dataclass
+class Profile:
+    filename: str
+    mode: str
+    parser: str
+    phases: List[Phase] = field(default_factory=list)
+    # tipo de nodo -> [evaluaciones, segundos propios (sin los hijos)]
+    node_types: Dict[str, List[float]] = field(default_factory=dict)
+    # línea -> [sentencias ejecutadas, segundos]; mientras corre el
+    # programa se cuentan por posición (ver _by_line)
+    lines: Dict[int, List[float]] = field(default_factory=dict)
+    # id del nodo -> [nodo, evaluaciones, segundos (con sus operandos)]
+    binops: Dict[int, List[Any]] = field(default_factory=dict)
+    source_lines: List[str] = field(default_factory=list, repr=False)
+    source: LineIndex = field(default_factory=LineIndex, repr=False)
+    error: Optional[str] = None
+
+
+class _Recorder:
+    # Mide fases con perf_counter, process_time y tracemalloc
+    def __init__(self, profile: Profile) -> None:
+        self.profile = profile
+        self.origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name: str, note: str = "") -> Iterator[None]:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            end_wall = time.perf_counter()
+            end_cpu = time.process_time()
+            current, peak = tracemalloc.get_traced_memory()
+            self.profile.phases.append(Phase(
+                name, wall - self.origin, end_wall - wall, end_cpu - cpu,
+                current - before, max(peak - before, 0), note,
+            ))
+
+
+class _Instrument:
+    # Reemplaza los métodos de evaluación de los nodos mientras está activo
+    def __init__(self, profile: Profile, checked: bool) -> None:
+        self.profile = profile
+        self.checked = checked
+        self.saved: List[Tuple[type, str, Callable]] = []
+        # Tiempo de los hijos del nodo que se está evaluando, para
+        # descontarlo de su tiempo propio
+        self.stack: List[float] = []
+
+    def __enter__(self) -> _Instrument:
+        statement_method = "execute_checked" if self.checked else "execute"
+        expr_method = "eval_checked" if self.checked else "eval"
+        for cls in _STATEMENTS:
+            self._wrap(cls, statement_method, statement=True)
+        for cls in _EXPRS:
+            self._wrap(cls, expr_method, statement=False)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        for cls, name, original in reversed(self.saved):
+            setattr(cls, name, original)
+        self.saved.clear()
+
+    def _wrap(self, cls: type, name: str, statement: bool) -> None:
+        original = cls.__dict__[name]
+        self.saved.append((cls, name, original))
+        kind = cls.__name__
+        counters = self.profile.node_types.setdefault(kind, [0, 0.0])
+        lines = self.profile.lines
+        binops = self.profile.binops if cls is BinOp else None
+        stack = self.stack
+        clock = time.perf_counter
+
+        def measured(node: Any, ctx: ExecutionContext) -> Any:
+            stack.append(0.0)
+            start = clock()
+            try:
+                return original(node, ctx)
+            finally:
+                elapsed = clock() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                counters[0] += 1
+                counters[1] += elapsed - children
+                if statement:
+                    entry = lines.get(node.pos)
+                    if entry is None:
+                        entry = lines[node.pos] = [0, 0.0]
+                    entry[0] += 1
+                    entry[1] += elapsed
+                elif binops is not None:
+                    entry = binops.get(id(node))
+                    if entry is None:
+                        entry = binops[id(node)] = [node, 0, 0.0]
+                    entry[1] += 1
+                    entry[2] += elapsed
+
+        setattr(cls, name, measured)
+
+
+def _by_line(profile: Profile) -> None:
+    # Junta los contadores de las sentencias que están en la misma línea
+    lines: Dict[int, List[float]] = {}
+    for pos, (count, seconds) in profile.lines.items():
+        entry = lines.setdefault(profile.source.line(pos), [0, 0.0])
+        entry[0] += count
+        entry[1] += seconds
+    profile.lines = lines
+
+
+def describe(expr: Expr, limit: int = 48) -> str:
+    # La expresión como texto, para identificar un BinOp
+    def text(e: Expr) -> str:
+        if isinstance(e, Literal):
+            return repr(e.value) if isinstance(e.value, str) else str(e.value)
+        if isinstance(e, Var):
+            return e.name
+        if isinstance(e, UnaryOp):
+            return f"{e.op}{text(e.operand)}"
+        if isinstance(e, (BinOp, Compare)):
+            return f"({text(e.left)} {e.op} {text(e.right)})"
+        return type(e).__name__
+
+    result = text(expr)
+    if isinstance(expr, BinOp):
+        result = result[1:-1]
+    return result if len(result) <= limit else result[:limit - 3] + "..."
+
+
+def _tables_note(name: str, loaded: bool) -> str:
+    import tables
+    if loaded:
+        return "already loaded"
+    return "cache hit" if tables.cache_hits.get(name) else "built"
+
+
+def profile_source(
+    text: str,
+    filename: str = "<program>",
+    mode: str = "tree",
+    optimize: bool = False,
+    parser: str = "ply",
+    out: Optional[OutputSink] = None,
+) -> Profile:
+    # Corre el programa como run_source, fase por fase. El AST siempre se
+    # analiza (sin el caché de programas), para que se vea su costo.
+    from compiler import compile_runner
+    from output import StdoutSink
+
+    profile = Profile(filename, mode, parser, source_lines=text.splitlines(), source=LineIndex(text))
+    if out is None:
+        out = StdoutSink()
+    started = tracemalloc.is_tracing()
+    if not started:
+        tracemalloc.start()
+    recorder = _Recorder(profile)
+    try:
+        # Importar el módulo y cargar (o construir) las tablas de PLY
+        import tables
+        loaded = "lexer" in tables.timings
+        with recorder.phase("lexer setup"):
+            from lexer import get_lexer, new_lexer, reset_lexer
+            get_lexer()
+        profile.phases[-1].note = _tables_note("lexer", loaded)
+        loaded = "parser" in tables.timings
+        with recorder.phase("parser setup"):
+            if parser == "ply":
+                from parser import get_parser, parse_source
+                get_parser()
+            else:
+                from rdparser import parse_source
+        profile.phases[-1].note = _tables_note("parser", loaded) if parser == "ply" else "no tables"
+
+        with recorder.phase("lex", "separate pass; parse lexes again"):
+            # Los mensajes de caracteres ilegales salen una sola vez, en parse
+            lexer = reset_lexer(new_lexer(), profile.source)
+            lexer.input(text)
+            with contextlib.redirect_stdout(io.StringIO()):
+                tokens = sum(1 for _ in iter(lexer.token, None))
+        profile.phases[-1].note = f"{tokens} tokens; " + profile.phases[-1].note
+
+        with recorder.phase("parse"):
+            program = parse_source(text)
+        profile.phases[-1].note = f"{len(program.statements)} statements"
+
+        if optimize:
+            import semantic
+            with recorder.phase("analyze"):
+                program = semantic.analyze(program)
+
+        if mode == "tree":
+            run = compile_runner(program, mode, optimize, filename)
+        else:
+            with recorder.phase("compile"):
+                run = compile_runner(program, mode, optimize, filename)
+
+        ctx = ExecutionContext(out=out)
+        with recorder.phase("execute"):
+            if mode == "tree":
+                with _Instrument(profile, checked=optimize):
+                    run(ctx)
+            else:
+                run(ctx)
+            out.flush()
+    except CompileError as e:
+        e.located(profile.source)
+        out.flush()
+        print(str(e))
+        profile.error = str(e)
+    finally:
+        out.flush()
+        if not started:
+            tracemalloc.stop()
+    _by_line(profile)
+    return profile
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:10.3f}"
+
+
+def _kb(size: int) -> str:
+    return f"{size / 1024:10.1f}"
+
+
+def format_table(profile: Profile) -> str:
+    out = [f"profile: {profile.filename} (--exec {profile.mode}, --parser {profile.parser})"]
+    if profile.error:
+        out.append(f"  stopped by: {profile.error}")
+    out.append("")
+    out.append(f"  {'phase':<16}{'wall ms':>10}{'cpu ms':>10}{'alloc KB':>10}{'peak KB':>10}")
+    for phase in profile.phases:
+        note = f"  ({phase.note})" if phase.note else ""
+        out.append(f"  {phase.name:<16}{_ms(phase.wall)}{_ms(phase.cpu)}{_kb(phase.allocated)}{_kb(phase.peak)}{note}")
+    out.append("  (times include the profiler's own overhead)")
+
+    if not profile.node_types:
+        out.append("")
+        out.append("  per-node counters are collected with --exec tree only")
+        return "\n".join(out)
+
+    execute = sum(seconds for _, seconds in profile.node_types.values()) or 1.0
+    out.append("")
+    out.append(f"  {'node type':<16}{'evals':>10}{'self ms':>10}{'%':>7}")
+    for kind, (count, seconds) in sorted(profile.node_types.items(), key=lambda kv: -kv[1][1]):
+        if count:
+            out.append(f"  {kind:<16}{count:>10}{_ms(seconds)}{seconds / execute * 100:7.1f}")
+
+    out.append("")
+    out.append(f"  hottest lines    {'runs':>10}{'ms':>10}")
+    for line, (count, seconds) in sorted(profile.lines.items(), key=lambda kv: -kv[1][1])[:TOP]:
+        source = profile.source_lines[line - 1].strip() if 0 < line <= len(profile.source_lines) else ""
+        if len(source) > 48:
+            source = source[:45] + "..."
+        out.append(f"  line {line:<11}{count:>10}{_ms(seconds)}  {source}")
+
+    if profile.binops:
+        out.append("")
+        out.append(f"  hottest BinOp    {'evals':>10}{'ms':>10}")
+        for node, count, seconds in sorted(profile.binops.values(), key=lambda e: -e[2])[:TOP]:
+            out.append(f"  line {profile.source.line(node.pos):<11}{count:>10}{_ms(seconds)}  {describe(node)}")
+    return "\n".join(out)
+
+
+def to_trace(profile: Profile) -> Dict[str, Any]:
+    # Formato de eventos de Chrome (chrome://tracing, Perfetto): una barra
+    # por fase; los contadores de nodos van en otherData
+    pid = os.getpid()
+    events = [
+        {
+            "name": phase.name, "cat": "phase", "ph": "X", "pid": pid, "tid": 0,
+            "ts": round(phase.start * 1e6, 3), "dur": round(phase.wall * 1e6, 3),
+            "args": {"cpu_ms": phase.cpu * 1000, "allocated_bytes": phase.allocated,
+                     "peak_bytes": phase.peak, "note": phase.note},
+        }
+        for phase in profile.phases
+    ]
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {
+            "file": profile.filename,
+            "mode": profile.mode,
+            "parser": profile.parser,
+            "error": profile.error,
+            "node_types": {kind: {"evals": count, "self_ms": seconds * 1000}
+                           for kind, (count, seconds) in profile.node_types.items()},
+            "lines": [{"line": line, "runs": count, "ms": seconds * 1000}
+                      for line, (count, seconds) in sorted(profile.lines.items())],
+            "binops": [{"line": profile.source.line(node.pos), "op": node.op, "expr": describe(node, 200),
+                        "evals": count, "ms": seconds * 1000}
+                       for node, count, seconds in sorted(profile.binops.values(), key=lambda e: -e[2])],
+        },
+    }
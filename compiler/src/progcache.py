@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import hashlib
+import marshal
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+import tables
+from ast_nodes import (
+    Assign,
+    BasicType,
+    BinOp,
+    Compare,
+    If,
+    Literal,
+    Print,
+    Program,
+    UnaryOp,
+    Var,
+    VarDecl,
+    While,
+)
+
+# Cambiar al modificar la codificación de abajo
+FORMAT_VERSION = 3
+
+# Tamaño máximo del directorio antes de borrar las entradas menos usadas
+MAX_BYTES = int(os.environ.get("UNAM_COMPILER_CACHE_MAX", 64 * 1024 * 1024))
+
+SUFFIX = ".ast"
+
+# Revisar el tamaño del directorio en cada escritura hace que un lote de
+# miles de archivos nuevos sea cuadrático; se revisa cada tantas escrituras
+EVICT_EVERY = 64
+_stores = 0
+
+# Códigos de nodo en la codificación con tuplas
+_VAR_DECL, _ASSIGN, _PRINT, _LITERAL, _VAR, _BINOP, _UNARY, _COMPARE, _IF, _WHILE = range(10)
+
+
+def cache_dir() -> Path:
+    return tables.cache_root() / "programs"
+
+
+_tag: Optional[bytes] = None
+
+
+def _version_tag() -> bytes:
+    # Un cambio en la gramática o en los nodos invalida todas las entradas.
+    # Se calcula una vez por proceso: en un lote se usa para cada archivo.
+    global _tag
+    if _tag is None:
+        digest = tables.source_digest("ast_nodes.py", "lexer.py", "parser.py", "rdparser.py", "progcache.py")
+        _tag = f"v{FORMAT_VERSION}-{digest:08x}\0".encode()
+    return _tag
+
+
+def _key(text: str) -> str:
+    return hashlib.sha256(_version_tag() + text.encode("utf-8")).hexdigest()
+
+
+def _encode(node: Any) -> Any:
+    # El AST se guarda como tuplas anidadas con marshal: es más compacto y
+    # más rápido de leer que pickle con los nombres de campo de cada nodo
+    if isinstance(node, VarDecl):
+        return (_VAR_DECL, node.pos, node.name, node.var_type.value, _encode(node.expr))
+    if isinstance(node, Assign):
+        return (_ASSIGN, node.pos, node.name, _encode(node.expr))
+    if isinstance(node, Print):
+        return (_PRINT, node.pos, _encode(node.expr))
+    if isinstance(node, Literal):
+        return (_LITERAL, node.pos, node.value, node.lit_type.value)
+    if isinstance(node, Var):
+        return (_VAR, node.pos, node.name)
+    if isinstance(node, BinOp):
+        return (_BINOP, node.pos, node.op, _encode(node.left), _encode(node.right))
+    if isinstance(node, UnaryOp):
+        return (_UNARY, node.pos, node.op, _encode(node.operand))
+    if isinstance(node, Compare):
+        return (_COMPARE, node.pos, node.op, _encode(node.left), _encode(node.right))
+    if isinstance(node, If):
+        return (_IF, node.pos, _encode(node.cond),
+                tuple(_encode(s) for s in node.then_body), tuple(_encode(s) for s in node.else_body))
+    if isinstance(node, While):
+        return (_WHILE, node.pos, _encode(node.cond), tuple(_encode(s) for s in node.body))
+    raise TypeError(f"cannot cache node {type(node).__name__}")
+
+
+def _decode(data: Any) -> Any:
+    kind = data[0]
+    if kind == _VAR_DECL:
+        return VarDecl(pos=data[1], name=data[2], var_type=BasicType(data[3]), expr=_decode(data[4]))
+    if kind == _ASSIGN:
+        return Assign(pos=data[1], name=data[2], expr=_decode(data[3]))
+    if kind == _PRINT:
+        return Print(pos=data[1], expr=_decode(data[2]))
+    if kind == _LITERAL:
+        return Literal(pos=data[1], value=data[2], lit_type=BasicType(data[3]))
+    if kind == _VAR:
+        return Var(pos=data[1], name=data[2])
+    if kind == _BINOP:
+        return BinOp(pos=data[1], op=data[2], left=_decode(data[3]), right=_decode(data[4]))
+    if kind == _UNARY:
+        return UnaryOp(pos=data[1], op=data[2], operand=_decode(data[3]))
+    if kind == _COMPARE:
+        return Compare(pos=data[1], op=data[2], left=_decode(data[3]), right=_decode(data[4]))
+    if kind == _IF:
+        return If(pos=data[1], cond=_decode(data[2]),
+                  then_body=[_decode(s) for s in data[3]], else_body=[_decode(s) for s in data[4]])
+    if kind == _WHILE:
+        return While(pos=data[1], cond=_decode(data[2]), body=[_decode(s) for s in data[3]])
+    raise ValueError(f"unknown node code {kind}")
+
+
+def load(text: str) -> Optional[Program]:
+    path = cache_dir() / (_key(text) + SUFFIX)
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    try:
+        pos, statements = marshal.loads(data)
+        program = Program(pos=pos, statements=[_decode(stmt) for stmt in statements])
+    except Exception:
+        # Entrada dañada o de otro formato: se descarta
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        return None
+    try:
+        # La fecha de modificación hace de "último uso" para el desalojo
+        os.utime(path)
+    except OSError:
+        pass
+    return program
+
+
+def store(text: str, program: Program) -> None:
+    import tempfile
+
+    global _stores
+
+    try:
+        data = marshal.dumps((program.pos, [_encode(stmt) for stmt in program.statements]))
+    except (TypeError, ValueError):
+        # Por ejemplo, expresiones más profundas de lo que marshal admite
+        return
+
+    directory = cache_dir()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        # Se escribe en un temporal del mismo directorio y se renombra, así
+        # otra invocación concurrente nunca lee una entrada a medias
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, directory / (_key(text) + SUFFIX))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        return
+    if _stores % EVICT_EVERY == 0:
+        evict(directory, MAX_BYTES)
+    _stores += 1
+
+
+def evict(directory: Path, max_bytes: int) -> None:
+    # Borra las entradas usadas hace más tiempo hasta que el directorio
+    # quede por debajo de max_bytes
+    entries = []
+    total = 0
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.endswith(SUFFIX):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+    except OSError:
+        return
+    if total <= max_bytes:
+        return
+    entries.sort()
+    for _, size, path in entries:
+        try:
+            os.unlink(path)
+        except OSError:
+            # Otro proceso ya la borró
+            pass
+        total -= size
+        if total <= max_bytes:
+            break
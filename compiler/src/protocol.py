@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import struct
+from typing import Any, Dict, Optional
+
+# Protocolo entre client.py y daemon.py: cada mensaje es un objeto JSON en
+# UTF-8 precedido por su largo en 4 bytes (big endian).
+#
+# Petición:   {"op": "run", "source": ..., "filename": ..., "mode": ...,
+#              "emit": ..., "optimize": ..., "parser": ..., "cache": ...}
+#             {"op": "ping"} o {"op": "stats"}
+# Respuesta:  {"ok": true, "output": ..., "error": ... o null, "seconds": ...}
+#             {"ok": false, "error": ...} si la petición no se pudo atender
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def default_socket() -> str:
+    # UNAM_COMPILER_SOCKET permite elegir otra ruta
+    path = os.environ.get("UNAM_COMPILER_SOCKET")
+    if path:
+        return path
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if not base:
+        import tempfile
+        base = tempfile.gettempdir()
+    return os.path.join(base, f"unam-fi-compilers-{os.getuid()}.sock")
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    data = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    if len(data) > MAX_FRAME:
+        raise ProtocolError(f"message too large ({len(data)} bytes)")
+    return HEADER.pack(len(data)) + data
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    try:
+        message = json.loads(data.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ProtocolError(f"invalid message: {e}")
+    if not isinstance(message, dict):
+        raise ProtocolError("invalid message: expected an object")
+    return message
+
+
+def frame_size(header: bytes) -> int:
+    (size,) = HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise ProtocolError(f"message too large ({size} bytes)")
+    return size
+
+
+def connect(path: Optional[str] = None, port: Optional[int] = None,
+            host: str = "127.0.0.1", timeout: Optional[float] = None) -> socket.socket:
+    # Con `port` se usa TCP, si no el socket Unix en `path`
+    if port is not None:
+        return socket.create_connection((host, port), timeout=timeout)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path or default_socket())
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def request(sock: socket.socket, message: Dict[str, Any]) -> Dict[str, Any]:
+    # Envía una petición y espera su respuesta
+    sock.sendall(encode(message))
+    header = _recv_exactly(sock, HEADER.size)
+    if header is None:
+        raise ProtocolError("connection closed by the daemon")
+    data = _recv_exactly(sock, frame_size(header))
+    if data is None:
+        raise ProtocolError("connection closed by the daemon")
+    return decode(data)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable
+
+from ast_nodes import BasicType, CompileError, LineIndex, Program
+from lexer import ChunkLexer, reset_lexer, new_lexer
+from parser import TREE, syntax_error
+
+if TYPE_CHECKING:
+    from arena import Arena
+
+# Parser descendente escrito a mano para la misma gramática de parser.py,
+# sin pasar por el autómata LALR de PLY (que llama a una función p_* por
+# cada reducción, incluidas expr : term y term : factor). Los operadores
+# binarios se resuelven por precedencia con una pila explícita
+# (shunting-yard), igual que los paréntesis anidados.
+#
+# Usa el mismo lexer de PLY y, al igual que el LALR, lee sólo un token de
+# más: un error se detecta en el mismo token y se reporta con el mismo
+# syntax_error, así que los mensajes (incluido "missing ';'") son idénticos.
+
+# Las comparaciones van por debajo de todos los operadores binarios y no
+# se encadenan
+COMPARISONS = ("EQ", "NE", "LT", "LE", "GT", "GE")
+
+# Precedencia de los operadores binarios (todos asocian a la izquierda)
+BINARY = {
+    "PLUS": 1,
+    "MINUS": 1,
+    "TIMES": 2,
+    "DIVIDE": 2,
+}
+
+# Tokens que pueden seguir a una sentencia (además del final de la
+# entrada) y, dentro de un bloque, a una sentencia del bloque
+STATEMENT_START = ("ID", "PRINT", "SEMICOLON", "IF", "WHILE", "INT", "FLOAT")
+BLOCK_ITEM = ("RBRACE",) + STATEMENT_START
+
+TYPES = {
+    "int": BasicType.INT,
+    "float": BasicType.FLOAT,
+}
+
+
+class _Parser:
+    def __init__(self, lexer: Any, builder: Any) -> None:
+        # `lexer` ya tiene su entrada
+        self.lexer = lexer
+        self.next = self.lexer.token
+        self.builder = builder
+        self.tok = self.next()
+
+    def error(self) -> None:
+        # Siempre lanza CompileError; al final de la entrada recibe None,
+        # igual que con PLY
+        syntax_error(self.lexer, self.tok)
+
+    def expect(self, token_type: str) -> Any:
+        tok = self.tok
+        if tok is None or tok.type != token_type:
+            self.error()
+        self.tok = self.next()
+        return tok
+
+    def program(self) -> Any:
+        # program : stmt_list, con al menos una sentencia
+        statements = self.builder.stmt_list()
+        while True:
+            stmt = self.statement()
+            # El LALR agrega la sentencia a la lista (y con StreamBuilder la
+            # ejecuta) sólo después de revisar el token siguiente: si no
+            # puede iniciar otra sentencia, el error va antes
+            if self.tok is not None and self.tok.type not in STATEMENT_START:
+                self.error()
+            if stmt is not None:
+                statements.append(stmt)
+            if self.tok is None:
+                return self.builder.program(statements)
+
+    def statement(self) -> Any:
+        tok = self.tok
+        if tok is not None and (tok.type == "INT" or tok.type == "FLOAT"):
+            name, expr = self.declaration()
+            return self.builder.var_decl(name.lexpos, name.value, TYPES[tok.value], expr)
+        return self.instruction()
+
+    def declaration(self) -> Any:
+        # type ID ASSIGN expr SEMICOLON, sin el tipo, que es el token actual
+        self.tok = self.next()
+        name = self.expect("ID")
+        self.expect("ASSIGN")
+        expr = self.expr()
+        self.expect("SEMICOLON")
+        return name, expr
+
+    def instruction(self) -> Any:
+        tok = self.tok
+        kind = tok.type if tok is not None else None
+        b = self.builder
+
+        if kind == "ID":
+            self.tok = self.next()
+            op = self.tok
+            if op is None or op.type not in ("ASSIGN", "PLUS_ASSIGN", "MINUS_ASSIGN"):
+                self.error()
+            self.tok = self.next()
+            expr = self.expr()
+            self.expect("SEMICOLON")
+            if op.type != "ASSIGN":
+                # x += e es x = x + e
+                expr = b.binop(tok.lexpos, op.value[0], b.var(tok.lexpos, tok.value), expr)
+            return b.assign(tok.lexpos, tok.value, expr)
+
+        if kind == "PRINT":
+            self.tok = self.next()
+            self.expect("LPAREN")
+            string = self.tok
+            if string is not None and string.type == "STRING":
+                self.tok = self.next()
+                expr = b.literal(tok.lexpos, string.value, BasicType.STRING)
+            else:
+                expr = self.expr()
+            self.expect("RPAREN")
+            self.expect("SEMICOLON")
+            return b.print_(tok.lexpos, expr)
+
+        if kind == "SEMICOLON":
+            self.tok = self.next()
+            return None
+
+        if kind == "IF":
+            return self.if_statement()
+
+        if kind == "WHILE":
+            self.tok = self.next()
+            cond = self.expr()
+            return b.while_(tok.lexpos, cond, self.block())
+
+        self.error()
+
+    def if_statement(self) -> Any:
+        # IF expr block [ELSE (block | if_statement)]
+        tok = self.tok
+        b = self.builder
+        self.tok = self.next()
+        cond = self.expr()
+        then_body = self.block()
+        if self.tok is None or self.tok.type != "ELSE":
+            return b.if_(tok.lexpos, cond, then_body, b.block())
+        self.tok = self.next()
+        if self.tok is not None and self.tok.type == "IF":
+            else_body = b.block()
+            else_body.append(self.if_statement())
+        else:
+            else_body = self.block()
+        return b.if_(tok.lexpos, cond, then_body, else_body)
+
+    def block(self) -> Any:
+        self.expect("LBRACE")
+        items = self.builder.block()
+        while self.tok is None or self.tok.type != "RBRACE":
+            if self.tok is not None and self.tok.type in ("INT", "FLOAT"):
+                name, _ = self.declaration()
+                # Mismo error que en parser.py, que lo lanza al reducir la
+                # declaración: antes lee el token siguiente, que tiene que
+                # poder seguir en el bloque
+                if self.tok is None or self.tok.type not in BLOCK_ITEM:
+                    self.error()
+                raise CompileError(name.lexpos, f"variable '{name.value}' must be declared outside if/while blocks")
+            stmt = self.instruction()
+            if stmt is not None:
+                items.append(stmt)
+        self.tok = self.next()
+        return items
+
+    def expr(self) -> Any:
+        # expr : arith [COMPARISON arith], sin recursión: los operadores se
+        # acomodan por precedencia en una pila (shunting-yard) y cada '('
+        # guarda en `groups` el estado de la expresión que la contiene, así
+        # que la profundidad de paréntesis no depende de la pila de Python.
+        # El token actual vive en `tok` y se devuelve a self.tok al salir.
+        b = self.builder
+        next_ = self.next
+        tok = self.tok
+        groups = []
+        operands = []
+        operators = []
+        compare = None
+        while True:
+            # Un factor: los '-' unarios y luego un número, una variable o
+            # un '(' que abre otra expresión
+            minuses = None
+            while tok is not None and tok.type == "MINUS":
+                if minuses is None:
+                    minuses = []
+                minuses.append(tok)
+                tok = next_()
+            kind = tok.type if tok is not None else None
+            if kind == "LPAREN":
+                tok = next_()
+                groups.append((operands, operators, compare, minuses))
+                operands, operators, compare = [], [], None
+                continue
+            if kind == "NUMBER":
+                node = b.literal(tok.lexpos, tok.value, BasicType.INT)
+            elif kind == "DECIMAL":
+                node = b.literal(tok.lexpos, tok.value, BasicType.FLOAT)
+            elif kind == "ID":
+                node = b.var(tok.lexpos, tok.value)
+            else:
+                self.tok = tok
+                self.error()
+            tok = next_()
+
+            # Después del factor: un operador binario pide el siguiente; si
+            # no, termina la expresión actual (y quizá la del paréntesis
+            # que la contiene)
+            while True:
+                if minuses is not None:
+                    for minus in reversed(minuses):
+                        node = b.unary(minus.lexpos, '-', node)
+                operands.append(node)
+                prec = BINARY.get(tok.type) if tok is not None else None
+                if prec is not None:
+                    # Todos asocian a la izquierda: se reduce lo de igual
+                    # o mayor precedencia antes de apilar el operador
+                    while operators and BINARY[operators[-1].type] >= prec:
+                        op = operators.pop()
+                        right = operands.pop()
+                        operands[-1] = b.binop(op.lexpos, op.value, operands[-1], right)
+                    operators.append(tok)
+                    tok = next_()
+                    break
+                while operators:
+                    op = operators.pop()
+                    right = operands.pop()
+                    operands[-1] = b.binop(op.lexpos, op.value, operands[-1], right)
+                node = operands.pop()
+                if compare is None and tok is not None and tok.type in COMPARISONS:
+                    compare = (tok, node)
+                    tok = next_()
+                    break
+                if compare is not None:
+                    node = b.compare(compare[0].lexpos, compare[0].value, compare[1], node)
+                self.tok = tok
+                if not groups:
+                    return node
+                self.expect("RPAREN")
+                tok = self.tok
+                operands, operators, compare, minuses = groups.pop()
+
+
+class Session:
+    # Igual que parser.Session: un lexer propio por sesión
+    def __init__(self) -> None:
+        self.lexer = new_lexer()
+
+    def parse(self, text: str, builder: Any = TREE) -> Any:
+        reset_lexer(self.lexer, LineIndex(text))
+        self.lexer.input(text)
+        try:
+            return _Parser(self.lexer, builder).program()
+        except CompileError as e:
+            raise e.located(self.lexer.source)
+
+    def parse_stream(self, chunks: Iterable[str], builder: Any) -> Any:
+        # Como parser.Session.parse_stream
+        reset_lexer(self.lexer)
+        try:
+            return _Parser(ChunkLexer(self.lexer, chunks), builder).program()
+        except CompileError as e:
+            raise e.located(self.lexer.source)
+
+
+def parse_source(text: str) -> Program:
+    return Session().parse(text)
+
+
+def parse_arena(text: str) -> "Arena":
+    from arena import Arena
+    return Session().parse(text, Arena())
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+from ast_nodes import (
+    Assign,
+    BasicType,
+    BinOp,
+    COMPARISONS,
+    Compare,
+    CompileError,
+    ExecutionContext,
+    Expr,
+    If,
+    Literal,
+    NUMERIC_TYPES,
+    Print,
+    Program,
+    Statement,
+    UnaryOp,
+    Var,
+    VarDecl,
+    While,
+    assignment_error,
+)
+
+
+class _Analyzer:
+    def __init__(self) -> None:
+        # Variables declaradas hasta la sentencia actual (sólo se declaran
+        # fuera de los bloques, así que es el orden del texto) y su slot: el índice de la variable en `variables`
+        self.scope: Dict[str, int] = {}
+        self.variables: List[Tuple[str, BasicType]] = []
+
+    def type_of(self, name: str) -> BasicType:
+        return self.variables[self.scope[name]][1]
+
+    def statement(self, stmt: Statement) -> None:
+        if isinstance(stmt, VarDecl):
+            stmt.expr = self.expr(stmt.expr)
+            error = assignment_error(stmt.var_type, stmt.expr.static_type, stmt.name)
+            if error is not None:
+                raise CompileError(stmt.pos, error)
+            if stmt.name in self.scope:
+                raise CompileError(stmt.pos, f"variable '{stmt.name}' already declared")
+            stmt.slot = self.scope[stmt.name] = len(self.variables)
+            self.variables.append((stmt.name, stmt.var_type))
+        elif isinstance(stmt, Assign):
+            stmt.expr = self.expr(stmt.expr)
+            if stmt.name not in self.scope:
+                raise CompileError(stmt.pos, f"variable '{stmt.name}' not declared")
+            stmt.slot = self.scope[stmt.name]
+            stmt.var_type = self.type_of(stmt.name)
+            error = assignment_error(stmt.var_type, stmt.expr.static_type, stmt.name)
+            if error is not None:
+                raise CompileError(stmt.pos, error)
+        elif isinstance(stmt, Print):
+            stmt.expr = self.expr(stmt.expr)
+        elif isinstance(stmt, If):
+            stmt.cond = self.expr(stmt.cond)
+            for inner in stmt.then_body:
+                self.statement(inner)
+            for inner in stmt.else_body:
+                self.statement(inner)
+        elif isinstance(stmt, While):
+            stmt.cond = self.expr(stmt.cond)
+            for inner in stmt.body:
+                self.statement(inner)
+        else:
+            raise TypeError(f"cannot analyze statement {type(stmt).__name__}")
+
+    def expr(self, expr: Expr) -> Expr:
+        # Anota el tipo de la expresión y devuelve la expresión a usar en su
+        # lugar: un Literal si se pudo evaluar en tiempo de compilación
+        if isinstance(expr, Literal):
+            expr.static_type = expr.lit_type
+            return expr
+
+        if isinstance(expr, Var):
+            if expr.name not in self.scope:
+                raise CompileError(expr.pos, f"variable '{expr.name}' not declared")
+            expr.slot = self.scope[expr.name]
+            expr.static_type = self.type_of(expr.name)
+            return expr
+
+        if isinstance(expr, UnaryOp):
+            expr.operand = self.expr(expr.operand)
+            if expr.operand.static_type not in NUMERIC_TYPES:
+                raise CompileError(expr.pos, f"unary operator '{expr.op}' not supported for non-numeric type")
+            if expr.op != '-':
+                raise CompileError(expr.pos, f"unknown unary operator '{expr.op}'")
+            expr.static_type = expr.operand.static_type
+            if isinstance(expr.operand, Literal):
+                return self.fold(expr)
+            return expr
+
+        if isinstance(expr, BinOp):
+            expr.left = self.expr(expr.left)
+            expr.right = self.expr(expr.right)
+            lt, rt = expr.left.static_type, expr.right.static_type
+            if lt not in NUMERIC_TYPES or rt not in NUMERIC_TYPES:
+                raise CompileError(expr.pos, f"binary operator '{expr.op}' not supported for non-numeric types")
+            if expr.op not in ('+', '-', '*', '/'):
+                raise CompileError(expr.pos, f"unknown binary operator '{expr.op}'")
+            if expr.op == '/' or BasicType.FLOAT in (lt, rt):
+                expr.static_type = BasicType.FLOAT
+            else:
+                expr.static_type = BasicType.INT
+            if isinstance(expr.left, Literal) and isinstance(expr.right, Literal):
+                # La división entre cero se deja para la ejecución, con su
+                # error en el momento en que se alcanza
+                if expr.op != '/' or expr.right.value != 0:
+                    return self.fold(expr)
+            return expr
+
+        if isinstance(expr, Compare):
+            expr.left = self.expr(expr.left)
+            expr.right = self.expr(expr.right)
+            if expr.left.static_type not in NUMERIC_TYPES or expr.right.static_type not in NUMERIC_TYPES:
+                raise CompileError(expr.pos, f"comparison operator '{expr.op}' not supported for non-numeric types")
+            if expr.op not in COMPARISONS:
+                raise CompileError(expr.pos, f"unknown comparison operator '{expr.op}'")
+            expr.static_type = BasicType.INT
+            if isinstance(expr.left, Literal) and isinstance(expr.right, Literal):
+                return self.fold(expr)
+            return expr
+
+        raise TypeError(f"cannot analyze expression {type(expr).__name__}")
+
+    def fold(self, expr: Expr) -> Literal:
+        # Se evalúa con el mismo eval del nodo para obtener exactamente el
+        # mismo valor que en ejecución
+        value_type, value = expr.eval(ExecutionContext())
+        literal = Literal(pos=expr.pos, value=value, lit_type=value_type)
+        literal.static_type = value_type
+        return literal
+
+
+def analyze(program: Program) -> Program:
+    # Revisa los tipos y declaraciones de todo el programa antes de
+    # ejecutarlo (lanza el primer CompileError que encuentre), anota el tipo
+    # de cada expresión, asigna un slot a cada variable y pliega las
+    # subexpresiones constantes. El programa se modifica en su lugar.
+    analyzer = _Analyzer()
+    for stmt in program.statements:
+        analyzer.statement(stmt)
+    program.variables = analyzer.variables
+    # Las condiciones pudieron cambiar: los saltos se vuelven a generar
+    program.code = None
+    return program
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+import zlib
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Optional
+
+import ply
+
+# Cambiar al modificar la forma en que se guardan las tablas
+CACHE_VERSION = 1
+
+LEXTAB = "unam_lextab"
+PARSETAB = "unam_parsetab"
+
+HERE = Path(__file__).resolve().parent
+
+# Segundos que tomó obtener cada tabla y si vino del caché, para --startup-report
+timings: Dict[str, float] = {}
+cache_hits: Dict[str, bool] = {}
+
+
+def cache_root() -> Path:
+    # UNAM_COMPILER_CACHE permite elegir otra ubicación (por ejemplo en CI)
+    base = os.environ.get("UNAM_COMPILER_CACHE")
+    if not base:
+        xdg = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+        base = os.path.join(xdg, "unam-fi-compilers")
+    return Path(base)
+
+
+def source_digest(*names: str) -> int:
+    # CRC de los archivos fuente del compilador que definen lo que se guarda
+    digest = 0
+    for name in names:
+        digest = zlib.crc32((HERE / name).read_bytes(), digest)
+    return digest
+
+
+def cache_dir() -> Path:
+    # El nombre del directorio incluye las versiones y un hash de la
+    # gramática, así que al cambiar lexer.py o parser.py se usan tablas nuevas
+    digest = source_digest("lexer.py", "parser.py")
+    key = f"v{CACHE_VERSION}-ply{ply.__version__}-py{sys.version_info[0]}{sys.version_info[1]}-{digest:08x}"
+    return cache_root() / key
+
+
+def _load(path: Path) -> Optional[ModuleType]:
+    # Se ejecuta el archivo a mano en lugar de importarlo: así no hace falta
+    # tocar sys.path ni importar importlib.util en cada arranque
+    try:
+        source = path.read_bytes()
+    except OSError:
+        return None
+    try:
+        module = ModuleType(path.stem)
+        module.__file__ = str(path)
+        exec(compile(source, str(path), "exec"), module.__dict__)
+        return module
+    except Exception:
+        # Tabla dañada: se vuelve a generar
+        return None
+
+
+def _publish(directory: Path, name: str, write) -> None:
+    # PLY escribe el archivo directamente; se genera en un directorio
+    # temporal y se mueve con os.replace para que otro proceso nunca lea
+    # una tabla a medio escribir
+    import shutil
+    import tempfile
+
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=directory)
+    except OSError:
+        return
+    try:
+        write(tmp)
+        os.replace(os.path.join(tmp, name + ".py"), directory / (name + ".py"))
+    except OSError:
+        pass
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def build_lexer(module: ModuleType) -> "lex.Lexer":
+    import ply.lex as lex
+
+    start = time.perf_counter()
+    directory = cache_dir()
+    tab = _load(directory / (LEXTAB + ".py"))
+    cache_hits["lexer"] = tab is not None
+    if tab is not None:
+        lexer = lex.lex(module=module, optimize=True, lextab=tab)
+    else:
+        lexer = lex.lex(module=module)
+        _publish(directory, LEXTAB, lambda tmp: lexer.writetab(LEXTAB, tmp))
+    timings["lexer"] = time.perf_counter() - start
+    return lexer
+
+
+def build_parser(module: ModuleType, start_symbol: str) -> "yacc.LRParser":
+    import ply.yacc as yacc
+
+    start = time.perf_counter()
+    directory = cache_dir()
+    tab = _load(directory / (PARSETAB + ".py"))
+    cache_hits["parser"] = tab is not None
+    if tab is not None:
+        # La llave del directorio ya cubre la gramática, así que no hace
+        # falta comparar la firma (optimize=True)
+        parser = yacc.yacc(
+            module=module, start=start_symbol, tabmodule=tab,
+            optimize=True, debug=False, write_tables=False,
+        )
+    else:
+        holder = {}
+
+        def write(tmp: str) -> None:
+            holder["parser"] = yacc.yacc(
+                module=module, start=start_symbol, tabmodule=PARSETAB,
+                outputdir=tmp, debug=False, write_tables=True,
+            )
+
+        _publish(directory, PARSETAB, write)
+        parser = holder.get("parser")
+        if parser is None:
+            # Sin caché disponible: tablas sólo en memoria
+            parser = yacc.yacc(module=module, start=start_symbol, debug=False, write_tables=False)
+    timings["parser"] = time.perf_counter() - start
+    return parser
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Dict, List, Tuple
+
+from ast_nodes import (
+    Assign,
+    BasicType,
+    BinOp,
+    COMPARISONS,
+    Compare,
+    CompileError,
+    ExecutionContext,
+    Expr,
+    If,
+    Literal,
+    NUMERIC_TYPES,
+    Print,
+    Program,
+    Statement,
+    UnaryOp,
+    Var,
+    VarDecl,
+    While,
+    assignment_error,
+)
+
+ENTRY = "_program"
+
+# Cada tantos niveles de una expresión el valor se guarda en un temporal:
+# así el código generado nunca anida más paréntesis de los que admite el
+# parser de Python (una cadena de 300 sumas serían 300 niveles)
+NEST = 32
+
+# Límites del compilador de Python: ciclos anidados en una función y
+# niveles de sangría. Un programa que los pasa (incluida una cadena larga
+# de else if) corre con closures.
+MAX_LOOPS = 20
+MAX_INDENT = 99
+
+
+class _Fails(Exception):
+    # La sentencia siempre falla a partir de este punto: lo que quede de
+    # ella no se genera
+    pass
+
+
+class _Transpiler:
+    def __init__(self) -> None:
+        self.body: List[str] = []
+        self.consts: List[Any] = []
+        self.scope: Dict[str, BasicType] = {}
+        self.temps = 0
+        # Nivel de la expresión que se está generando (ver NEST)
+        self.level = 0
+        # Nivel de sangría: los if/while del programa son if/while de Python
+        self.indent = 1
+        self.max_indent = 1
+        self.loops = 0
+        self.max_loops = 0
+
+    def emit(self, code: str) -> None:
+        self.max_indent = max(self.max_indent, self.indent)
+        self.body.append("    " * self.indent + code)
+
+    def fail(self, pos: int, message: str) -> None:
+        self.emit(f"raise _CompileError({pos}, {message!r})")
+        raise _Fails
+
+    def temp(self, value: str) -> str:
+        self.temps += 1
+        name = f"_t{self.temps}"
+        self.emit(f"{name} = {value}")
+        return name
+
+    def literal(self, value: Any) -> str:
+        if isinstance(value, int) or (isinstance(value, float) and math.isfinite(value)):
+            return repr(value)
+        # Cadenas y floats como inf van por el pool de constantes
+        self.consts.append(value)
+        return f"_consts[{len(self.consts) - 1}]"
+
+    def statement(self, stmt: Statement) -> None:
+        # Los temporales se pueden reutilizar entre sentencias
+        self.temps = 0
+        try:
+            if isinstance(stmt, VarDecl):
+                expr_type, code = self.expr(stmt.expr)
+                error = assignment_error(stmt.var_type, expr_type, stmt.name)
+                if error is None and stmt.name in self.scope:
+                    error = f"variable '{stmt.name}' already declared"
+                if error is not None:
+                    self.fail(stmt.pos, error)
+                self.scope[stmt.name] = stmt.var_type
+                self.emit(f"v_{stmt.name} = {self.convert(stmt.var_type, expr_type, code)}")
+            elif isinstance(stmt, Assign):
+                expr_type, code = self.expr(stmt.expr)
+                if stmt.name not in self.scope:
+                    self.fail(stmt.pos, f"variable '{stmt.name}' not declared")
+                var_type = self.scope[stmt.name]
+                error = assignment_error(var_type, expr_type, stmt.name)
+                if error is not None:
+                    self.fail(stmt.pos, error)
+                self.emit(f"v_{stmt.name} = {self.convert(var_type, expr_type, code)}")
+            elif isinstance(stmt, Print):
+                _, code = self.expr(stmt.expr)
+                self.emit(f"_print({code})")
+            elif isinstance(stmt, If):
+                self.emit(f"if {self.condition(stmt.cond)}:")
+                self.block(stmt.then_body)
+                if stmt.else_body:
+                    self.emit("else:")
+                    self.block(stmt.else_body)
+            elif isinstance(stmt, While):
+                self.emit("while True:")
+                head = len(self.body)
+                self.indent += 1
+                self.loops += 1
+                self.max_loops = max(self.max_loops, self.loops)
+                try:
+                    cond = self.condition(stmt.cond)
+                    if len(self.body) == head:
+                        # La condición no usó temporales: va en el while
+                        self.body[-1] = "    " * (self.indent - 1) + f"while {cond}:"
+                    else:
+                        self.emit(f"if not {cond}: break")
+                    self.suite(stmt.body)
+                finally:
+                    self.indent -= 1
+                    self.loops -= 1
+            else:
+                raise TypeError(f"cannot transpile statement {type(stmt).__name__}")
+        except _Fails:
+            pass
+
+    def block(self, statements: List[Statement]) -> None:
+        self.indent += 1
+        try:
+            self.suite(statements)
+        finally:
+            self.indent -= 1
+
+    def suite(self, statements: List[Statement]) -> None:
+        start = len(self.body)
+        for stmt in statements:
+            self.statement(stmt)
+        if len(self.body) == start:
+            self.emit("pass")
+
+    def condition(self, expr: Expr) -> str:
+        # Una comparación como condición no necesita volverse 1 o 0
+        if isinstance(expr, Compare):
+            return self.compare(expr)
+        return self.expr(expr)[1]
+
+    def compare(self, expr: Compare) -> str:
+        lt, left = self.expr(expr.left)
+        rt, right = self.expr(expr.right)
+        if lt not in NUMERIC_TYPES or rt not in NUMERIC_TYPES:
+            self.fail(expr.pos, f"comparison operator '{expr.op}' not supported for non-numeric types")
+        if expr.op not in COMPARISONS:
+            self.fail(expr.pos, f"unknown comparison operator '{expr.op}'")
+        return f"({left} {expr.op} {right})"
+
+    def convert(self, var_type: BasicType, expr_type: BasicType, code: str) -> str:
+        if var_type == BasicType.FLOAT and expr_type == BasicType.INT:
+            return f"_float({code})"
+        return code
+
+    def expr(self, expr: Expr) -> Tuple[BasicType, str]:
+        self.level += 1
+        try:
+            expr_type, code = self._expr(expr)
+        finally:
+            self.level -= 1
+        if self.level and self.level % NEST == 0 and code.startswith("("):
+            code = self.temp(code)
+        return expr_type, code
+
+    def _expr(self, expr: Expr) -> Tuple[BasicType, str]:
+        # Devuelve el tipo y el código Python de la expresión. Lo único que
+        # puede fallar al ejecutar es la división, así que sus operandos se
+        # sacan a temporales (en el orden de evaluación original) para
+        # revisar el divisor antes de dividir. El resto no tiene efectos, así
+        # que un error fijo se puede lanzar sin evaluar la expresión.
+        if isinstance(expr, Literal):
+            return expr.lit_type, self.literal(expr.value)
+
+        if isinstance(expr, Var):
+            if expr.name not in self.scope:
+                self.fail(expr.pos, f"variable '{expr.name}' not declared")
+            return self.scope[expr.name], f"v_{expr.name}"
+
+        if isinstance(expr, UnaryOp):
+            t, code = self.expr(expr.operand)
+            if t not in NUMERIC_TYPES:
+                self.fail(expr.pos, f"unary operator '{expr.op}' not supported for non-numeric type")
+            if expr.op != '-':
+                self.fail(expr.pos, f"unknown unary operator '{expr.op}'")
+            return t, f"(-{code})"
+
+        if isinstance(expr, BinOp):
+            lt, left = self.expr(expr.left)
+            if expr.op == '/':
+                left = self.temp(left)
+            rt, right = self.expr(expr.right)
+            if lt not in NUMERIC_TYPES or rt not in NUMERIC_TYPES:
+                self.fail(expr.pos, f"binary operator '{expr.op}' not supported for non-numeric types")
+            if expr.op == '/':
+                right = self.temp(right)
+                self.emit(f"if {right} == 0: raise _CompileError({expr.pos}, 'division by zero')")
+                return BasicType.FLOAT, f"(_float({left}) / _float({right}))"
+            if expr.op not in ('+', '-', '*'):
+                self.fail(expr.pos, f"unknown binary operator '{expr.op}'")
+            result_type = BasicType.FLOAT if BasicType.FLOAT in (lt, rt) else BasicType.INT
+            return result_type, f"({left} {expr.op} {right})"
+
+        if isinstance(expr, Compare):
+            return BasicType.INT, f"(1 if {self.compare(expr)} else 0)"
+
+        raise TypeError(f"cannot transpile expression {type(expr).__name__}")
+
+
+def _transpile(program: Program) -> _Transpiler:
+    t = _Transpiler()
+    for stmt in program.statements:
+        t.statement(stmt)
+    return t
+
+
+def _source(t: _Transpiler) -> str:
+    header = f"def {ENTRY}(_print, _float, _CompileError, _consts):"
+    return "\n".join([header] + (t.body or ["    pass"])) + "\n"
+
+
+def to_python(program: Program) -> Tuple[str, List[Any]]:
+    # Genera el código de una función `_program` equivalente al programa y
+    # el pool de constantes que usa. Cada variable `x` es la local `v_x`.
+    t = _transpile(program)
+    return _source(t), t.consts
+
+
+def compile_program(program: Program, filename: str = "<program>") -> Callable[[ExecutionContext], None]:
+    import closures
+
+    try:
+        # El recorrido del transpilador también es recursivo: una
+        # expresión demasiado profunda para él cae igual que para compile()
+        t = _transpile(program)
+        if t.max_loops > MAX_LOOPS or t.max_indent > MAX_INDENT:
+            return closures.compile_program(program)
+        source, consts = _source(t), t.consts
+        code = compile(source, filename, "exec")
+    except (SyntaxError, RecursionError, MemoryError):
+        # Un programa que pasa algún límite del compilador de Python corre
+        # con closures (o, si también las pasa, con el recorrido del
+        # árbol), que dan los mismos resultados
+        return closures.compile_program(program)
+    namespace: Dict[str, Any] = {}
+    exec(code, namespace)
+    function = namespace[ENTRY]
+
+    def run(ctx: ExecutionContext) -> None:
+        # Las variables viven como locales de la función, no en ctx.symbols
+        function(ctx.out.write, float, CompileError, consts)
+
+    return run
@@ -0,0 +1,484 @@
+from __future__ import annotations
+
+import operator
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from ast_nodes import (
+    Assign,
+    BasicType,
+    BinOp,
+    COMPARISONS,
+    Compare,
+    CompileError,
+    Expr,
+    If,
+    LineIndex,
+    Literal,
+    NUMERIC_TYPES,
+    Print,
+    Program,
+    Statement,
+    UnaryOp,
+    Var,
+    VarDecl,
+    While,
+    assignment_error,
+)
+
+# Un valor es una columna (np.ndarray de largo n) o un escalar de Python que
+# vale lo mismo en todas las filas. Las columnas int son int64 mientras no
+# se desborden; si una operación se desborda se repite con dtype=object
+# (ints de Python) para conservar el resultado exacto de la ejecución normal.
+
+_I64_MIN = -2 ** 63
+_I64_MAX = 2 ** 63 - 1
+
+_PY_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+}
+
+
+class _Stop(Exception):
+    # Ya no queda ninguna fila viva: el resto del programa no se ejecuta
+    pass
+
+
+@dataclass
+class SweepResult:
+    rows: int
+    # Una entrada por print ejecutado: (posición en el texto, valor, filas
+    # que imprimieron o None si fueron todas)
+    prints: List[Tuple[int, Any, Optional[np.ndarray]]]
+    # Para cada fila, el índice de su error en `errors` o -1
+    error_index: np.ndarray
+    errors: List[CompileError]
+    # Valor final de cada variable declarada
+    variables: Dict[str, np.ndarray]
+    # Índice de líneas del texto del programa, para reportar las posiciones
+    source: LineIndex
+
+    @property
+    def failed(self) -> np.ndarray:
+        return self.error_index >= 0
+
+    def error(self, row: int) -> Optional[CompileError]:
+        index = self.error_index[row]
+        return self.errors[index] if index >= 0 else None
+
+    def printed(self, k: int, row: int) -> Optional[Any]:
+        # Lo que imprimió el print k en la fila, o None si no llegó a él
+        _, value, mask = self.prints[k]
+        if mask is not None and not mask[row]:
+            return None
+        return _item(value, row)
+
+    def row_output(self, row: int) -> str:
+        # El texto que habría impreso la ejecución normal con los valores de
+        # esa fila, incluido el mensaje de error
+        out = []
+        for k in range(len(self.prints)):
+            value = self.printed(k, row)
+            if value is not None:
+                out.append(f"{value}\n")
+        error = self.error(row)
+        if error is not None:
+            out.append(f"{error}\n")
+        return "".join(out)
+
+
+def _item(value: Any, row: int) -> Any:
+    if isinstance(value, np.ndarray):
+        value = value[row]
+    # Escalares de NumPy a int/float de Python, para imprimirlos igual
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _is_column(value: Any) -> bool:
+    return isinstance(value, np.ndarray)
+
+
+def _fits_int64(value: Any) -> bool:
+    if _is_column(value):
+        return value.dtype == np.int64
+    return _I64_MIN <= value <= _I64_MAX
+
+
+def _exact(value: Any) -> Any:
+    return value.astype(object) if _is_column(value) and value.dtype != object else value
+
+
+def _to_float(value: Any) -> Any:
+    if _is_column(value):
+        return value if value.dtype == np.float64 else value.astype(np.float64)
+    return float(value)
+
+
+def _overflowed(op: str, a: Any, b: Any, result: np.ndarray) -> bool:
+    if op == '+':
+        return bool((((a ^ result) & (b ^ result)) < 0).any())
+    if op == '-':
+        return bool((((a ^ b) & (a ^ result)) < 0).any())
+    # Para '*' basta una cota con floats; un falso positivo cerca del
+    # límite sólo hace que se calcule con ints de Python
+    return bool((np.abs(np.multiply(a, b, dtype=np.float64)) >= 2.0 ** 62).any())
+
+
+def _int_op(op: str, a: Any, b: Any) -> Any:
+    if not (_is_column(a) or _is_column(b)):
+        return _PY_OPS[op](a, b)
+    if _fits_int64(a) and _fits_int64(b):
+        result = _PY_OPS[op](a if _is_column(a) else np.int64(a), b)
+        if not _overflowed(op, a, b, result):
+            return result
+    return _PY_OPS[op](_exact(a), _exact(b))
+
+
+def _float_op(op: str, a: Any, b: Any) -> Any:
+    return _PY_OPS[op](_to_float(a), _to_float(b))
+
+
+def _inexact_float(value: Any) -> bool:
+    # Un int que float64 no representa exactamente
+    if _is_column(value):
+        if value.dtype == np.int64:
+            return bool(((value > 2 ** 53) | (value < -2 ** 53)).any())
+        return value.dtype == object
+    return isinstance(value, int) and abs(value) > 2 ** 53
+
+
+def _compare(op: str, a: Any, b: Any, mixed: bool) -> Any:
+    # NumPy compara int64 con float64 pasando por float; si eso cambia el
+    # resultado (o hay ints de Python) se compara como Python, exacto
+    compare = COMPARISONS[op]
+    if not (_is_column(a) or _is_column(b)):
+        return 1 if compare(a, b) else 0
+    if not (_native(a) and _native(b)) or (mixed and (_inexact_float(a) or _inexact_float(b))):
+        a, b = _exact(a), _exact(b)
+    return np.asarray(compare(a, b), dtype=bool).astype(np.int64)
+
+
+def _native(value: Any) -> bool:
+    # Se puede combinar con np.where sin perder exactitud
+    if _is_column(value):
+        return value.dtype != object
+    return not isinstance(value, int) or _I64_MIN <= value <= _I64_MAX
+
+
+def _merge(mask: np.ndarray, new: Any, old: Any, rows: int) -> np.ndarray:
+    # `new` en las filas de mask y `old` en las demás
+    if _native(new) and _native(old):
+        return np.where(mask, new, old)
+    merged = np.empty(rows, dtype=object)
+    merged[:] = _exact(old)
+    merged[mask] = _exact(new)[mask] if _is_column(new) else new
+    return merged
+
+
+class _Sweep:
+    def __init__(self, rows: int, bindings: Dict[str, np.ndarray]) -> None:
+        self.rows = rows
+        self.bindings = bindings
+        self.alive = np.ones(rows, dtype=bool)
+        self.all_alive = True
+        self.error_index = np.full(rows, -1, dtype=np.int32)
+        self.errors: List[CompileError] = []
+        self.prints: List[Tuple[int, Any, Optional[np.ndarray]]] = []
+        # Tipo y valor de cada variable declarada hasta la sentencia actual
+        # (sólo se declaran fuera de los if/while, así que los tipos se
+        # conocen en el orden del texto)
+        self.scope: Dict[str, Tuple[BasicType, Any]] = {}
+
+    def fail(self, mask: np.ndarray, pos: int, message: str) -> None:
+        # Las filas de `mask` (todas vivas) terminan con este error
+        self.error_index[mask] = len(self.errors)
+        self.errors.append(CompileError(pos, message))
+        self.alive &= ~mask
+        self.all_alive = False
+        if not self.alive.any():
+            raise _Stop
+
+    def fail_all(self, pos: int, message: str) -> None:
+        # Un error que no depende de los datos: termina todas las filas vivas
+        self.fail(self.alive.copy(), pos, message)
+
+    def enter(self, mask: np.ndarray) -> None:
+        # Las sentencias siguientes se ejecutan sólo en las filas de mask
+        self.alive = mask.copy()
+        self.all_alive = bool(mask.all())
+
+    def resume(self, mask: np.ndarray) -> None:
+        self.enter(mask)
+        if not mask.any():
+            raise _Stop
+
+    def truth(self, value: Any) -> np.ndarray:
+        # Filas vivas en las que la condición no es cero
+        if _is_column(value):
+            return self.alive & np.asarray(value != 0, dtype=bool)
+        return self.alive.copy() if value else np.zeros(self.rows, dtype=bool)
+
+    def block(self, statements: List[Statement], mask: np.ndarray) -> np.ndarray:
+        # Ejecuta el bloque en las filas de mask (un if o while recorre cada
+        # rama con las filas que la toman); devuelve las que siguen vivas
+        if not mask.any():
+            return mask
+        self.enter(mask)
+        try:
+            for stmt in statements:
+                self.statement(stmt)
+        except _Stop:
+            pass
+        return self.alive
+
+    def store(self, name: str, var_type: BasicType, value: Any, declare: bool) -> None:
+        if var_type == BasicType.FLOAT:
+            value = _to_float(value)
+        if not declare and not self.all_alive:
+            # Las filas que ya fallaron conservan el valor que tenían
+            value = _merge(self.alive, value, self.scope[name][1], self.rows)
+        self.scope[name] = (var_type, value)
+
+    def statement(self, stmt: Statement) -> None:
+        if isinstance(stmt, VarDecl):
+            if stmt.name in self.bindings and stmt.name not in self.scope:
+                # El valor de una variable ligada sale de su columna; el
+                # inicializador del programa no se evalúa
+                self.store(stmt.name, stmt.var_type, self.bindings[stmt.name], declare=True)
+                return
+            expr_type, value = self.expr(stmt.expr)
+            error = assignment_error(stmt.var_type, expr_type, stmt.name)
+            if error is None and stmt.name in self.scope:
+                error = f"variable '{stmt.name}' already declared"
+            if error is not None:
+                self.fail_all(stmt.pos, error)
+            self.store(stmt.name, stmt.var_type, value, declare=True)
+        elif isinstance(stmt, Assign):
+            expr_type, value = self.expr(stmt.expr)
+            if stmt.name not in self.scope:
+                self.fail_all(stmt.pos, f"variable '{stmt.name}' not declared")
+            var_type = self.scope[stmt.name][0]
+            error = assignment_error(var_type, expr_type, stmt.name)
+            if error is not None:
+                self.fail_all(stmt.pos, error)
+            self.store(stmt.name, var_type, value, declare=False)
+        elif isinstance(stmt, Print):
+            _, value = self.expr(stmt.expr)
+            self.prints.append((stmt.pos, value, None if self.all_alive else self.alive.copy()))
+        elif isinstance(stmt, If):
+            _, value = self.expr(stmt.cond)
+            taken = self.truth(value)
+            rest = self.alive & ~taken
+            alive = self.block(stmt.then_body, taken)
+            alive = alive | self.block(stmt.else_body, rest)
+            self.resume(alive)
+        elif isinstance(stmt, While):
+            # Cada vuelta sigue con las filas cuya condición no es cero; las
+            # demás esperan en `done` a que terminen todas
+            done = np.zeros(self.rows, dtype=bool)
+            running = self.alive.copy()
+            while running.any():
+                self.enter(running)
+                try:
+                    _, value = self.expr(stmt.cond)
+                except _Stop:
+                    break
+                stay = self.truth(value)
+                done |= self.alive & ~stay
+                running = self.block(stmt.body, stay)
+            self.resume(done)
+        else:
+            raise TypeError(f"cannot vectorize statement {type(stmt).__name__}")
+
+    def expr(self, expr: Expr) -> Tuple[BasicType, Any]:
+        if isinstance(expr, Literal):
+            return expr.lit_type, expr.value
+
+        if isinstance(expr, Var):
+            if expr.name not in self.scope:
+                self.fail_all(expr.pos, f"variable '{expr.name}' not declared")
+            return self.scope[expr.name]
+
+        if isinstance(expr, UnaryOp):
+            t, v = self.expr(expr.operand)
+            if t not in NUMERIC_TYPES:
+                self.fail_all(expr.pos, f"unary operator '{expr.op}' not supported for non-numeric type")
+            if expr.op != '-':
+                self.fail_all(expr.pos, f"unknown unary operator '{expr.op}'")
+            if t == BasicType.INT and _is_column(v) and v.dtype == np.int64 and (v == _I64_MIN).any():
+                v = _exact(v)
+            return t, -v
+
+        if isinstance(expr, BinOp):
+            lt, lv = self.expr(expr.left)
+            rt, rv = self.expr(expr.right)
+            if lt not in NUMERIC_TYPES or rt not in NUMERIC_TYPES:
+                self.fail_all(expr.pos, f"binary operator '{expr.op}' not supported for non-numeric types")
+            if expr.op == '/':
+                return BasicType.FLOAT, self.divide(expr.pos, lv, rv)
+            if expr.op not in _PY_OPS:
+                self.fail_all(expr.pos, f"unknown binary operator '{expr.op}'")
+            if BasicType.FLOAT in (lt, rt):
+                return BasicType.FLOAT, _float_op(expr.op, lv, rv)
+            # int op int: el int() de BinOp.eval no cambia el valor, el
+            # resultado sólo tiene que ser exacto
+            return BasicType.INT, _int_op(expr.op, lv, rv)
+
+        if isinstance(expr, Compare):
+            lt, lv = self.expr(expr.left)
+            rt, rv = self.expr(expr.right)
+            if lt not in NUMERIC_TYPES or rt not in NUMERIC_TYPES:
+                self.fail_all(expr.pos, f"comparison operator '{expr.op}' not supported for non-numeric types")
+            if expr.op not in COMPARISONS:
+                self.fail_all(expr.pos, f"unknown comparison operator '{expr.op}'")
+            return BasicType.INT, _compare(expr.op, lv, rv, lt != rt)
+
+        raise TypeError(f"cannot vectorize expression {type(expr).__name__}")
+
+    def divide(self, pos: int, lv: Any, rv: Any) -> Any:
+        # La división entre cero se reporta sólo en las filas en que ocurre
+        if not _is_column(rv):
+            if rv == 0:
+                self.fail_all(pos, "division by zero")
+            return _to_float(lv) / float(rv)
+        zero = rv == 0
+        if zero.any():
+            dead = zero & self.alive
+            if dead.any():
+                self.fail(dead, pos, "division by zero")
+            # En las filas que fallaron el resultado ya no se usa
+            rv = np.where(zero, 1, rv)
+        return _to_float(lv) / _to_float(rv)
+
+
+def _column(name: str, var_type: BasicType, data: Any) -> np.ndarray:
+    column = np.asarray(data)
+    if column.ndim != 1:
+        raise ValueError(f"binding for '{name}' must be one-dimensional")
+    if var_type == BasicType.INT:
+        if column.dtype == object:
+            if not all(isinstance(v, int) for v in column):
+                raise ValueError(f"binding for int variable '{name}' must hold integers")
+            return column
+        if not (np.issubdtype(column.dtype, np.integer) or column.dtype == bool):
+            raise ValueError(f"binding for int variable '{name}' must hold integers")
+        if column.dtype == np.uint64 and column.size and column.max() > _I64_MAX:
+            return column.astype(object)
+        return column.astype(np.int64)
+    if not (np.issubdtype(column.dtype, np.number) or column.dtype == bool):
+        raise ValueError(f"binding for float variable '{name}' must be numeric")
+    return column.astype(np.float64)
+
+
+def run_sweep(program: Program, bindings: Mapping[str, Any], source: LineIndex) -> SweepResult:
+    # Ejecuta el programa una vez por fila de `bindings` (columnas del mismo
+    # largo, una por variable), pero operando sobre columnas completas. Cada
+    # variable ligada toma su valor de la columna en su declaración.
+    # `source` es el índice de líneas del texto de `program`.
+    declared: Dict[str, BasicType] = {}
+    for stmt in program.statements:
+        if isinstance(stmt, VarDecl):
+            declared.setdefault(stmt.name, stmt.var_type)
+    columns: Dict[str, np.ndarray] = {}
+    for name, data in bindings.items():
+        if name not in declared:
+            raise ValueError(f"bound variable '{name}' is never declared")
+        columns[name] = _column(name, declared[name], data)
+    lengths = {len(c) for c in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("all bindings must have the same length")
+    rows = lengths.pop() if lengths else 1
+
+    sweep = _Sweep(rows, columns)
+    with np.errstate(all="ignore"):
+        try:
+            for stmt in program.statements:
+                sweep.statement(stmt)
+        except _Stop:
+            pass
+    variables = {
+        name: np.broadcast_to(np.asarray(value), (rows,)) if not _is_column(value) else value
+        for name, (_, value) in sweep.scope.items()
+    }
+    errors = [e.located(source) for e in sweep.errors]
+    return SweepResult(rows, sweep.prints, sweep.error_index, errors, variables, source)
+
+
+def parse_binding(spec: str) -> Tuple[str, np.ndarray]:
+    # NOMBRE=inicio:fin[:paso] (como range, con floats si alguno lo es),
+    # NOMBRE=v1,v2,... o NOMBRE=archivo (.npy o texto con un valor por línea)
+    name, sep, values = spec.partition("=")
+    if not sep or not name.isidentifier():
+        raise ValueError(f"invalid binding {spec!r}, expected NAME=VALUES")
+    if ":" in values:
+        parts = [_number(p) for p in values.split(":")]
+        if len(parts) not in (2, 3):
+            raise ValueError(f"invalid range {values!r}, expected start:stop[:step]")
+        return name, np.arange(*parts)
+    if "," in values or _is_number(values):
+        return name, np.array([_number(v) for v in values.split(",")])
+    if values.endswith(".npy"):
+        return name, np.load(values)
+    with open(values, encoding="utf-8") as fh:
+        return name, np.array([_number(v) for v in fh.read().split()])
+
+
+def _is_number(text: str) -> bool:
+    try:
+        _number(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _number(text: str) -> Any:
+    text = text.strip()
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def grid(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    # Producto cartesiano de las columnas: una fila por combinación
+    names = list(columns)
+    meshes = np.meshgrid(*(columns[name] for name in names), indexing="ij")
+    return {name: mesh.ravel() for name, mesh in zip(names, meshes)}
+
+
+def write_csv(result: SweepResult, bindings: Mapping[str, Any], stream: Any) -> None:
+    # Una fila por conjunto de valores: las variables ligadas, lo que
+    # imprimió cada print (vacío si la fila no llegó a él) y el error
+    import csv
+
+    header = list(bindings)
+    seen: Dict[int, int] = {}
+    for pos, _, _ in result.prints:
+        line = result.source.line(pos)
+        seen[line] = seen.get(line, 0) + 1
+        header.append(f"print@{line}" + (f"#{seen[line]}" if seen[line] > 1 else ""))
+    header.append("error")
+
+    columns = [np.asarray(bindings[name]).tolist() for name in bindings]
+    for _, value, mask in result.prints:
+        column = _as_list(value, result.rows)
+        if mask is not None:
+            column = [v if m else "" for v, m in zip(column, mask.tolist())]
+        columns.append(column)
+    messages = [str(e) for e in result.errors]
+    columns.append([messages[i] if i >= 0 else "" for i in result.error_index.tolist()])
+
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(zip(*columns))
+
+
+def _as_list(value: Any, rows: int) -> List[Any]:
+    # tolist() da ints y floats de Python, que se escriben igual que en print
+    if _is_column(value):
+        return value.tolist()
+    return [value] * rows
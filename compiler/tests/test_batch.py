@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import batch
+
+# Un archivo o una @lista que no se pueden leer son fallos de esa entrada:
+# el resto del lote corre igual.
+
+
+class BatchInputsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        root = Path(self.dir.name)
+        self.program = root / "ok.src"
+        self.program.write_text("print(1);\n", encoding="utf-8")
+        self.missing = root / "missing.txt"
+        self.listing = root / "list.txt"
+        self.listing.write_text(f"{self.program}\n@{self.missing}\n", encoding="utf-8")
+
+    def test_missing_list(self) -> None:
+        args = [f"@{self.listing}", f"@{self.missing}", str(self.program)]
+        paths = batch.expand_inputs(args)
+        self.assertEqual(paths, [str(self.program), f"@{self.missing}", f"@{self.missing}", str(self.program)])
+        results = list(batch.run_batch(paths, batch.BatchOptions(cache=False), jobs=1))
+        self.assertEqual([r.output for r in results], ["1\n", "", "", "1\n"])
+        self.assertEqual(
+            [r.error for r in results],
+            [None, f"cannot read {self.missing}: No such file or directory",
+             f"cannot read {self.missing}: No such file or directory", None],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
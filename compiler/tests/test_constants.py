@@ -0,0 +1,45 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import bytecode
+import semantic
+from compiler import run_source
+from output import ListSink
+from parser import parse_source
+
+# Con -O las constantes plegadas van al pool de la máquina virtual: 0.0 y
+# -0.0 (o dos NaN) no pueden compartir lugar por ser iguales con ==.
+
+HUGE = "9" * 400 + ".0"
+PROGRAM = f"""print(0.0 * -1.0);
+print(0.0);
+print(-0.0 + 0.0);
+print(-({HUGE} * 0.0));
+print({HUGE} * 0.0);
+float z = -0.0;
+print(z);
+"""
+
+
+def run(mode: str) -> str:
+    out = ListSink()
+    error = run_source(PROGRAM, mode=mode, optimize=True, out=out)
+    assert error is None
+    return out.getvalue()
+
+
+class ConstantPoolTest(unittest.TestCase):
+    def test_signed_zero(self) -> None:
+        self.assertEqual(run("vm"), run("tree"))
+        self.assertEqual(run("vm").split()[:3], ["-0.0", "0.0", "0.0"])
+
+    def test_pool(self) -> None:
+        code = bytecode.compile_program(semantic.analyze(parse_source(PROGRAM)))
+        self.assertEqual([c.hex() for c in code.consts], ["-0x0.0p+0", "0x0.0p+0", "nan"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import parser
+import rdparser
+from arena import Arena
+from ast_nodes import CompileError
+from compiler import run_source
+from output import ListSink
+
+# Programas con expresiones muy profundas: cada modo de ejecución debe dar
+# lo mismo que el recorrido del árbol mientras éste pueda ejecutarlos.
+
+# Una cadena de sumas anida un BinOp por término
+TERMS = 500
+# Los paréntesis no agregan nodos: el parser es lo único que los anida
+PARENS = 2000
+
+
+def chain(terms: int, operand: str = "1") -> str:
+    return "print(" + " + ".join([operand] * terms) + ");\n"
+
+
+def run(text: str, mode: str = "tree", parser: str = "ply") -> tuple:
+    out = ListSink()
+    error = run_source(text, mode=mode, out=out, parser=parser)
+    return out.getvalue(), None if error is None else str(error)
+
+
+class DeepExpressionTest(unittest.TestCase):
+    def check(self, mode: str) -> None:
+        for text in (
+            chain(TERMS),
+            "int x = 2;\n" + chain(TERMS, "x") + "x = x + 1;\nprint(x);\n",
+            chain(TERMS, "1.5"),
+            chain(TERMS, "y"),
+        ):
+            with self.subTest(text=text[:20]):
+                expected = run(text)
+                self.assertEqual(run(text, mode), expected)
+        self.assertEqual(run(chain(TERMS), mode), (f"{TERMS}\n", None))
+
+    def test_closure(self) -> None:
+        self.check("closure")
+
+    def test_python(self) -> None:
+        self.check("python")
+
+
+
+def parse(module, text: str) -> tuple:
+    # El árbol se compara en su forma de arena: repr de un árbol tan
+    # profundo pasaría el límite de recursión
+    try:
+        a = module.Session().parse(text, Arena())
+    except CompileError as e:
+        return str(e),
+    return a.kinds, a.positions, a.args, a.lefts, a.rights, a.statements, a.blocks, a.names, a.consts
+
+
+class DeepParenthesesTest(unittest.TestCase):
+    def test_rd_matches_ply(self) -> None:
+        nested = "(" * PARENS + "x" + ")" * PARENS
+        for text in (
+            f"int x = 1;\nprint({nested});\n",
+            "int x = 1;\nprint(" + "-(x + " * PARENS + "1" + ")" * PARENS + ");\n",
+            f"int x = 1;\nwhile {nested} < 2 * {nested} {{ x += 1; }}\n",
+            # Errores dentro de los paréntesis y al cerrarlos
+            "int x = 1;\nprint(" + "(" * PARENS + "x" + ")" * (PARENS - 1) + ");\n",
+            "int x = 1;\nprint(" + "(" * PARENS + "x +" + ")" * PARENS + ");\n",
+            "int x = 1;\nprint(" + "(" * PARENS + "x < x < x" + ")" * PARENS + ");\n",
+            "int x = 1;\nprint(" + "(" * PARENS,
+        ):
+            with self.subTest(text=text[:30]):
+                self.assertEqual(parse(rdparser, text), parse(parser, text))
+        self.assertEqual(run(f"print({'(' * PARENS}1{')' * PARENS});\n", parser="rd"), ("1\n", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import random
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import lexer
+import parser
+import rdparser
+import tables
+from ast_nodes import CompileError, ExecutionContext
+from output import ListSink
+
+# Varias sesiones analizando a la vez en hilos deben dar exactamente lo
+# mismo que analizando uno por uno: el mismo AST (con las mismas
+# posiciones), la misma salida y los mismos errores, con su línea y columna.
+
+THREADS = 8
+ROUNDS = 4
+
+
+def make_program(rng: random.Random) -> str:
+    # Programa con declaraciones, ciclos y, a veces, un error de sintaxis,
+    # de tipos o de ejecución en una línea al azar
+    lines = ["int i = 0;", "float s = 0.0;"]
+    for k in range(rng.randint(3, 30)):
+        choice = rng.random()
+        if choice < 0.3:
+            lines.append(f"int v{k} = {rng.randint(0, 9)} * i + {k};")
+        elif choice < 0.5:
+            lines.append(f"while i < {rng.randint(1, 5)} {{\n    s += i / 2;\n    i += 1;\n}}")
+        elif choice < 0.7:
+            lines.append(f"if i == {rng.randint(0, 5)} {{ print(s); }} else {{ print(\"k{k}\"); }}")
+        else:
+            lines.append(f"print(i - {k});")
+    error = rng.random()
+    at = rng.randint(2, len(lines))
+    if error < 0.25:
+        lines.insert(at, "int broken = 1")
+    elif error < 0.4:
+        lines.insert(at, "print(1 / (i - i));")
+    elif error < 0.55:
+        lines.insert(at, "i = 0.5;")
+    elif error < 0.65:
+        lines.insert(at, "print(undeclared);")
+    return "\n".join(lines) + "\n"
+
+
+def outcome(module, text: str) -> tuple:
+    # AST, salida y error de analizar y ejecutar `text` con su propia sesión
+    session = module.Session()
+    try:
+        program = session.parse(text)
+    except CompileError as e:
+        return None, "", str(e)
+    out = ListSink()
+    try:
+        program.execute(ExecutionContext(out=out))
+    except CompileError as e:
+        return repr(program), out.getvalue(), str(e.located(session.lexer.source))
+    return repr(program), out.getvalue(), None
+
+
+class ParallelSessionsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = random.Random(2024)
+        self.programs = [make_program(rng) for _ in range(60)]
+
+    def check(self, module) -> None:
+        expected = [outcome(module, text) for text in self.programs]
+        self.assertTrue(any(e[2] is not None for e in expected))
+        self.assertTrue(any(e[2] is None for e in expected))
+        jobs = self.programs * ROUNDS
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            results = list(pool.map(lambda text: outcome(module, text), jobs))
+        self.assertEqual(results, expected * ROUNDS)
+
+    def test_ply_sessions(self) -> None:
+        self.check(parser)
+
+    def test_rd_sessions(self) -> None:
+        self.check(rdparser)
+
+    def test_tables_built_once(self) -> None:
+        # Hilos que piden el lexer y el parser al mismo tiempo, antes de
+        # que existan, deben recibir la misma plantilla, construida una vez
+        built = {"lexer": 0, "parser": 0}
+        build_lexer, build_parser = tables.build_lexer, tables.build_parser
+
+        def counted_lexer(*args):
+            built["lexer"] += 1
+            return build_lexer(*args)
+
+        def counted_parser(*args):
+            built["parser"] += 1
+            return build_parser(*args)
+
+        saved = lexer._lexer, parser._parser
+        lexer._lexer = parser._parser = None
+        tables.build_lexer, tables.build_parser = counted_lexer, counted_parser
+        barrier = threading.Barrier(THREADS)
+
+        def start(_: int) -> tuple:
+            barrier.wait()
+            return lexer.get_lexer(), parser.get_parser()
+
+        try:
+            with ThreadPoolExecutor(max_workers=THREADS) as pool:
+                templates = list(pool.map(start, range(THREADS)))
+        finally:
+            tables.build_lexer, tables.build_parser = build_lexer, build_parser
+            lexer._lexer, parser._parser = saved
+        self.assertEqual(built, {"lexer": 1, "parser": 1})
+        self.assertEqual(len({(id(l), id(p)) for l, p in templates}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import argparse
+import sys
+import time
+
+from lexer import ENGINES
+from tok import Tok, TokenType
+
+def scaled(text: str, size: int) -> str:
+    # Repeat the sample until it reaches (at least) the requested size
+    reps = max(1, -(-size // len(text)))
+    return (text + '\n') * reps
+
+def measure(engine: str, src: str):
+    lex = ENGINES[engine](src)
+    count = 0
+    start = time.perf_counter()
+    while True:
+        tk = lex.readToken()
+        if tk.tokenType == TokenType.EOF:
+            break
+        count += 1
+    elapsed = time.perf_counter() - start
+    return count, lex.total, elapsed
+
+def measureBuffer(engine: str, src: str):
+    lex = ENGINES[engine](src)
+    start = time.perf_counter()
+    buf = lex.fillBuffer()
+    elapsed = time.perf_counter() - start
+    return len(buf), lex.total, elapsed, buf.nbytes()
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="tokens/segundo de cada motor del lexer")
+    p.add_argument("-f", dest="f", default="examples/input1.txt", help="archivo de ejemplo a escalar")
+    p.add_argument("-m", dest="mb", type=float, default=100, help="tamaño de la entrada en MB")
+    p.add_argument("-e", dest="engines", nargs="+", choices=sorted(ENGINES), default=sorted(ENGINES),
+                   help="motores a medir")
+    args = p.parse_args()
+
+    with open(args.f, "r", encoding="utf-8") as fh:
+        sample = fh.read()
+    src = scaled(sample, int(args.mb * 1024 * 1024))
+    print(f'Input: {args.f} x{len(src) // (len(sample) + 1)} ({len(src) / (1024 * 1024):.1f} MB)')
+
+    totals = set()
+    for engine in args.engines:
+        count, total, elapsed = measure(engine, src)
+        totals.add(total)
+        print(f'\t{engine:>9}: {count} tokens (total {total}) in {elapsed:.2f}s'
+              f' -> {count / elapsed:,.0f} tokens/s')
+        count, total, elapsed, nbytes = measureBuffer(engine, src)
+        totals.add(total)
+        print(f'\t{engine + "+buf":>9}: {count} tokens (total {total}) in {elapsed:.2f}s'
+              f' -> {count / elapsed:,.0f} tokens/s, {nbytes / count:.0f} bytes/token')
+
+    tk = Tok(TokenType.IDENTIFIER, 'x')
+    print(f'\nTok object: {sys.getsizeof(tk)} bytes per token (plus its literal)')
+
+    if len(totals) > 1:
+        print('\nWARNING: engines disagree on the total number of tokens')
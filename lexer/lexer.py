@@ -1,4 +1,7 @@
-from tok import Tok, TokenType, isKeyword
+import re
+from collections import deque
+
+from tok import Tok, TokenBuffer, TokenType, isKeyword, keywords, tokenCodes
 
 class Lexer:
     def __init__(self, input):
@@ -15,6 +18,27 @@ class Lexer:
     def printTotal(self):
         print(f'\nTotal number of tokens: {self.total}')
 
+    def __iter__(self):
+        while True:
+            tk = self.readToken()
+            if tk.tokenType == TokenType.EOF:
+                return
+            yield tk
+
+    def tokens(self):
+        """Token stream with k-token lookahead, see TokenStream"""
+        return TokenStream(self)
+
+    def readTokens(self, n):
+        """Read up to n tokens in one call; fewer (or none) only at EOF"""
+        batch = []
+        for _ in range(n):
+            tk = self.readToken()
+            if tk.tokenType == TokenType.EOF:
+                break
+            batch.append(tk)
+        return batch
+
     def readChar(self):
         if self.read_position >= len(self.input):
             self.ch = ''
@@ -82,6 +106,19 @@ class Lexer:
         self.total += 1
         return tk
 
+    def fillBuffer(self, buf=None):
+        """Scan the rest of the input into a TokenBuffer instead of
+        returning one Tok per token."""
+        if buf is None:
+            buf = TokenBuffer(self.input)
+        while True:
+            self.skipWhitespace()
+            start = self.position
+            tk = self.readToken()
+            if tk.tokenType == TokenType.EOF:
+                return buf
+            buf.append(tokenCodes[tk.tokenType], start, start + len(tk.literal))
+
     def readIdentifier(self):
         start = self.position
         while isIdentifierLetter(self.ch) or '0' <= self.ch and self.ch <= '9':
@@ -110,6 +147,177 @@ class Lexer:
         while self.ch == ' ' or self.ch == '\t' or self.ch == '\n' or self.ch == '\r':
             self.readChar()
 
+class RegexLexer(Lexer):
+    """Same API as Lexer, but every token is matched by a single call to a
+    precompiled master pattern instead of walking the input char by char."""
+
+    # One alternative per token class, tried in order. The leading
+    # whitespace is consumed as part of the same match.
+    pattern = re.compile(
+        r'[ \t\n\r]*(?:'
+        r'(' + '|'.join(keywords) + r')(?![A-Za-z_0-9])'  # 1: keyword
+        r'|([A-Za-z_][A-Za-z_0-9]*)'  # 2: identifier
+        r'|([0-9]+)'                  # 3: constant
+        r'|(==)'                      # 4: '==' (counts as two tokens)
+        r'|([=+\-/*])'                # 5: operator
+        r'|([;(),{}])'                # 6: punctuation
+        r'|("[^"]*"|"\Z)'             # 7: string literal
+        r'|("[^"]*)'                  # 8: unterminated string
+        r'|([^ \t\n\r])'              # 9: anything else
+        r')',
+        re.DOTALL,
+    )
+    EQUALS = 4
+
+    # TokenType and TokenCode for each group of the pattern
+    groupTypes = (
+        None,
+        TokenType.KEYWORD,
+        TokenType.IDENTIFIER,
+        TokenType.CONSTANT,
+        TokenType.OPERATOR,
+        TokenType.OPERATOR,
+        TokenType.PUNCTUATION,
+        TokenType.LITERAL,
+        TokenType.INVALID,
+        TokenType.INVALID,
+    )
+    groupCodes = tuple(None if t is None else tokenCodes[t] for t in groupTypes)
+
+    def __init__(self, input):
+        self.input = input
+        self.position = 0
+        self.total = 0
+
+    def isEOF(self):
+        return self.position < len(self.input)
+
+    def nextMatch(self):
+        return self.pattern.match(self.input, self.position)
+
+    def readToken(self):
+        m = self.nextMatch()
+        if m is None:
+            # Only whitespace (or nothing) left
+            self.position = len(self.input)
+            return Tok(TokenType.EOF, '')
+
+        self.position = m.end()
+        group = m.lastindex
+        # The char engine counts '==' as two tokens, keep the same total
+        self.total += 2 if group == self.EQUALS else 1
+        return Tok(self.groupTypes[group], m[group])
+
+    def fillBuffer(self, buf=None):
+        # Same as Lexer.fillBuffer, but the whole loop runs over finditer
+        if buf is None:
+            buf = TokenBuffer(self.input)
+        types = buf.types
+        starts = buf.starts
+        ends = buf.ends
+        codes = self.groupCodes
+        count = len(types)
+        equals = 0
+        for m in self.pattern.finditer(self.input, self.position):
+            group = m.lastindex
+            start, end = m.span(group)
+            types.append(codes[group])
+            starts.append(start)
+            ends.append(end)
+            if group == self.EQUALS:
+                equals += 1
+        self.total += len(types) - count + equals
+        self.position = len(self.input)
+        return buf
+
+
+class StreamLexer(RegexLexer):
+    """RegexLexer over a text file read in bounded chunks, so the whole input
+    never has to be in memory and the first token is available right away.
+
+    Only the unconsumed tail of the current chunk is kept. A match that
+    reaches the end of the buffer may still grow (identifier, number, '=' vs
+    '==', a string without its closing quote), so in that case the next
+    chunk is appended and the match is retried."""
+
+    def __init__(self, fh, chunkSize=1 << 16):
+        super().__init__('')
+        self.fh = fh
+        self.chunkSize = chunkSize
+        self.done = False
+
+    def isEOF(self):
+        return not self.done or self.position < len(self.input)
+
+    def fill(self):
+        chunk = self.fh.read(self.chunkSize)
+        if not chunk:
+            self.done = True
+        self.input = self.input[self.position:] + chunk
+        self.position = 0
+
+    def nextMatch(self):
+        while True:
+            m = self.pattern.match(self.input, self.position)
+            if self.done or (m is not None and m.end() < len(self.input)):
+                return m
+            if m is None:
+                # Only whitespace left in the buffer, no need to keep it
+                self.position = len(self.input)
+            self.fill()
+
+    def fillBuffer(self, buf=None):
+        # TokenBuffer offsets point into one source string, which is exactly
+        # what this lexer avoids keeping around
+        raise TypeError("StreamLexer cannot fill a TokenBuffer, use readToken")
+
+
+class TokenStream:
+    """Iterator over the tokens of a lexer that can peek k tokens ahead.
+
+    Peeked tokens are kept in a queue until they are consumed, so once a
+    stream is created the lexer should only be read through it."""
+
+    def __init__(self, lexer):
+        self.lexer = lexer
+        self.lookahead = deque()
+
+    def peek(self, k=1):
+        # k-th token ahead (1 is the next one), EOF past the end of the input
+        while len(self.lookahead) < k:
+            self.lookahead.append(self.lexer.readToken())
+        return self.lookahead[k - 1]
+
+    def readToken(self):
+        if self.lookahead:
+            return self.lookahead.popleft()
+        return self.lexer.readToken()
+
+    def readTokens(self, n):
+        batch = []
+        while self.lookahead and len(batch) < n:
+            tk = self.lookahead.popleft()
+            if tk.tokenType == TokenType.EOF:
+                return batch
+            batch.append(tk)
+        return batch + self.lexer.readTokens(n - len(batch))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        tk = self.readToken()
+        if tk.tokenType == TokenType.EOF:
+            raise StopIteration
+        return tk
+
+
+ENGINES = {
+    "char": Lexer,
+    "regex": RegexLexer,
+}
+
+
 def isIdentifierLetter(ch):
     return ('a' <= ch and ch <= 'z') or ('A' <= ch and ch <= 'Z') or ch == '_'
 
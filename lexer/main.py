@@ -1,29 +1,88 @@
 import argparse
-from lexer import Lexer
+import sys
+from lexer import ENGINES, StreamLexer
+from parallel import lexParallel
 from tok import TokenType
 
-def run(src: str):
-    lex = Lexer(src)
-    print("Tokens:")
+BATCH = 4096
+
+def printTokens(batch):
+    sys.stdout.write(''.join(f'\t{tk}\n' for tk in batch))
+
+def discard(batch):
+    pass
+
+def run(src: str, engine: str = "char", sink=None):
+    return scan(ENGINES[engine](src), sink)
+
+def scan(lex, sink=None):
+    """Hand the tokens of lex to sink, a callable that receives lists of
+    tokens, and return the total. Without a sink the tokens and the total
+    are listed on stdout."""
+    if sink is None:
+        print("Tokens:")
+        while True:
+            batch = lex.readTokens(BATCH)
+            if not batch:
+                break
+            printTokens(batch)
+        lex.printTotal()
+        return lex.total
+
     while True:
-        tk = lex.readToken()
-        if tk.tokenType == TokenType.EOF:
-            break
-        print(f'\t{tk}')
-    lex.printTotal()
+        batch = lex.readTokens(BATCH)
+        if not batch:
+            return lex.total
+        sink(batch)
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
     p.add_argument("-s", dest="s", help="string a escanear")
     p.add_argument("-f", dest="f", help="ruta del archivo a escanear")
+    p.add_argument("-e", dest="engine", choices=sorted(ENGINES),
+                   help="motor de escaneo (char: caracter por caracter, el de por defecto; "
+                        "regex: patron maestro)")
+    p.add_argument("-c", dest="chunk", type=int, metavar="N",
+                   help="leer el archivo por bloques de N caracteres en lugar de cargarlo completo "
+                        "(solo con -f; usa el motor regex y no se combina con -s ni -j)")
+    p.add_argument("-j", dest="jobs", type=int, metavar="N",
+                   help="escanear en paralelo con N procesos (0: uno por nucleo)")
+    p.add_argument("-q", dest="quiet", action="store_true",
+                   help="no listar los tokens, solo el total")
     args = p.parse_args()
+    if args.chunk is not None:
+        # La lectura por bloques es un RegexLexer (StreamLexer) de un solo
+        # proceso: en lugar de ignorar las opciones que no aplican, se rechazan
+        if not args.f:
+            p.error("-c lee un archivo por bloques; necesita -f")
+        if args.chunk < 1:
+            p.error("-c necesita un tamano de bloque positivo")
+        if args.s is not None:
+            p.error("-c y -s no se combinan: -c lee el archivo de -f por bloques")
+        if args.jobs is not None:
+            p.error("-c y -j no se combinan: la lectura por bloques es secuencial")
+        if args.engine not in (None, "regex"):
+            p.error(f"-c siempre usa el motor regex; quita -e {args.engine}")
+    engine = args.engine or "char"
+    sink = discard if args.quiet else None
 
-    if args.s:
-        source = args.s
-    elif args.f:
+    if args.chunk is not None:
         with open(args.f, "r", encoding="utf-8") as fh:
-            source = fh.read()
+            total = scan(StreamLexer(fh, args.chunk), sink)
     else:
-        source = 'print x = 10;'
+        if args.s:
+            source = args.s
+        elif args.f:
+            with open(args.f, "r", encoding="utf-8") as fh:
+                source = fh.read()
+        else:
+            source = 'print x = 10;'
+        if args.jobs is not None:
+            text, total = lexParallel(source, engine, args.jobs, not args.quiet)
+            if not args.quiet:
+                sys.stdout.write(f'Tokens:\n{text}\nTotal number of tokens: {total}\n')
+        else:
+            total = run(source, engine, sink)
 
-    run(source)
+    if args.quiet:
+        print(f'Total number of tokens: {total}')
@@ -0,0 +1,63 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer import ENGINES
+
+# Places where the input can be cut without splitting a token: right after
+# a ';' or a newline, as long as they are not inside a string literal
+boundary = re.compile(r'[;\n]')
+
+def splitSource(src: str, parts: int):
+    """Split src in (about) parts shards of similar size at safe boundaries.
+    Strings have no escapes, so a cut is outside of one when the number of
+    '"' before it is even."""
+    shards = []
+    start = 0
+    quotes = 0    # '"' seen between 0 and pos
+    pos = 0
+    for i in range(1, parts):
+        target = len(src) * i // parts
+        if target <= start:
+            continue
+        quotes += src.count('"', pos, target)
+        pos = target
+        while True:
+            m = boundary.search(src, pos)
+            if m is None:
+                break
+            quotes += src.count('"', pos, m.end())
+            pos = m.end()
+            if quotes % 2 == 0:
+                break
+        if m is None:
+            break
+        shards.append(src[start:pos])
+        start = pos
+    shards.append(src[start:])
+    return shards
+
+def lexShard(job):
+    engine, shard, listing = job
+    lex = ENGINES[engine](shard)
+    if not listing:
+        lex.fillBuffer()
+        return '', lex.total
+    text = []
+    while True:
+        batch = lex.readTokens(4096)
+        if not batch:
+            return ''.join(text), lex.total
+        text.append(''.join(f'\t{tk}\n' for tk in batch))
+
+def lexParallel(src: str, engine: str = "char", workers: int = None, listing: bool = True):
+    """Lex the shards of src in a process pool and merge them in order.
+    Returns the token listing (same text the sequential path prints, empty
+    when listing is False) and the total number of tokens."""
+    workers = workers or os.cpu_count() or 1
+    # A few shards per worker so that uneven shards still balance out
+    shards = splitSource(src, workers * 4)
+    jobs = [(engine, shard, listing) for shard in shards]
+    with ProcessPoolExecutor(workers) as pool:
+        results = list(pool.map(lexShard, jobs))
+    return ''.join(text for text, _ in results), sum(total for _, total in results)
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import unittest
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main.py")
+EXAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples", "input1.txt")
+
+
+def main(*args):
+    return subprocess.run([sys.executable, MAIN, *args], capture_output=True, text=True)
+
+
+class ChunkOptionsTest(unittest.TestCase):
+    # -c lee el archivo de -f por bloques con el motor regex en un solo
+    # proceso: las opciones que no aplican son un error de uso, no se ignoran
+
+    def check_rejected(self, args, message):
+        result = main(*args)
+        self.assertEqual(result.returncode, 2)
+        self.assertEqual(result.stdout, "")
+        self.assertIn(message, result.stderr)
+
+    def test_needs_file(self):
+        self.check_rejected(["-c", "64"], "necesita -f")
+
+    def test_positive_size(self):
+        self.check_rejected(["-c", "0", "-f", EXAMPLE], "tamano de bloque positivo")
+
+    def test_rejects_string(self):
+        self.check_rejected(["-c", "64", "-f", EXAMPLE, "-s", "x = 1;"], "-c y -s no se combinan")
+
+    def test_rejects_jobs(self):
+        self.check_rejected(["-c", "64", "-f", EXAMPLE, "-j", "2"], "-c y -j no se combinan")
+
+    def test_rejects_char_engine(self):
+        self.check_rejected(["-c", "64", "-f", EXAMPLE, "-e", "char"], "quita -e char")
+
+    def test_accepted(self):
+        for extra in ([], ["-e", "regex"]):
+            with self.subTest(extra=extra):
+                chunked = main("-c", "64", "-f", EXAMPLE, "-q", *extra)
+                whole = main("-f", EXAMPLE, "-q")
+                self.assertEqual(chunked.returncode, 0)
+                self.assertEqual(chunked.stdout, whole.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
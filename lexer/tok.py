@@ -1,4 +1,8 @@
+from array import array
+
 class Tok:
+    __slots__ = ("tokenType", "literal")
+
     def __init__(self, tokenType: str, literal: str):
         self.tokenType = tokenType
         self.literal = literal
@@ -15,6 +19,65 @@ class TokenType:
     INVALID = "INVALID"
     LITERAL = "LITERAL"
 
+class TokenCode:
+    """Integer codes for TokenType, used by TokenBuffer"""
+    KEYWORD = 0
+    PUNCTUATION = 1
+    IDENTIFIER = 2
+    OPERATOR = 3
+    CONSTANT = 4
+    EOF = 5
+    INVALID = 6
+    LITERAL = 7
+
+# TokenType for each TokenCode, and the other way around
+tokenNames = (
+    TokenType.KEYWORD,
+    TokenType.PUNCTUATION,
+    TokenType.IDENTIFIER,
+    TokenType.OPERATOR,
+    TokenType.CONSTANT,
+    TokenType.EOF,
+    TokenType.INVALID,
+    TokenType.LITERAL,
+)
+tokenCodes = {name: code for code, name in enumerate(tokenNames)}
+
+class TokenBuffer:
+    """Column storage for a token stream: one type code and the start/end
+    offsets into the source per token, in typed arrays. Literals are only
+    sliced out of the source when asked for."""
+
+    __slots__ = ("source", "types", "starts", "ends")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.types = array("B")
+        self.starts = array("q")
+        self.ends = array("q")
+
+    def append(self, code: int, start: int, end: int):
+        self.types.append(code)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self):
+        return len(self.types)
+
+    def literal(self, i: int) -> str:
+        return self.source[self.starts[i]:self.ends[i]]
+
+    def __getitem__(self, i: int) -> Tok:
+        return Tok(tokenNames[self.types[i]], self.literal(i))
+
+    def __iter__(self):
+        for i in range(len(self.types)):
+            yield self[i]
+
+    def nbytes(self) -> int:
+        # Memory used by the columns (the source itself is shared)
+        return sum(col.itemsize * len(col) for col in (self.types, self.starts, self.ends))
+
 keywords = [
     "print",
     "int"